@@ -11,15 +11,19 @@ Design Considerations:
 - Clean dependency management
 """
 
+import asyncio
 import logging
 import os
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 
 from api.config import get_settings, EnvironmentType
+from api.middleware.db_session import DatabaseSessionMiddleware
 from api.middleware.rate_limiter import RateLimiter
 from api.utils.error_handlers import add_exception_handlers
 from api.routes import auth, emails, dashboard
+from src.integrations.groq.client_wrapper import close_clients
+from src.integrations.groq.model_manager import close_model_managers
 
 # Configure logging
 logging.basicConfig(
@@ -60,6 +64,9 @@ def create_application() -> FastAPI:
         allow_headers=["*"],
     )
     
+    # Share one database session (and one commit) per request
+    app.add_middleware(DatabaseSessionMiddleware)
+    
     # Add rate limiting middleware
     app.add_middleware(RateLimiter)
     
@@ -81,6 +88,9 @@ def create_application() -> FastAPI:
     async def shutdown_event():
         """Perform cleanup tasks on application shutdown."""
         logger.info("API service shutting down")
+        # Persist buffered Groq metrics and compact the metrics logs
+        await close_clients()
+        await asyncio.to_thread(close_model_managers)
     
     logger.info(f"Application initialized in {settings.ENVIRONMENT} environment")
     return app
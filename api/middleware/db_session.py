@@ -0,0 +1,49 @@
+"""
+Request-Scoped Database Session Middleware
+
+Binds one database session to each request so that all repository calls
+made while handling it share a single transaction and commit once.
+
+Design Considerations:
+- One commit (one fsync on SQLite) per request instead of per operation
+- Error responses roll back the request's writes
+- Commit and rollback run off the event loop
+- Also applies with DB_ASYNC: repository calls inside a request use the
+  shared sync session instead of opening an async one
+"""
+
+import asyncio
+import logging
+
+from fastapi import Request, Response
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+
+from src.storage.database import request_db_session
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class DatabaseSessionMiddleware(BaseHTTPMiddleware):
+    """
+    Middleware sharing one database session across a request.
+
+    Responses with an error status roll the request's writes back;
+    successful responses commit them once the endpoint has finished.
+    """
+
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        """
+        Handle a request inside a request-scoped database session.
+
+        Args:
+            request: Incoming request
+            call_next: Next handler in the middleware chain
+
+        Returns:
+            Response from the downstream handler
+        """
+        async with request_db_session() as session:
+            response = await call_next(request)
+            if response.status_code >= 400:
+                await asyncio.to_thread(session.rollback)
+            return response
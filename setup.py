@@ -1,9 +1,22 @@
 from setuptools import setup, find_packages
 
+# Optionally compile hot pure-Python modules with Cython; the .py sources
+# remain importable when the extension is not built
+try:
+    from Cython.Build import cythonize
+    ext_modules = cythonize(
+        ["src/integrations/gmail/_mime.py"],
+        compiler_directives={"language_level": "3", "boundscheck": False, "wraparound": False},
+        quiet=True,
+    )
+except ImportError:
+    ext_modules = []
+
 setup(
     name="sentient-inbox",
     version="1.0.0",
     packages=find_packages(),
+    ext_modules=ext_modules,
     install_requires=[
         "fastapi>=0.104.1",
         "uvicorn>=0.24.0",
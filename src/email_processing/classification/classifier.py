@@ -70,7 +70,8 @@ class EmailClassifier:
                 messages=prompt,
                 model=model_config['name'],
                 temperature=0.1,
-                max_completion_tokens=10
+                max_completion_tokens=10,
+                task_type='email_classification'
             )
             duration = time.time() - start_time
             
@@ -124,7 +125,8 @@ class EmailClassifier:
                 messages=prompt,
                 model=model_config['name'],
                 temperature=0.1,
-                max_completion_tokens=10
+                max_completion_tokens=10,
+                task_type='email_classification'
             )
             duration = time.time() - start_time
             
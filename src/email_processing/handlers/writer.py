@@ -103,7 +103,8 @@ class EmailAgent:
                 ],
                 model="llama-3.3-70b-versatile",
                 temperature=0.3,
-                response_format={"type": "json_object"}
+                response_format={"type": "json_object"},
+                task_type='response_generation'
             )
 
             result = json.loads(response.choices[0].message.content)
@@ -260,10 +260,12 @@ class EmailProcessor:
         error_messages = []
         
         try:
-            # Fetch unread emails
+            # Fetch unread emails along with their thread membership, so the
+            # records handed to storage are plain, fully resolved dictionaries
             unread_emails = await asyncio.to_thread(
-                self.gmail.get_unread_emails,
-                max_results=batch_size
+                lambda: self.gmail.attach_thread_messages(
+                    self.gmail.get_unread_emails(max_results=batch_size)
+                )
             )
             logger.info(f"Found {len(unread_emails)} unread emails")
             
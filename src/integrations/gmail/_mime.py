@@ -0,0 +1,162 @@
+"""
+Gmail MIME Payload Parsing
+
+Pure-Python implementation of the message payload walk used by GmailClient.
+The module is deliberately free of client state so it can be compiled with
+Cython in pure-Python mode (see setup.py); when no compiled extension is
+present this source is imported directly.
+
+Design Considerations:
+- No dependency on the Gmail service object (attachments are fetched via callback)
+- Error handling mirrors the behaviour previously implemented on GmailClient
+- Keep hot loops free of dynamic attribute lookups so Cython can type them
+"""
+
+import base64
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+try:
+    import pybase64 as _b64
+except ImportError:
+    _b64 = base64
+
+logger = logging.getLogger(__name__)
+
+AttachmentFetcher = Callable[[str, str], Optional[str]]
+
+
+def decode_body_bytes(encoded_data: str) -> bytes:
+    """
+    Decode a base64url encoded message body to raw bytes.
+
+    Args:
+        encoded_data: Base64 encoded content
+
+    Returns:
+        Decoded bytes or an error marker
+    """
+    if not encoded_data:
+        return b''
+
+    try:
+        return _b64.urlsafe_b64decode(encoded_data)
+    except Exception as e:
+        logger.error(f"Error decoding content: {str(e)}")
+        return b'Error decoding content'
+
+
+def decode_body(encoded_data: str) -> str:
+    """
+    Decode a base64url encoded message body.
+
+    Args:
+        encoded_data: Base64 encoded content
+
+    Returns:
+        Decoded content string (invalid UTF-8 sequences are replaced)
+    """
+    return decode_body_bytes(encoded_data).decode('utf-8', errors='replace')
+
+
+def _handle_text(message_id: str, part: Dict, fetch_attachment: AttachmentFetcher) -> Optional[Union[bytes, str]]:
+    """Decode an inline text part, fetching it when Gmail stored it as an attachment."""
+    body = part['body']
+    if 'data' in body:
+        return decode_body_bytes(body['data'])
+    if 'attachmentId' in body:
+        return fetch_attachment(message_id, body['attachmentId'])
+    return None
+
+
+def _handle_attachment(message_id: str, part: Dict, fetch_attachment: AttachmentFetcher) -> Optional[Dict]:
+    """Describe a binary attachment without downloading it."""
+    body = part['body']
+    if 'attachmentId' in body:
+        return {
+            'id': body['attachmentId'],
+            'mime_type': part['mimeType'],
+            'filename': part.get('filename', 'unknown')
+        }
+    return None
+
+
+# Handlers keyed by full MIME type first, then by major type
+_DISPATCH = {
+    'text/plain': _handle_text,
+    'image': _handle_attachment,
+    'application': _handle_attachment,
+}
+
+
+def process_message_part(message_id: str, part: Dict, fetch_attachment: AttachmentFetcher) -> Optional[Any]:
+    """
+    Process an individual message part with type-specific handling.
+
+    Args:
+        message_id: Gmail message ID
+        part: Message part dictionary
+        fetch_attachment: Callback retrieving attachment content by id
+
+    Returns:
+        Raw text bytes (or fetched text), attachment metadata dictionary, or None
+    """
+    try:
+        mime_type = part['mimeType']
+        handler = _DISPATCH.get(mime_type) or _DISPATCH.get(mime_type.split('/', 1)[0])
+        if handler is None:
+            return None
+        return handler(message_id, part, fetch_attachment)
+
+    except Exception as e:
+        logger.error(f"Error processing message part: {str(e)}")
+        return None
+
+
+def extract_email_parts(msg: Dict, fetch_attachment: AttachmentFetcher) -> Tuple[str, List[Dict]]:
+    """
+    Extract email body and attachments from a full Gmail message.
+
+    Walks the whole multipart tree iteratively (depth-first, in document
+    order), so parts nested inside multipart/alternative or
+    multipart/related containers are no longer skipped. Text parts are
+    accumulated as raw bytes and decoded once at the end.
+
+    Args:
+        msg: Raw message dictionary from Gmail API
+        fetch_attachment: Callback retrieving attachment content by id
+
+    Returns:
+        Tuple containing (email_body, attachments_list)
+    """
+    body_buf = bytearray()
+    attachments = []
+
+    try:
+        payload = msg['payload']
+        if 'parts' not in payload:
+            body = decode_body(payload['body'].get('data', ''))
+            return body or 'No content available', attachments
+
+        message_id = msg['id']
+        stack = list(reversed(payload['parts']))
+        while stack:
+            part = stack.pop()
+            if 'parts' in part:
+                stack.extend(reversed(part['parts']))
+                continue
+
+            content = process_message_part(message_id, part, fetch_attachment)
+            if content:
+                if isinstance(content, bytes):
+                    body_buf.extend(content)
+                elif isinstance(content, str):
+                    body_buf.extend(content.encode('utf-8'))
+                else:
+                    attachments.append(content)
+
+        return body_buf.decode('utf-8', errors='replace') or 'No content available', attachments
+
+    except Exception as e:
+        logger.error(f"Error extracting email parts: {str(e)}")
+        return 'Error processing content', []
@@ -27,9 +27,29 @@ from google.auth.exceptions import RefreshError
 from google_auth_oauthlib.flow import InstalledAppFlow, Flow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from googleapiclient.http import build_http
+from google_auth_httplib2 import AuthorizedHttp
 
 logger = logging.getLogger(__name__)
 
+
+def _build_gmail_service(credentials: Credentials) -> Any:
+    """
+    Build a Gmail service bound to an explicitly constructed authorized HTTP client.
+    
+    build_http() applies the client library's default socket timeout and
+    redirect handling, which a bare httplib2.Http() would lack.
+    
+    Args:
+        credentials: Valid OAuth credentials
+        
+    Returns:
+        Gmail API service object
+    """
+    http = AuthorizedHttp(credentials, http=build_http())
+    return build('gmail', 'v1', http=http, cache_discovery=False, static_discovery=True)
+
+
 class GmailAuthenticationManager:
     """
     Manages Gmail OAuth2 authentication with comprehensive token handling
@@ -465,7 +485,7 @@ class GmailAuthenticationManager:
                 logger.error("Failed to obtain valid credentials")
                 return None
                 
-            service = build('gmail', 'v1', credentials=credentials)
+            service = _build_gmail_service(credentials)
             logger.info("Successfully created Gmail service")
             return service
             
@@ -519,7 +539,7 @@ class GmailAuthenticationManager:
                 })
             
             # Create Gmail service
-            service = build('gmail', 'v1', credentials=credentials)
+            service = _build_gmail_service(credentials)
             logger.info(f"Successfully created Gmail service for user: {user_id}")
             return service
             
@@ -23,18 +23,41 @@ import base64
 import logging
 import time
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from google.auth.exceptions import RefreshError
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from email.mime.text import MIMEText
+from email.utils import getaddresses
 
+from ._mime import decode_body, extract_email_parts, process_message_part
 from .auth_manager import GmailAuthenticationManager
 
+try:
+    # SIMD-accelerated drop-in replacement for the base64 module
+    import pybase64 as _b64
+except ImportError:
+    _b64 = base64
+
 logger = logging.getLogger(__name__)
 
+# Gmail API accepts at most 100 calls per batch request
+GMAIL_BATCH_LIMIT = 100
+# Largest page size accepted by messages().list
+GMAIL_MAX_PAGE_SIZE = 500
+
+# Precomputed mask strings so _mask_email does not allocate per log line
+_STARS = tuple('*' * n for n in range(65))
+
+
+def _stars(n: int) -> str:
+    """Return a run of n asterisks, using the precomputed table when possible."""
+    return _STARS[n] if n < len(_STARS) else '*' * n
+
+
 class GmailClient:
     """
     Gmail API client with comprehensive error handling and automatic recovery.
@@ -122,8 +145,8 @@ class GmailClient:
         """
         Extract email content and attachments with comprehensive parsing.
         
-        Implements thorough MIME parsing with proper error handling for
-        various email content types and encodings.
+        Delegates the MIME walk to the _mime module, which is compiled
+        with Cython when the extension has been built.
         
         Args:
             msg: Raw message dictionary from Gmail API
@@ -131,34 +154,12 @@ class GmailClient:
         Returns:
             Tuple containing (email_body, attachments_list)
         """
-        body = ""
-        attachments = []
-        
-        try:
-            if 'parts' in msg['payload']:
-                for part in msg['payload']['parts']:
-                    content = self._process_message_part(msg['id'], part)
-                    if content:
-                        if isinstance(content, str):
-                            body += content
-                        else:
-                            attachments.append(content)
-            else:
-                body = self._decode_body(msg['payload']['body'].get('data', ''))
-                
-            return body or 'No content available', attachments
-            
-        except Exception as e:
-            logger.error(f"Error extracting email parts: {str(e)}")
-            return 'Error processing content', []
+        return extract_email_parts(msg, self._fetch_attachment)
 
     def _process_message_part(self, message_id: str, part: Dict) -> Optional[Any]:
         """
         Process individual message part with type-specific handling.
         
-        Implements comprehensive MIME type handling with proper error
-        recovery for various content types.
-        
         Args:
             message_id: Gmail message ID
             part: Message part dictionary
@@ -166,49 +167,19 @@ class GmailClient:
         Returns:
             Processed content or None if processing fails
         """
-        try:
-            mime_type = part['mimeType']
-            
-            if mime_type == 'text/plain':
-                if 'data' in part['body']:
-                    return self._decode_body(part['body']['data'])
-                elif 'attachmentId' in part['body']:
-                    return self._fetch_attachment(message_id, part['body']['attachmentId'])
-            elif mime_type.startswith('image/') or mime_type.startswith('application/'):
-                if 'attachmentId' in part['body']:
-                    return {
-                        'id': part['body']['attachmentId'],
-                        'mime_type': mime_type,
-                        'filename': part.get('filename', 'unknown')
-                    }
-            
-            return None
-            
-        except Exception as e:
-            logger.error(f"Error processing message part: {str(e)}")
-            return None
+        return process_message_part(message_id, part, self._fetch_attachment)
 
     def _decode_body(self, encoded_data: str) -> str:
         """
         Decode email body with robust error handling.
         
-        Implements comprehensive decoding with proper error recovery
-        for various encoding types.
-        
         Args:
             encoded_data: Base64 encoded content
             
         Returns:
             Decoded content string or error message
         """
-        if not encoded_data:
-            return ''
-            
-        try:
-            return base64.urlsafe_b64decode(encoded_data).decode('utf-8')
-        except Exception as e:
-            logger.error(f"Error decoding content: {str(e)}")
-            return 'Error decoding content'
+        return decode_body(encoded_data)
 
     def _fetch_attachment(self, message_id: str, attachment_id: str) -> Optional[str]:
         """
@@ -255,14 +226,10 @@ class GmailClient:
             max_results = self.batch_size
             
         try:
-            results = self.service.users().messages().list(
-                userId='me',
-                labelIds=['UNREAD'],
-                maxResults=max_results
-            ).execute()
-
-            messages = results.get('messages', [])
-            return self._process_messages(messages)
+            return list(islice(
+                self.iter_unread_emails(page_size=min(max_results, GMAIL_MAX_PAGE_SIZE)),
+                max_results
+            ))
             
         except RefreshError:
             logger.warning("Authentication refresh required")
@@ -274,6 +241,41 @@ class GmailClient:
             logger.error(f"Error fetching unread emails: {str(e)}")
             return []
 
+    def iter_unread_emails(self, page_size: int = GMAIL_MAX_PAGE_SIZE) -> Iterator[Dict]:
+        """
+        Lazily yield unread emails, following Gmail pagination.
+        
+        Messages are fetched and processed one at a time as the caller
+        consumes them, so memory stays constant for arbitrarily large
+        inboxes and the next page is only requested when needed.
+        
+        Args:
+            page_size: Number of message ids to request per list() page
+            
+        Yields:
+            Processed email dictionaries
+            
+        Raises:
+            RefreshError: If authentication expires during iteration
+        """
+        page_token = None
+        while True:
+            results = self.service.users().messages().list(
+                userId='me',
+                labelIds=['UNREAD'],
+                pageToken=page_token,
+                maxResults=page_size
+            ).execute()
+            
+            for message in results.get('messages', []):
+                email_data = self._fetch_message_data(message)
+                if email_data:
+                    yield email_data
+                    
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
+
     def _process_messages(self, messages: List[Dict]) -> List[Dict]:
         """
         Process message batch with comprehensive error handling.
@@ -290,23 +292,35 @@ class GmailClient:
         processed_messages = []
         
         for message in messages:
-            try:
-                full_msg = self.service.users().messages().get(
-                    userId='me',
-                    id=message['id'],
-                    format='full'
-                ).execute()
-                
-                email_data = self._extract_message_data(full_msg)
-                if email_data:
-                    processed_messages.append(email_data)
-                    
-            except Exception as e:
-                logger.error(f"Error processing message {message['id']}: {str(e)}")
-                continue
+            email_data = self._fetch_message_data(message)
+            if email_data:
+                processed_messages.append(email_data)
                 
         return processed_messages
 
+    def _fetch_message_data(self, message: Dict) -> Optional[Dict]:
+        """
+        Fetch a full message and extract its data.
+        
+        Args:
+            message: Message metadata from Gmail API list results
+            
+        Returns:
+            Processed email dictionary or None if processing fails
+        """
+        try:
+            full_msg = self.service.users().messages().get(
+                userId='me',
+                id=message['id'],
+                format='full'
+            ).execute()
+            
+            return self._extract_message_data(full_msg)
+            
+        except Exception as e:
+            logger.error(f"Error processing message {message['id']}: {str(e)}")
+            return None
+
     def _extract_message_data(self, msg: Dict) -> Optional[Dict]:
         """
         Extract comprehensive message data with metadata.
@@ -318,7 +332,8 @@ class GmailClient:
             msg: Full message dictionary from Gmail API
             
         Returns:
-            Processed email dictionary or None if extraction fails
+            Processed email dictionary or None if extraction fails.
+            Thread membership is not included; see attach_thread_messages.
         """
         try:
             headers = msg['payload']['headers']
@@ -327,7 +342,6 @@ class GmailClient:
             return {
                 "message_id": msg['id'],
                 "thread_id": msg.get('threadId', ''),
-                "thread_messages": self._get_thread_messages(msg.get('threadId', '')),
                 "subject": self._get_header(headers, 'Subject', 'No Subject'),
                 "sender": self._get_header(headers, 'From', 'No Sender'),
                 "recipients": self._extract_recipients(headers),
@@ -360,8 +374,9 @@ class GmailClient:
         """
         Extract all recipient addresses with deduplication.
         
-        Implements comprehensive recipient extraction with proper
-        handling of various address formats.
+        Parses To/Cc/Bcc with RFC 5322 aware address splitting, so quoted
+        display names containing commas ("Doe, Jane" <jane@x>) are handled
+        correctly.
         
         Args:
             headers: List of message headers
@@ -369,42 +384,64 @@ class GmailClient:
         Returns:
             List of unique recipient addresses
         """
-        recipients = set()
-        recipient_fields = ['To', 'Cc', 'Bcc']
-        
-        for field in recipient_fields:
-            value = self._get_header(headers, field)
-            if value:
-                # Split and clean email addresses
-                addresses = [addr.strip() for addr in value.split(',')]
-                recipients.update(addresses)
-                
-        return list(recipients)
+        raw = [self._get_header(headers, field) for field in ('To', 'Cc', 'Bcc')]
+        return list(dict.fromkeys(addr for _, addr in getaddresses(raw) if addr))
 
-    def _get_thread_messages(self, thread_id: str) -> List[str]:
+    def attach_thread_messages(self, emails: List[Dict]) -> List[Dict]:
         """
-        Retrieve all message IDs in a thread with error handling.
+        Fill in the 'thread_messages' of each email, in place.
+        
+        Each distinct thread is fetched once, packing up to GMAIL_BATCH_LIMIT
+        threads().get calls into a single batch request. Emails whose thread
+        cannot be fetched get an empty list.
         
         Args:
-            thread_id: Gmail thread identifier
+            emails: Email dictionaries returned by get_unread_emails
             
         Returns:
-            List of message IDs in the thread
+            The same email dictionaries
         """
-        if not thread_id:
-            return []
-            
-        try:
-            thread = self.service.users().threads().get(
-                userId='me',
-                id=thread_id
-            ).execute()
-            
-            return [msg['id'] for msg in thread['messages']]
+        thread_ids = list(dict.fromkeys(e.get('thread_id') for e in emails if e.get('thread_id')))
+        threads: Dict[str, List[str]] = {}
+        
+        # Batch request ids are indexes into thread_ids
+        def _callback(request_id: str, response: Any, exception: Optional[Exception]):
+            if exception is not None:
+                logger.error(f"Error getting thread messages: {exception}")
+                return
+            threads[thread_ids[int(request_id)]] = [msg['id'] for msg in response.get('messages', [])]
+        
+        for start in range(0, len(thread_ids), GMAIL_BATCH_LIMIT):
+            chunk = thread_ids[start:start + GMAIL_BATCH_LIMIT]
             
-        except Exception as e:
-            logger.error(f"Error getting thread messages: {str(e)}")
-            return []
+            for attempt in range(2):
+                try:
+                    batch = self.service.new_batch_http_request(callback=_callback)
+                    for offset, thread_id in enumerate(chunk):
+                        batch.add(
+                            self.service.users().threads().get(
+                                userId='me',
+                                id=thread_id,
+                                format='minimal'
+                            ),
+                            request_id=str(start + offset)
+                        )
+                    batch.execute()
+                    break
+                    
+                except RefreshError:
+                    logger.warning("Authentication refresh required during thread lookup")
+                    if attempt == 0 and self.refresh_service():
+                        continue
+                    break
+                    
+                except Exception as e:
+                    logger.error(f"Error getting thread messages: {e}")
+                    break
+                    
+        for email in emails:
+            email['thread_messages'] = threads.get(email.get('thread_id'), [])
+        return emails
 
     def modify_message_labels(
         self,
@@ -480,13 +517,7 @@ class GmailClient:
             bool: True if sending successful, False otherwise
         """
         try:
-            # Create email MIME message
-            message = MIMEText(message_text)
-            message['to'] = to_email
-            message['subject'] = subject
-            
-            # Convert to raw format required by Gmail API
-            raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode('utf-8')
+            raw_message = self._build_raw_message(to_email, subject, message_text)
             
             # Process with proper error handling for authentication issues
             for attempt in range(self.retry_count + 1):
@@ -522,6 +553,79 @@ class GmailClient:
             logger.error(f"Error preparing email for sending: {e}")
             return False
             
+    def send_emails_bulk(self, items: List[Tuple[str, str, str]]) -> List[bool]:
+        """
+        Send multiple emails using Gmail batch requests.
+        
+        Amortizes authentication and HTTP overhead by packing up to
+        GMAIL_BATCH_LIMIT send calls into a single batch request.
+        
+        Args:
+            items: List of (to_email, subject, message_text) tuples
+            
+        Returns:
+            Send success for each item, in the order of items
+        """
+        results: List[bool] = [False] * len(items)
+        
+        # Batch request ids are item indexes, so repeated recipients each
+        # get their own result
+        def _callback(request_id: str, response: Any, exception: Optional[Exception]):
+            index = int(request_id)
+            if exception is not None:
+                logger.error(f"Failed to send email to {self._mask_email(items[index][0])}: {exception}")
+                results[index] = False
+            else:
+                logger.info(f"Email sent successfully, message_id: {response.get('id', '')}")
+                results[index] = True
+        
+        for start in range(0, len(items), GMAIL_BATCH_LIMIT):
+            chunk = items[start:start + GMAIL_BATCH_LIMIT]
+            
+            for attempt in range(2):
+                try:
+                    batch = self.service.new_batch_http_request(callback=_callback)
+                    for offset, (to_email, subject, message_text) in enumerate(chunk):
+                        raw_message = self._build_raw_message(to_email, subject, message_text)
+                        batch.add(
+                            self.service.users().messages().send(
+                                userId="me",
+                                body={'raw': raw_message}
+                            ),
+                            request_id=str(start + offset)
+                        )
+                    batch.execute()
+                    break
+                    
+                except RefreshError:
+                    logger.warning("Authentication refresh required during bulk email sending")
+                    if attempt == 0 and self.refresh_service():
+                        continue
+                    break
+                    
+                except Exception as e:
+                    logger.error(f"Error sending email batch: {e}")
+                    break
+                
+        return results
+
+    def _build_raw_message(self, to_email: str, subject: str, message_text: str) -> str:
+        """
+        Build the base64url-encoded raw message required by the Gmail API.
+        
+        Args:
+            to_email: Recipient email address
+            subject: Email subject line
+            message_text: Plain text email body content
+            
+        Returns:
+            Raw message string
+        """
+        message = MIMEText(message_text)
+        message['to'] = to_email
+        message['subject'] = subject
+        return _b64.urlsafe_b64encode(message.as_bytes()).decode('ascii')
+            
     def _mask_email(self, email: str) -> str:
         """
         Mask email addresses for privacy in logs.
@@ -541,14 +645,14 @@ class GmailClient:
         try:
             username, domain = email.split('@', 1)
             if len(username) <= 2:
-                masked_username = '*' * len(username)
+                masked_username = _stars(len(username))
             else:
-                masked_username = username[0] + '*' * (len(username) - 2) + username[-1]
+                masked_username = username[0] + _stars(len(username) - 2) + username[-1]
                 
-            domain_parts = domain.split('.')
-            masked_domain = domain_parts[0][0] + '*' * (len(domain_parts[0]) - 1)
+            domain_name, _, domain_suffix = domain.partition('.')
+            masked_domain = domain_name[0] + _stars(len(domain_name) - 1)
             
-            return f"{masked_username}@{masked_domain}.{'.'.join(domain_parts[1:])}"
+            return f"{masked_username}@{masked_domain}.{domain_suffix}"
         except Exception:
             # If masking fails, return a generic masked value
             return "***@***.***"
\ No newline at end of file
@@ -7,6 +7,7 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 import logging
+from logging.handlers import RotatingFileHandler
 
 # Get the project root directory
 PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
@@ -17,23 +18,26 @@ DATA_DIR = PROJECT_ROOT / 'data'
 LOGS_DIR.mkdir(parents=True, exist_ok=True)
 (DATA_DIR / 'metrics').mkdir(parents=True, exist_ok=True)
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(LOGS_DIR / 'groq_client.log'),
-        logging.StreamHandler()
-    ]
-)
+# Root logging is configured by the application entry point; this module only
+# adds its own file handler (see EnhancedGroqClient.__init__)
 logger = logging.getLogger(__name__)
 
 
+def _attach_file_handler():
+    """Attach the groq_client.log handler once, on first client construction."""
+    if logger.handlers:
+        return
+    handler = RotatingFileHandler(LOGS_DIR / 'groq_client.log', maxBytes=10 * 1024 * 1024, backupCount=3)
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    logger.addHandler(handler)
+
+
 class EnhancedGroqClient:
     """Enhanced Groq client with retry logic and error handling."""
 
     def __init__(self, api_key: Optional[str] = None):
         """Initialize the enhanced Groq client with API key from environment or parameter."""
+        _attach_file_handler()
         load_dotenv(override=True)
         self.api_key = api_key or os.getenv('GROQ_API_KEY')
         if not self.api_key:
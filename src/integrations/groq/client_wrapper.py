@@ -1,132 +1,732 @@
-from groq import Groq
-from typing import Dict, List, Optional, Union
+from groq import AsyncGroq, APIConnectionError, InternalServerError, RateLimitError
+from groq.types.chat import ChatCompletion
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+from collections import OrderedDict, deque
 from datetime import datetime
 import asyncio
+import hashlib
+import inspect
 import json
+import logging
 import os
+import random
+import time
+import weakref
+import httpx
 from dotenv import load_dotenv
+from . import metrics_log
+from .constants import TASK_SETTINGS
+from .model_manager import PARAM_BUILDERS
+from .rate_limiter import model_buckets
+from .semantic_cache import SemanticCache
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 in httpx
+except ImportError:
+    h2 = None
+
+logger = logging.getLogger(__name__)
+
+
+def _dumps(obj, sort_keys: bool = False) -> bytes:
+    """Serialize to compact JSON bytes, optionally with sorted keys."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else None)
+    return json.dumps(obj, sort_keys=sort_keys, separators=(',', ':')).encode()
+
+
+def _loads(data: bytes):
+    """Parse JSON bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+_timestamp_cache = (0, '')
+
+
+def _timestamp() -> str:
+    """Local ISO timestamp at second resolution, formatted once per second."""
+    global _timestamp_cache
+    second = int(time.time())
+    if second != _timestamp_cache[0]:
+        _timestamp_cache = (second, datetime.fromtimestamp(second).isoformat())
+    return _timestamp_cache[1]
+
+# Metrics are persisted by a periodic background flush so disk I/O stays off the request path
+METRICS_FLUSH_INTERVAL = 5.0  # seconds
+# Only the most recent events are kept; aggregates are maintained as running totals
+METRICS_HISTORY_SIZE = 1000
+# Events are appended one per line; the log is rewritten as a single snapshot line this often
+METRICS_COMPACT_LINES = 10000
+METRICS_FILE = 'groq_metrics.jsonl'
+# Single JSON document written before the log format; migrated on first load
+LEGACY_METRICS_FILE = 'groq_metrics.json'
+
+# Connection pool for the shared async HTTP client
+HTTP_MAX_CONNECTIONS = 200
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 100
+
+# Rate limits need more room to recover than transient network/server errors
+RATE_LIMIT_BACKOFF_MULTIPLIER = 4
+# Transient failures worth retrying - anything else is raised immediately
+RETRYABLE_ERRORS = (
+    APIConnectionError,
+    RateLimitError,
+    InternalServerError,
+    httpx.HTTPStatusError,
+    TimeoutError,
+)
+
+# Exact-match response cache; only near-deterministic requests are cached
+RESPONSE_CACHE_SIZE = 512
+RESPONSE_CACHE_TTL = 3600  # seconds
+RESPONSE_CACHE_MAX_TEMPERATURE = 0.2
+RESPONSE_CACHE_PREFIX = 'groq:response:'
+
+# Row-marshaled batches pack several classification inputs into one call
+MARSHAL_ROW_MARKER = '\n---ROW {index}---\n'
+MARSHAL_TOKENS_PER_ROW = 64
+
+
+class _MetricsState:
+    """Running metrics aggregates rebuilt from, and compacted into, the metrics log."""
+
+    def __init__(self):
+        self.recent = deque(maxlen=METRICS_HISTORY_SIZE)
+        self.recent_errors = deque(maxlen=METRICS_HISTORY_SIZE)
+        self.total_requests = 0
+        self.total_errors = 0
+        self.sum_duration = 0.0
+        self.prompt_cache_hit_tokens = 0
+
+    @classmethod
+    def from_log(cls, path: str) -> '_MetricsState':
+        """Replay a metrics log."""
+        state = cls()
+        for entry in metrics_log.read_entries(path, _loads):
+            state.apply(entry)
+        return state
+
+    def apply(self, entry: Dict):
+        """Fold a logged event or compaction snapshot into the running aggregates."""
+        if 'performance' in entry:
+            performance = entry['performance']
+            requests = entry.get('requests', [])
+            errors = entry.get('errors', [])
+            self.recent.clear()
+            self.recent.extend(requests)
+            self.recent_errors.clear()
+            self.recent_errors.extend(errors)
+            self.total_requests = performance.get('total_requests', len(requests))
+            self.total_errors = performance.get('total_errors', len(errors))
+            self.sum_duration = performance.get('avg_response_time', 0) * self.total_requests
+            self.prompt_cache_hit_tokens = performance.get('prompt_cache_hit_tokens', 0)
+        elif 'error' in entry:
+            self.total_errors += 1
+            self.recent_errors.append(entry)
+        else:
+            self.total_requests += 1
+            self.sum_duration += entry.get('duration', 0)
+            self.prompt_cache_hit_tokens += entry.get('prompt_cache_hit_tokens', 0)
+            self.recent.append(entry)
+
+    def performance(self) -> Dict:
+        """Summary figures reported by get_performance_metrics()."""
+        if not self.total_requests:
+            return {
+                'avg_response_time': 0,
+                'total_requests': 0,
+                'total_errors': self.total_errors,
+                'success_rate': 100,
+                'prompt_cache_hit_tokens': self.prompt_cache_hit_tokens
+            }
+        return {
+            'avg_response_time': self.sum_duration / self.total_requests,
+            'total_requests': self.total_requests,
+            'total_errors': self.total_errors,
+            'success_rate': (self.total_requests - self.total_errors) / self.total_requests * 100,
+            'prompt_cache_hit_tokens': self.prompt_cache_hit_tokens
+        }
+
+    def snapshot(self) -> Dict:
+        """Build the serializable metrics document."""
+        return {
+            'requests': list(self.recent),
+            'errors': list(self.recent_errors),
+            'performance': self.performance()
+        }
+
+
+# Clients whose metrics and connections are flushed by close_clients() at shutdown
+_open_clients: 'weakref.WeakSet[EnhancedGroqClient]' = weakref.WeakSet()
+
+
+async def close_clients():
+    """Persist metrics and close connections of every open client; call on app shutdown."""
+    for client in list(_open_clients):
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.error(f"Failed to close Groq client: {str(e)}")
 
 
 class EnhancedGroqClient:
     """Enhanced Groq client with retry logic, error handling, and performance monitoring."""
 
-    def __init__(self, api_key: Optional[str] = None):
-        """Initialize the enhanced Groq client."""
+    def __init__(self,
+                 api_key: Optional[str] = None,
+                 base: float = 0.5,
+                 max_backoff: float = 30,
+                 max_concurrency: int = 32):
+        """
+        Initialize the enhanced Groq client.
+
+        Args:
+            api_key: Groq API key (defaults to GROQ_API_KEY)
+            base: Base retry backoff in seconds
+            max_backoff: Upper bound for a single retry backoff in seconds
+            max_concurrency: Maximum in-flight requests per batch
+        """
         load_dotenv(override=True)
         self.api_key = api_key or os.getenv('GROQ_API_KEY')
         if not self.api_key:
             raise ValueError("GROQ_API_KEY must be provided either through initialization or environment")
 
-        self.client = Groq(api_key=self.api_key)
-        self.metrics_file = 'groq_metrics.json'
+        self.client = AsyncGroq(
+            api_key=self.api_key,
+            http_client=httpx.AsyncClient(
+                http2=h2 is not None,
+                limits=httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS
+                )
+            )
+        )
+        self.base = base
+        self.max_backoff = max_backoff
+        self.max_concurrency = max_concurrency
+        self.metrics_file = METRICS_FILE
+        self._pending_events: List[Dict] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._cache: OrderedDict[str, Tuple[ChatCompletion, float]] = OrderedDict()
+        self._cache_size = RESPONSE_CACHE_SIZE
+        self._cache_ttl = RESPONSE_CACHE_TTL
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._system_prefix_cache: Dict[str, str] = {}
+        self._redis = None
+        redis_url = os.getenv('REDIS_URL')
+        if redis_url and aioredis is not None:
+            self._redis = aioredis.from_url(redis_url)
+        self._semantic_cache = SemanticCache() if SemanticCache.available() else None
         self.load_metrics()
+        self._ensure_flush_task()
+        _open_clients.add(self)
 
     def load_metrics(self):
-        """Load or initialize performance metrics."""
+        """Load or initialize performance metrics by replaying the metrics log."""
+        with metrics_log.locked(self.metrics_file):
+            self._migrate_legacy_metrics()
+            self._metrics = _MetricsState.from_log(self.metrics_file)
+        self._metrics_lines = 0
+
+    def _migrate_legacy_metrics(self):
+        """Carry a pre-JSONL groq_metrics.json document over as the log's first snapshot."""
+        if os.path.exists(self.metrics_file) or not os.path.exists(LEGACY_METRICS_FILE):
+            return
         try:
-            with open(self.metrics_file, 'r') as f:
-                self.metrics = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            self.metrics = {
-                'requests': [],
-                'errors': [],
-                'performance': {
-                    'avg_response_time': 0,
-                    'total_requests': 0,
-                    'success_rate': 100
-                }
-            }
+            with open(LEGACY_METRICS_FILE, 'rb') as f:
+                legacy = _loads(f.read())
+            state = _MetricsState()
+            state.apply({**legacy, 'performance': legacy.get('performance', {})})
+            metrics_log.replace(self.metrics_file, _dumps(state.snapshot()) + b'\n')
+            os.remove(LEGACY_METRICS_FILE)
+            logger.info(f"Migrated {LEGACY_METRICS_FILE} to {self.metrics_file}")
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"Could not migrate {LEGACY_METRICS_FILE}: {str(e)}")
+
+    def _take_pending_metrics(self) -> Tuple[bytes, bool]:
+        """
+        Drain pending events into log lines.
+
+        Returns:
+            Tuple of (lines to append, whether to compact the log afterwards)
+        """
+        events, self._pending_events = self._pending_events, []
+        self._metrics_lines += len(events)
+        compact = self._metrics_lines >= METRICS_COMPACT_LINES
+        if compact:
+            self._metrics_lines = 0
+        return b''.join(_dumps(event) + b'\n' for event in events), compact
+
+    def _write_metrics(self, lines: bytes, compact: bool):
+        """
+        Append events to the metrics log, then optionally compact it.
+
+        The compaction snapshot is rebuilt from the log under its lock, so
+        events appended by other clients sharing the file are kept.
+        """
+        if not lines and not compact:
+            return
+        with metrics_log.locked(self.metrics_file):
+            if lines:
+                metrics_log.append(self.metrics_file, lines)
+            if compact:
+                snapshot = _MetricsState.from_log(self.metrics_file).snapshot()
+                metrics_log.replace(self.metrics_file, _dumps(snapshot) + b'\n')
 
     def save_metrics(self):
-        """Save current metrics to file."""
-        with open(self.metrics_file, 'w') as f:
-            json.dump(self.metrics, f, indent=2)
+        """Persist pending metrics events to file."""
+        self._write_metrics(*self._take_pending_metrics())
 
     async def process_with_retry(self,
                                  messages: List[Dict],
                                  model: str = "llama-3.3-70b-versatile",
                                  max_retries: int = 3,
                                  **kwargs) -> Dict:
-        """Process a request with retry logic and error handling."""
-        start_time = datetime.now()
+        """
+        Process a request with retry logic and error handling.
+
+        Pass task_type (a TASK_SETTINGS key) to default to the task's
+        temperature, to let raw-format classification tasks use the semantic
+        cache for near-duplicate prompts, and to have the task's registered
+        system prefix injected when none is given.
+        """
+        task_type = kwargs.pop('task_type', None)
+        messages = self._apply_system_prefix(task_type, messages)
+        build_params = PARAM_BUILDERS.get(task_type, PARAM_BUILDERS[None])
+        params = build_params(messages, model, **kwargs)
+        use_semantic = self._use_semantic_cache(task_type, params)
+        cache_key = self._cache_key(params)
+        if cache_key is None:
+            return await self._fetch(params, max_retries, use_semantic)
+
+        cached = await self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+
+        # Concurrent identical requests share a single API call
+        inflight = self._inflight.get(cache_key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[cache_key] = future
+        try:
+            response = await self._fetch(params, max_retries, use_semantic)
+            await self._cache_set(cache_key, response)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved in case nobody else was waiting
+            raise
+        finally:
+            del self._inflight[cache_key]
+
+        future.set_result(response)
+        return response
+
+    async def _fetch(self, params: Dict, max_retries: int, use_semantic: bool) -> ChatCompletion:
+        """Resolve a request through the semantic cache or the API."""
+        model, messages = params['model'], params['messages']
+        if use_semantic:
+            cached = await asyncio.to_thread(self._semantic_cache.lookup, model, messages)
+            if cached is not None:
+                return cached
+
+        response = await self._call_with_retry(params, max_retries)
+        if use_semantic:
+            await asyncio.to_thread(self._semantic_cache.store, model, messages, response)
+        return response
+
+    async def _call_with_retry(self, params: Dict, max_retries: int) -> ChatCompletion:
+        """Call the chat completions API, retrying transient failures."""
+        start_time = time.monotonic()
         retries = 0
 
         while retries < max_retries:
             try:
-                # Configure default parameters based on task complexity
-                params = {
-                    'model': model,
-                    'messages': messages,
-                    'temperature': kwargs.get('temperature', 0.7),
-                    'max_completion_tokens': kwargs.get('max_completion_tokens', 4096),
-                    'service_tier': kwargs.get('service_tier', None),
-                    **kwargs
-                }
+                # Queue locally rather than spend a round trip on a 429
+                reserved = await self._acquire_rate_limit(
+                    params['model'], params['messages'], params['max_completion_tokens']
+                )
 
                 # Make the API call
-                response = await asyncio.to_thread(self.client.chat.completions.create, **params)
+                response = await self.client.chat.completions.create(**params)
+                self._refund_rate_limit(params['model'], reserved, response)
 
                 # Record success metrics
-                self.record_success(start_time)
+                self.record_success(start_time, self._cached_prompt_tokens(response))
                 return response
 
             except Exception as e:
-                retries += 1
                 self.record_error(str(e))
 
+                if not isinstance(e, RETRYABLE_ERRORS):
+                    raise Exception(f"Request failed with non-retryable error: {str(e)}") from e
+
+                retries += 1
                 if retries == max_retries:
-                    raise Exception(f"Failed after {max_retries} retries: {str(e)}")
+                    raise Exception(f"Failed after {max_retries} retries: {str(e)}") from e
 
-                # Exponential backoff
-                await asyncio.sleep(2 ** retries)
+                await asyncio.sleep(self._backoff(retries, e))
 
-    def record_success(self, start_time: datetime):
-        """Record successful request metrics."""
-        duration = (datetime.now() - start_time).total_seconds()
-        self.metrics['requests'].append({
-            'timestamp': datetime.now().isoformat(),
-            'duration': duration,
-            'status': 'success'
-        })
-
-        # Update performance metrics
-        total_reqs = len(self.metrics['requests'])
-        self.metrics['performance'].update({
-            'avg_response_time': (
-                    (self.metrics['performance']['avg_response_time'] * (total_reqs - 1) + duration)
-                    / total_reqs
-            ),
-            'total_requests': total_reqs,
-            'success_rate': (
-                    (total_reqs - len(self.metrics['errors'])) / total_reqs * 100
-            )
-        })
+    def set_system_prefix(self, task_type: str, prompt: str):
+        """Register the static system prompt used for a task type."""
+        self._system_prefix_cache[task_type] = self._normalize_prompt(prompt)
+
+    @staticmethod
+    def _normalize_prompt(prompt: str) -> str:
+        """Strip source indentation and surrounding whitespace from a prompt."""
+        return inspect.cleandoc(prompt).strip()
+
+    def _apply_system_prefix(self, task_type: Optional[str], messages: List[Dict]) -> List[Dict]:
+        """
+        Put a byte-stable system prompt first so provider prefix caching can reuse it.
+
+        Common indentation is normalized so triple-quoted prompts are sent
+        identically on every call regardless of source formatting.
+        """
+        if messages and messages[0].get('role') == 'system':
+            content = messages[0].get('content')
+            if not isinstance(content, str):
+                return messages
+            normalized = self._normalize_prompt(content)
+            if normalized == content:
+                return messages
+            return [{**messages[0], 'content': normalized}, *messages[1:]]
+
+        prefix = self._system_prefix_cache.get(task_type)
+        if prefix is None:
+            return messages
+        return [{"role": "system", "content": prefix}, *messages]
 
-        self.save_metrics()
+    @staticmethod
+    def _cached_prompt_tokens(response: ChatCompletion) -> int:
+        """Prompt tokens served from the provider's prefix cache, if reported."""
+        details = getattr(getattr(response, 'usage', None), 'prompt_tokens_details', None)
+        return getattr(details, 'cached_tokens', 0) or 0
+
+    async def _acquire_rate_limit(self, model: str, messages: List[Dict], max_completion_tokens: int) -> float:
+        """
+        Wait for request and token budget for the model, if it has known limits.
+
+        Returns:
+            Tokens reserved from the model's TPM bucket
+        """
+        buckets = model_buckets(self.api_key, model)
+        if buckets is None:
+            return 0
+        rpm_bucket, tpm_bucket = buckets
+        # Rough estimate: ~4 characters per prompt token plus the completion budget;
+        # the unused part is refunded from the reported usage
+        prompt_tokens = sum(len(str(m.get('content') or '')) for m in messages) // 4
+        await rpm_bucket.acquire()
+        return await tpm_bucket.acquire(prompt_tokens + (max_completion_tokens or 0))
+
+    def _refund_rate_limit(self, model: str, reserved: float, response: ChatCompletion):
+        """Give back the reserved tokens the response did not use."""
+        used = getattr(getattr(response, 'usage', None), 'total_tokens', None)
+        buckets = model_buckets(self.api_key, model)
+        if buckets is not None and isinstance(used, int):
+            buckets[1].refund(reserved - used)
+
+    def _backoff(self, retries: int, error: Exception) -> float:
+        """Full-jitter exponential backoff; rate limits back off longer."""
+        base = self.base
+        if isinstance(error, RateLimitError):
+            base *= RATE_LIMIT_BACKOFF_MULTIPLIER
+        # Full jitter keeps concurrent failures from retrying in lockstep
+        delay = random.uniform(0, min(self.max_backoff, base * 2 ** retries))
+
+        if isinstance(error, RateLimitError):
+            try:
+                retry_after = float(error.response.headers.get('retry-after', 0))
+            except (AttributeError, TypeError, ValueError):
+                retry_after = 0
+            delay = max(delay, min(self.max_backoff, retry_after))
+        return delay
+
+    @staticmethod
+    def _cache_key(params: Dict) -> Optional[str]:
+        """Build the cache key for a request, or None if it must not be cached."""
+        if params.get('stream') or params['temperature'] > RESPONSE_CACHE_MAX_TEMPERATURE:
+            return None
+        try:
+            canonical = _dumps(params, sort_keys=True)
+        except (TypeError, ValueError):
+            return None
+        return hashlib.sha256(canonical).hexdigest()
+
+    def _use_semantic_cache(self, task_type: Optional[str], params: Dict) -> bool:
+        """Only low-temperature tasks with raw (label-style) output are semantically cached."""
+        if self._semantic_cache is None or params.get('stream'):
+            return False
+        settings = TASK_SETTINGS.get(task_type)
+        if not settings or settings['reasoning_format'] != 'raw':
+            return False
+        return params['temperature'] <= settings['temperature']
+
+    async def _cache_get(self, key: str) -> Optional[ChatCompletion]:
+        """Look up a cached response in memory, then in Redis if configured."""
+        entry = self._cache.get(key)
+        if entry is not None:
+            response, expires_at = entry
+            if expires_at > time.monotonic():
+                self._cache.move_to_end(key)
+                return response
+            del self._cache[key]
+
+        if self._redis is not None:
+            try:
+                raw = await self._redis.get(RESPONSE_CACHE_PREFIX + key)
+                if raw is not None:
+                    response = ChatCompletion.model_validate_json(raw)
+                    self._cache_store_local(key, response)
+                    return response
+            except Exception as e:
+                logger.warning(f"Redis cache lookup failed: {str(e)}")
+        return None
+
+    async def _cache_set(self, key: str, response: ChatCompletion):
+        """Store a response in memory and, if configured, in Redis."""
+        self._cache_store_local(key, response)
+        if self._redis is not None:
+            try:
+                await self._redis.setex(RESPONSE_CACHE_PREFIX + key, self._cache_ttl, response.model_dump_json())
+            except Exception as e:
+                logger.warning(f"Redis cache store failed: {str(e)}")
+
+    def _cache_store_local(self, key: str, response: ChatCompletion):
+        """Insert into the in-process LRU, evicting the least recently used entry."""
+        self._cache[key] = (response, time.monotonic() + self._cache_ttl)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    def record_success(self, start_time: float, prompt_cache_hit_tokens: int = 0):
+        """Record successful request metrics for a request started at time.monotonic()."""
+        duration = time.monotonic() - start_time
+        event = {
+            'timestamp': _timestamp(),
+            'duration': duration,
+            'status': 'success',
+            'prompt_cache_hit_tokens': prompt_cache_hit_tokens
+        }
+        self._metrics.apply(event)
+        self._queue_metrics_event(event)
 
     def record_error(self, error_message: str):
         """Record error metrics."""
-        self.metrics['errors'].append({
-            'timestamp': datetime.now().isoformat(),
+        event = {
+            'timestamp': _timestamp(),
             'error': error_message
-        })
-        self.save_metrics()
+        }
+        self._metrics.apply(event)
+        self._queue_metrics_event(event)
+
+    def _queue_metrics_event(self, event: Dict):
+        """Queue an event for the next periodic flush."""
+        self._pending_events.append(event)
+        self._ensure_flush_task()
+
+    def _ensure_flush_task(self):
+        """Start the periodic metrics flush if an event loop is running."""
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        try:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+        except RuntimeError:
+            # No event loop yet; started on the first record from async code
+            self._flush_task = None
+
+    async def _flush_loop(self):
+        """Persist metrics every few seconds while there is something new."""
+        while True:
+            await asyncio.sleep(METRICS_FLUSH_INTERVAL)
+            if not self._pending_events:
+                continue
+            try:
+                # Drain on the loop thread so the deques are never iterated concurrently
+                await asyncio.to_thread(self._write_metrics, *self._take_pending_metrics())
+            except Exception as e:
+                logger.error(f"Failed to persist Groq metrics: {str(e)}")
+
+    async def flush_metrics(self):
+        """Stop the periodic flush and persist current metrics."""
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        self._flush_task = None
+        await asyncio.to_thread(self._write_metrics, *self._take_pending_metrics())
+        if self._semantic_cache is not None:
+            await asyncio.to_thread(self._semantic_cache.save)
+
+    async def aclose(self):
+        """Persist metrics and close the underlying HTTP connections."""
+        _open_clients.discard(self)
+        await self.flush_metrics()
+        await self.client.close()
 
     async def batch_process(self,
                             requests: List[Dict],
                             model: str = "llama-3.3-70b-versatile",
                             **kwargs) -> List[Dict]:
-        """Process multiple requests in parallel."""
-        tasks = [
-            self.process_with_retry(
+        """Process multiple requests in parallel, at most max_concurrency at a time."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks = [self._bounded_request(semaphore, req, model, kwargs) for req in requests]
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def batch_process_iter(self,
+                                 requests: List[Dict],
+                                 model: str = "llama-3.3-70b-versatile",
+                                 **kwargs) -> AsyncIterator[Tuple[int, Union[ChatCompletion, Exception]]]:
+        """
+        Process multiple requests in parallel, yielding results as they finish.
+
+        Yields:
+            (request index, response or the exception raised) in completion order
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(index: int, req: Dict):
+            try:
+                return index, await self._bounded_request(semaphore, req, model, kwargs)
+            except Exception as e:
+                return index, e
+
+        for completed in asyncio.as_completed([run(i, req) for i, req in enumerate(requests)]):
+            yield await completed
+
+    async def _bounded_request(self,
+                               semaphore: asyncio.Semaphore,
+                               req: Dict,
+                               model: str,
+                               kwargs: Dict) -> ChatCompletion:
+        """Run one batch request while holding a concurrency slot."""
+        async with semaphore:
+            return await self.process_with_retry(
                 messages=req['messages'],
                 model=model,
                 **kwargs
             )
-            for req in requests
+
+    async def batch_process_marshaled(self,
+                                      requests: List[Dict],
+                                      task_type: str,
+                                      batch_size: int = 10,
+                                      model: str = "llama-3.3-70b-versatile",
+                                      **kwargs) -> List[Union[str, Exception]]:
+        """
+        Process classification-style requests several rows per API call.
+
+        Requests sharing a system prompt are packed up to batch_size at a time
+        into one prompt that asks for a JSON array of answers. Chunks whose
+        reply cannot be split back into rows are retried one request per call.
+        Tasks whose reasoning_format is not 'raw' are always processed per row.
+        At most max_concurrency chunks are in flight at a time.
+
+        Returns:
+            Answer text (or the exception raised) for each request, in input order
+        """
+        settings = TASK_SETTINGS.get(task_type)
+        if not settings or settings['reasoning_format'] != 'raw':
+            responses = await self.batch_process(requests, model=model, task_type=task_type, **kwargs)
+            return [self._response_text(r) for r in responses]
+
+        groups: Dict[str, List[int]] = {}
+        for index, req in enumerate(requests):
+            system = '\n'.join(m['content'] for m in req['messages'] if m.get('role') == 'system')
+            groups.setdefault(system, []).append(index)
+
+        chunks = [
+            (system, indices[start:start + batch_size])
+            for system, indices in groups.items()
+            for start in range(0, len(indices), batch_size)
         ]
-        return await asyncio.gather(*tasks, return_exceptions=True)
+        kwargs.setdefault('temperature', settings['temperature'])
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(system: str, indices: List[int]) -> List[Union[str, Exception]]:
+            async with semaphore:
+                return await self._process_marshaled_chunk(
+                    system, [requests[i] for i in indices], model, task_type, kwargs
+                )
+
+        outputs = await asyncio.gather(*[run(system, indices) for system, indices in chunks])
+
+        results: List[Union[str, Exception]] = [None] * len(requests)
+        for (_, indices), answers in zip(chunks, outputs):
+            for index, answer in zip(indices, answers):
+                results[index] = answer
+        return results
+
+    async def _process_marshaled_chunk(self,
+                                       system: str,
+                                       chunk: List[Dict],
+                                       model: str,
+                                       task_type: str,
+                                       kwargs: Dict) -> List[Union[str, Exception]]:
+        """Answer one packed chunk, falling back to per-row calls on a bad reply."""
+        rows = [
+            '\n'.join(str(m.get('content') or '') for m in req['messages'] if m.get('role') == 'user')
+            for req in chunk
+        ]
+        count = len(rows)
+        messages = [
+            {"role": "system", "content": (
+                f"{system}\n\nYou will receive {count} independent inputs, each introduced by a "
+                f"---ROW i--- marker. Answer each one separately as instructed above. Return a JSON "
+                f"object {{\"results\": [...]}} whose results array has exactly {count} answer strings, "
+                f"in row order."
+            )},
+            {"role": "user", "content": ''.join(
+                MARSHAL_ROW_MARKER.format(index=index) + row for index, row in enumerate(rows)
+            )}
+        ]
+
+        try:
+            response = await self.process_with_retry(
+                messages=messages,
+                model=model,
+                **{
+                    **kwargs,
+                    'max_completion_tokens': count * MARSHAL_TOKENS_PER_ROW,
+                    'response_format': {"type": "json_object"}
+                }
+            )
+            answers = _loads(response.choices[0].message.content)['results']
+            if not isinstance(answers, list) or len(answers) != count:
+                raise ValueError(f"expected {count} results")
+            return [str(answer) for answer in answers]
+
+        except Exception as e:
+            logger.warning(f"Marshaled batch of {count} rows failed ({str(e)}), processing rows individually")
+            responses = await self.batch_process(chunk, model=model, task_type=task_type, **kwargs)
+            return [self._response_text(r) for r in responses]
+
+    @staticmethod
+    def _response_text(response: Union[ChatCompletion, Exception]) -> Union[str, Exception]:
+        """Extract the completion text, passing exceptions through."""
+        if isinstance(response, Exception):
+            return response
+        return response.choices[0].message.content
 
     def get_performance_metrics(self) -> Dict:
         """Get current performance metrics."""
-        return self.metrics['performance']
\ No newline at end of file
+        return self._metrics.performance()
@@ -49,3 +49,32 @@ TASK_SETTINGS = {
         'reasoning_format': 'parsed'
     }
 }
+
+# Flat lookup tables derived from the configurations above.
+# The first configuration listed for a model name wins.
+MODELS_BY_NAME = {}
+for _complexity in MODEL_CONFIGURATIONS.values():
+    for _model in _complexity.values():
+        MODELS_BY_NAME.setdefault(_model['name'], _model)
+del _complexity, _model
+
+PRIMARY_BY_TASK = {
+    task: MODEL_CONFIGURATIONS[settings['complexity']]['primary']
+    for task, settings in TASK_SETTINGS.items()
+}
+FALLBACK_BY_TASK = {
+    task: MODEL_CONFIGURATIONS[settings['complexity']]['fallback']
+    for task, settings in TASK_SETTINGS.items()
+}
+
+# Published per-model rate limits (requests and tokens per minute)
+MODEL_RATE_LIMITS = {
+    'llama-3.3-70b-versatile': {
+        'rpm': 30,
+        'tpm': 12000
+    },
+    'llama-3.1-8b-instant': {
+        'rpm': 30,
+        'tpm': 6000
+    }
+}
@@ -0,0 +1,66 @@
+"""
+Metrics Log Files
+
+Helpers for the append-only JSONL metrics logs written by the Groq client
+and the model manager.
+
+Several clients, and several worker processes, append to the same log.
+Appends and compactions therefore hold an exclusive advisory lock on a
+sidecar .lock file, and a compaction rebuilds its snapshot from the file
+itself so events written by other writers are kept.
+"""
+
+import json
+import os
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks (Windows); writers within one process still work
+    fcntl = None
+
+
+@contextmanager
+def locked(path: str) -> Iterator[None]:
+    """Hold an exclusive lock on a metrics log for appends and compaction."""
+    with open(f"{path}.lock", 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        # Closing the lock file releases the lock
+        yield
+
+
+def read_entries(path: str, loads: Callable = json.loads) -> Iterator[Dict]:
+    """
+    Yield the entries of a metrics log in order.
+
+    A missing log yields nothing; a torn final line from an interrupted
+    write is skipped.
+    """
+    try:
+        with open(path, 'rb') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    yield loads(line)
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        return
+
+
+def append(path: str, data: bytes):
+    """Append encoded lines to a metrics log."""
+    with open(path, 'ab') as f:
+        f.write(data)
+
+
+def replace(path: str, data: bytes):
+    """Atomically replace a metrics log with the given contents."""
+    temp_file = f"{path}.tmp"
+    with open(temp_file, 'wb') as f:
+        f.write(data)
+    os.replace(temp_file, path)
@@ -1,11 +1,62 @@
 import json
+import logging
+import os
+import weakref
 from datetime import datetime
-from typing import Dict, Optional
-from .constants import MODEL_CONFIGURATIONS, TASK_SETTINGS
+from typing import Callable, Dict, List, Optional
+from . import metrics_log
+from .constants import FALLBACK_BY_TASK, MODELS_BY_NAME, PRIMARY_BY_TASK, TASK_SETTINGS
+
+DEFAULT_TEMPERATURE = 0.7
+DEFAULT_MAX_COMPLETION_TOKENS = 4096
+# Entries kept per model, in memory and when the metrics log is compacted
+MODEL_METRICS_HISTORY_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+
+def _make_params(temperature: float) -> Callable[..., Dict]:
+    """
+    Build a request parameter factory with a task's defaults bound in.
+
+    reasoning_format is left out: the configured llama models are not
+    reasoning models and the API rejects it for them.
+    """
+    base = {
+        'temperature': temperature,
+        'max_completion_tokens': DEFAULT_MAX_COMPLETION_TOKENS,
+        'service_tier': None
+    }
+
+    def build(messages: List[Dict], model: str, **kwargs) -> Dict:
+        return {'model': model, 'messages': messages, **base, **kwargs}
+
+    return build
+
+
+# Chat completion parameter builders keyed by task type (None: no task)
+PARAM_BUILDERS = {None: _make_params(DEFAULT_TEMPERATURE)}
+PARAM_BUILDERS.update({
+    task: _make_params(settings['temperature'])
+    for task, settings in TASK_SETTINGS.items()
+})
+
+
+# Managers whose metrics logs are closed and compacted by close_model_managers() at shutdown
+_open_managers: 'weakref.WeakSet[ModelManager]' = weakref.WeakSet()
+
+
+def close_model_managers():
+    """Close and compact the metrics log of every open manager; call on app shutdown."""
+    for manager in list(_open_managers):
+        try:
+            manager.close()
+        except OSError as e:
+            logger.error(f"Failed to close model metrics log: {str(e)}")
 
 
 class ModelManager:
-    def __init__(self, service_tier: str = None, metrics_file: str = 'model_metrics.json'):
+    def __init__(self, service_tier: str = None, metrics_file: str = 'model_metrics.jsonl'):
         """
         Initialize the ModelManager with service tier and metrics tracking.
 
@@ -14,15 +65,46 @@ class ModelManager:
         """
         self.service_tier = service_tier
         self.metrics_file = metrics_file
+        self._metrics_fh = None
         self.performance_metrics = self._load_metrics()
+        _open_managers.add(self)
 
     def _load_metrics(self) -> Dict:
-        """Load existing performance metrics from file"""
-        try:
-            with open(self.metrics_file, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {'models': {}, 'tasks': {}}
+        """Load existing performance metrics by replaying the metrics log"""
+        metrics = {'models': {}, 'tasks': {}}
+        with metrics_log.locked(self.metrics_file):
+            for entry in metrics_log.read_entries(self.metrics_file):
+                model = entry.pop('model', None)
+                if model is not None:
+                    metrics['models'].setdefault(model, []).append(entry)
+        for model, entries in metrics['models'].items():
+            del entries[:-MODEL_METRICS_HISTORY_SIZE]
+        return metrics
+
+    def close(self):
+        """
+        Close the metrics log handle and compact the log.
+
+        The log is rebuilt from the file under its lock, keeping the most
+        recent MODEL_METRICS_HISTORY_SIZE entries per model from all writers.
+        """
+        _open_managers.discard(self)
+        with metrics_log.locked(self.metrics_file):
+            if self._metrics_fh is not None:
+                self._metrics_fh.close()
+                self._metrics_fh = None
+            if not os.path.exists(self.metrics_file):
+                return
+            by_model: Dict[str, List[Dict]] = {}
+            for entry in metrics_log.read_entries(self.metrics_file):
+                by_model.setdefault(entry.get('model'), []).append(entry)
+            kept = [
+                entry
+                for model, entries in by_model.items() if model is not None
+                for entry in entries[-MODEL_METRICS_HISTORY_SIZE:]
+            ]
+            kept.sort(key=lambda entry: entry.get('timestamp', ''))
+            metrics_log.replace(self.metrics_file, ''.join(json.dumps(entry) + '\n' for entry in kept).encode())
 
     def get_model_config(self, task_type: str, force_model: Optional[str] = None) -> Dict:
         """
@@ -36,25 +118,19 @@ class ModelManager:
             Dict containing model configuration
         """
         if force_model:
-            # Find and return forced model config
-            for complexity in MODEL_CONFIGURATIONS.values():
-                for model_type in complexity.values():
-                    if model_type['name'] == force_model:
-                        return model_type
-            raise ValueError(f"Forced model {force_model} not found in configurations")
-
-        # Get task complexity from settings
-        task_settings = TASK_SETTINGS.get(task_type)
-        if not task_settings:
-            raise ValueError(f"Unknown task type: {task_type}")
+            model_config = MODELS_BY_NAME.get(force_model)
+            if model_config is None:
+                raise ValueError(f"Forced model {force_model} not found in configurations")
+            return model_config
 
-        complexity = task_settings['complexity']
-        models = MODEL_CONFIGURATIONS[complexity]
+        primary = PRIMARY_BY_TASK.get(task_type)
+        if primary is None:
+            raise ValueError(f"Unknown task type: {task_type}")
 
         # Check performance metrics to decide between primary and fallback
-        if self._should_use_fallback(task_type, models['primary']['name']):
-            return models['fallback']
-        return models['primary']
+        if self._should_use_fallback(task_type, primary['name']):
+            return FALLBACK_BY_TASK[task_type]
+        return primary
 
     def _should_use_fallback(self, task_type: str, primary_model: str) -> bool:
         """Determine if we should use fallback based on recent performance"""
@@ -76,12 +152,29 @@ class ModelManager:
         if model not in self.performance_metrics['models']:
             self.performance_metrics['models'][model] = []
 
-        self.performance_metrics['models'][model].append({
+        entry = {
             'timestamp': timestamp,
             'task_type': task_type,
             **metrics
-        })
-
-        # Save updated metrics
-        with open(self.metrics_file, 'w') as f:
-            json.dump(self.performance_metrics, f, indent=2)
\ No newline at end of file
+        }
+        history = self.performance_metrics['models'][model]
+        history.append(entry)
+        del history[:-MODEL_METRICS_HISTORY_SIZE]
+
+        # Append only the new entry; line buffering writes it out immediately
+        with metrics_log.locked(self.metrics_file):
+            self._open_metrics_log().write(json.dumps({'model': model, **entry}) + '\n')
+
+    def _open_metrics_log(self):
+        """Return the append handle, reopening it if the log was compacted since."""
+        if self._metrics_fh is not None:
+            try:
+                current = os.stat(self.metrics_file).st_ino
+            except FileNotFoundError:
+                current = None
+            if current != os.fstat(self._metrics_fh.fileno()).st_ino:
+                self._metrics_fh.close()
+                self._metrics_fh = None
+        if self._metrics_fh is None:
+            self._metrics_fh = open(self.metrics_file, 'a', buffering=1)
+        return self._metrics_fh
\ No newline at end of file
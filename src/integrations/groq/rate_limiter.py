@@ -0,0 +1,149 @@
+"""
+Client-side Rate Limiting
+
+Token buckets used by the Groq client to pace requests against the
+published per-model RPM/TPM limits, so calls queue locally instead of
+spending a round trip on a 429.
+
+Groq enforces the limits per API key, so the buckets are shared by every
+client in the process that uses the same key, including clients running on
+different event loops. Limits can be overridden
+with GROQ_MODEL_RATE_LIMITS, a JSON object such as
+{"llama-3.3-70b-versatile": {"rpm": 1000, "tpm": 300000}}.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from typing import Dict, Optional, Tuple
+
+from .constants import MODEL_RATE_LIMITS
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITS_ENV = 'GROQ_MODEL_RATE_LIMITS'
+
+
+class AsyncTokenBucket:
+    """
+    Token bucket refilled continuously at `rate` tokens per second.
+
+    The token count is guarded by a thread lock so one bucket can serve
+    several event loops; waiters queue on a lock owned by their own loop.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Initialize a full bucket.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum number of tokens held
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last = time.monotonic()
+        self._state_lock = threading.Lock()
+        self._loop_locks: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]' = (
+            weakref.WeakKeyDictionary()
+        )
+
+    @classmethod
+    def per_minute(cls, limit: float) -> 'AsyncTokenBucket':
+        """Create a bucket allowing `limit` tokens per minute."""
+        return cls(rate=limit / 60, capacity=limit)
+
+    def _refill(self):
+        """Add the tokens accrued since the last update; call with _state_lock held."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    def _waiter_lock(self) -> asyncio.Lock:
+        """Get the lock queueing this bucket's waiters on the running loop."""
+        loop = asyncio.get_running_loop()
+        with self._state_lock:
+            lock = self._loop_locks.get(loop)
+            if lock is None:
+                lock = self._loop_locks[loop] = asyncio.Lock()
+            return lock
+
+    async def acquire(self, cost: float = 1) -> float:
+        """
+        Wait until `cost` tokens are available and take them.
+
+        Waiters on the same event loop are served in arrival order. Costs
+        above the capacity are clamped so oversized requests wait for a
+        full bucket instead of forever.
+
+        Returns:
+            The number of tokens taken
+        """
+        cost = min(cost, self.capacity)
+        async with self._waiter_lock():
+            while True:
+                with self._state_lock:
+                    self._refill()
+                    if self.tokens >= cost:
+                        self.tokens -= cost
+                        return cost
+                    wait = (cost - self.tokens) / self.rate
+                await asyncio.sleep(wait)
+
+    def refund(self, amount: float):
+        """Return tokens that were reserved but not used."""
+        if amount > 0:
+            with self._state_lock:
+                self._refill()
+                self.tokens = min(self.capacity, self.tokens + amount)
+
+
+def model_rate_limits() -> Dict[str, Dict[str, float]]:
+    """
+    Per-model limits: the published defaults updated from GROQ_MODEL_RATE_LIMITS.
+
+    An unparsable override is logged and ignored.
+    """
+    limits = {model: dict(values) for model, values in MODEL_RATE_LIMITS.items()}
+    raw = os.getenv(RATE_LIMITS_ENV)
+    if not raw:
+        return limits
+    try:
+        overrides = json.loads(raw)
+        for model, values in overrides.items():
+            limits.setdefault(model, {}).update(values)
+    except (ValueError, AttributeError) as e:
+        logger.warning(f"Ignoring invalid {RATE_LIMITS_ENV}: {str(e)}")
+        return {model: dict(values) for model, values in MODEL_RATE_LIMITS.items()}
+    return {model: values for model, values in limits.items() if 'rpm' in values and 'tpm' in values}
+
+
+_shared_buckets: Dict[Tuple[str, str], Tuple[AsyncTokenBucket, AsyncTokenBucket]] = {}
+_shared_lock = threading.Lock()
+
+
+def model_buckets(api_key: str, model: str) -> Optional[Tuple[AsyncTokenBucket, AsyncTokenBucket]]:
+    """
+    Get the process-wide (RPM, TPM) buckets for an API key and model.
+
+    Returns:
+        The shared bucket pair, or None if the model has no known limits
+    """
+    key = (hashlib.sha256(api_key.encode()).hexdigest(), model)
+    buckets = _shared_buckets.get(key)
+    if buckets is not None:
+        return buckets
+    limits = model_rate_limits().get(model)
+    if limits is None:
+        return None
+    with _shared_lock:
+        return _shared_buckets.setdefault(key, (
+            AsyncTokenBucket.per_minute(limits['rpm']),
+            AsyncTokenBucket.per_minute(limits['tpm'])
+        ))
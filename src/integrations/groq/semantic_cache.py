@@ -0,0 +1,207 @@
+"""
+Semantic Response Cache
+
+Near-duplicate prompt cache for the Groq client. User-role message content
+is embedded with a local sentence-transformers model and looked up in a
+FAISS HNSW index; a hit above the cosine similarity threshold returns the
+stored completion instead of calling the API.
+
+Both sentence-transformers and faiss are optional. When either is missing
+SemanticCache.available() returns False and the client skips this layer.
+
+Design Considerations:
+- Entries are partitioned by model and system prompt so that different
+  classification prompts over the same email never share answers
+- Embedding and search are CPU-bound; callers run them off the event loop
+- At most SEMANTIC_CACHE_MAX_ENTRIES completions are kept; the least
+  recently used partitions are evicted first
+- Partitions are persisted under data/secure and saved when the client
+  is closed at application shutdown
+
+Privacy: cached completions are answers about email content, so the
+persisted completions are encrypted with the storage encryption key. The
+FAISS indexes hold only embedding vectors and are stored unencrypted;
+embeddings can leak some information about the original text, which is
+why they live under the access-restricted data/secure directory.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from groq.types.chat import ChatCompletion
+
+from src.storage.encryption import decrypt_value, encrypt_value
+
+try:
+    import faiss
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    faiss = None
+    np = None
+    SentenceTransformer = None
+
+logger = logging.getLogger(__name__)
+
+SEMANTIC_CACHE_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
+SEMANTIC_CACHE_DIM = 384
+SEMANTIC_CACHE_HNSW_M = 32
+SEMANTIC_CACHE_THRESHOLD = 0.92
+SEMANTIC_CACHE_DIRECTORY = os.path.join('data', 'secure', 'semantic_cache')
+# Total completions kept across all partitions
+SEMANTIC_CACHE_MAX_ENTRIES = 10000
+
+
+class SemanticCache:
+    """Embedding-based cache of completions for near-duplicate prompts."""
+
+    def __init__(self,
+                 directory: str = SEMANTIC_CACHE_DIRECTORY,
+                 threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 model_name: str = SEMANTIC_CACHE_MODEL,
+                 max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES):
+        """Initialize the cache and load any persisted indexes."""
+        self.directory = directory
+        self.threshold = threshold
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self._encoder = None
+        self._lock = threading.Lock()
+        # Partitions in least to most recently used order
+        self._namespaces: OrderedDict[str, Tuple[object, List[ChatCompletion]]] = OrderedDict()
+        self._entries = 0
+        self._dirty = set()
+        self._evicted = set()
+        self._load()
+
+    @staticmethod
+    def available() -> bool:
+        """Return True when the optional embedding dependencies are installed."""
+        return faiss is not None and SentenceTransformer is not None
+
+    @staticmethod
+    def _namespace(model: str, messages: List[Dict]) -> str:
+        """Partition key built from the model and all non-user messages."""
+        context = [m for m in messages if m.get('role') != 'user']
+        canonical = json.dumps([model, context], sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode()).hexdigest()[:32]
+
+    @staticmethod
+    def _query_text(messages: List[Dict]) -> str:
+        """Canonicalize a conversation to the concatenated user-role content."""
+        return '\n'.join(str(m.get('content', '')) for m in messages if m.get('role') == 'user')
+
+    def _embed(self, text: str):
+        """Encode text to a normalized float32 row vector."""
+        if self._encoder is None:
+            self._encoder = SentenceTransformer(self.model_name)
+        vector = self._encoder.encode([text], normalize_embeddings=True)
+        return np.asarray(vector, dtype='float32')
+
+    @staticmethod
+    def _new_index():
+        """Create an empty HNSW index scored by inner product (cosine on unit vectors)."""
+        return faiss.IndexHNSWFlat(SEMANTIC_CACHE_DIM, SEMANTIC_CACHE_HNSW_M, faiss.METRIC_INNER_PRODUCT)
+
+    def lookup(self, model: str, messages: List[Dict]) -> Optional[ChatCompletion]:
+        """Return a cached completion for a sufficiently similar prompt, if any."""
+        namespace = self._namespace(model, messages)
+        with self._lock:
+            entry = self._namespaces.get(namespace)
+            if entry is None or entry[0].ntotal == 0:
+                return None
+            index, responses = entry
+            self._namespaces.move_to_end(namespace)
+            scores, ids = index.search(self._embed(self._query_text(messages)), 1)
+
+        if ids[0][0] >= 0 and scores[0][0] >= self.threshold:
+            return responses[ids[0][0]]
+        return None
+
+    def store(self, model: str, messages: List[Dict], response: ChatCompletion):
+        """Add a completion to the cache."""
+        namespace = self._namespace(model, messages)
+        with self._lock:
+            vector = self._embed(self._query_text(messages))
+            if namespace not in self._namespaces:
+                self._namespaces[namespace] = (self._new_index(), [])
+            self._namespaces.move_to_end(namespace)
+            index, responses = self._namespaces[namespace]
+            index.add(vector)
+            responses.append(response)
+            self._entries += 1
+            self._dirty.add(namespace)
+            self._evicted.discard(namespace)
+            self._evict()
+
+    def _evict(self):
+        """
+        Drop least recently used partitions until the cache fits max_entries.
+
+        HNSW indexes cannot remove vectors, so a single partition over the
+        limit is rebuilt with its newest three quarters of max_entries.
+        """
+        while self._entries > self.max_entries and len(self._namespaces) > 1:
+            namespace, (index, _) = self._namespaces.popitem(last=False)
+            self._entries -= index.ntotal
+            self._dirty.discard(namespace)
+            self._evicted.add(namespace)
+
+        if self._entries > self.max_entries:
+            namespace, (index, responses) = next(iter(self._namespaces.items()))
+            keep = self.max_entries * 3 // 4
+            vectors = index.reconstruct_n(index.ntotal - keep, keep)
+            trimmed = self._new_index()
+            trimmed.add(vectors)
+            self._namespaces[namespace] = (trimmed, responses[-keep:])
+            self._entries = keep
+            self._dirty.add(namespace)
+
+    def _load(self):
+        """Load persisted indexes and their completions."""
+        if not self.available() or not os.path.isdir(self.directory):
+            return
+
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.faiss'):
+                continue
+            namespace = filename[:-len('.faiss')]
+            try:
+                index = faiss.read_index(os.path.join(self.directory, filename))
+                with open(os.path.join(self.directory, f"{namespace}.json"), 'r') as f:
+                    stored = json.loads(decrypt_value(f.read()))
+                responses = [ChatCompletion.model_validate(r) for r in stored]
+                if index.ntotal != len(responses):
+                    raise ValueError("index and response counts differ")
+                self._namespaces[namespace] = (index, responses)
+                self._entries += index.ntotal
+            except Exception as e:
+                logger.warning(f"Discarding semantic cache partition {namespace}: {str(e)}")
+        self._evict()
+
+    def save(self):
+        """Persist partitions that changed since the last save and remove evicted ones."""
+        with self._lock:
+            for namespace in self._evicted:
+                for suffix in ('.faiss', '.json'):
+                    try:
+                        os.remove(os.path.join(self.directory, f"{namespace}{suffix}"))
+                    except FileNotFoundError:
+                        pass
+            self._evicted.clear()
+
+            if not self._dirty:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            for namespace in self._dirty:
+                index, responses = self._namespaces[namespace]
+                faiss.write_index(index, os.path.join(self.directory, f"{namespace}.faiss"))
+                payload = json.dumps([r.model_dump(mode='json') for r in responses])
+                with open(os.path.join(self.directory, f"{namespace}.json"), 'w') as f:
+                    f.write(encrypt_value(payload))
+            self._dirty.clear()
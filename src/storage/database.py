@@ -13,16 +13,31 @@ Design Considerations:
 """
 
 import os
+import json
+import asyncio
 import logging
-from contextlib import contextmanager
-from typing import Generator, Any
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncGenerator, Dict, Generator, List, Any, Optional
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, insert, inspect
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import QueuePool
 
-from src.storage.models import Base
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+except ImportError:
+    AsyncSession = None
+    async_sessionmaker = None
+    create_async_engine = None
+
+from src.storage.models import Base, User, OAuthToken, SchemaMigration
 from src.storage.encryption import encrypt_value, decrypt_value
 
 logger = logging.getLogger(__name__)
@@ -32,6 +47,26 @@ DB_PATH = os.getenv("DATABASE_URL", "sqlite:///data/secure/sentient_inbox.db")
 DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
 DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
 DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Feature flag for the async engine; the sync engine stays the default
+# until all callers have migrated
+DB_ASYNC = os.getenv("DB_ASYNC", "False").lower() == "true"
+
+# Async driver substituted for each sync URL scheme
+ASYNC_DRIVERS = {
+    "sqlite://": "sqlite+aiosqlite://",
+    "postgresql://": "postgresql+asyncpg://",
+}
+
+def _json_serializer(value: Any) -> str:
+    """Serialize JSON column values with orjson; drivers expect str."""
+    return orjson.dumps(value).decode()
+
+# JSON columns (user permissions) are encoded with orjson when it is
+# installed; SQLAlchemy falls back to the stdlib json module otherwise
+JSON_ENGINE_ARGS = (
+    {"json_serializer": _json_serializer, "json_deserializer": orjson.loads}
+    if orjson is not None else {}
+)
 
 # Initialize engine with connection pooling
 engine = create_engine(
@@ -41,12 +76,73 @@ engine = create_engine(
     max_overflow=DB_MAX_OVERFLOW,
     pool_timeout=DB_POOL_TIMEOUT,
     connect_args={"check_same_thread": False} if DB_PATH.startswith("sqlite") else {},
-    echo=os.getenv("SQL_ECHO", "False").lower() == "true"
+    echo=os.getenv("SQL_ECHO", "False").lower() == "true",
+    **JSON_ENGINE_ARGS
+)
+
+# Connection pragmas applied to every new SQLite connection: WAL lets
+# readers run alongside a writer and NORMAL sync only fsyncs at checkpoints
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-64000",
 )
 
+def _set_sqlite_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+    """Apply SQLITE_PRAGMAS to a freshly opened DBAPI connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+if DB_PATH.startswith("sqlite"):
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Session shared by every get_db_session() call within one request; set by
+# request_db_session() so a request commits once instead of per operation
+request_session: ContextVar[Optional[Session]] = ContextVar("request_session", default=None)
+
+def get_async_url(url: str) -> str:
+    """
+    Rewrite a sync database URL to use its async driver.
+
+    Args:
+        url: Database URL as configured in DATABASE_URL
+
+    Returns:
+        str: URL with the async driver, or the input if it already names one
+    """
+    for scheme, async_scheme in ASYNC_DRIVERS.items():
+        if url.startswith(scheme):
+            return async_scheme + url[len(scheme):]
+    return url
+
+# Async engine and session factory, created only when enabled so the
+# async extras (greenlet and the async drivers) remain optional
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    if create_async_engine is None:
+        raise RuntimeError("DB_ASYNC requires sqlalchemy[asyncio] to be installed")
+    async_engine = create_async_engine(
+        get_async_url(DB_PATH),
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        echo=os.getenv("SQL_ECHO", "False").lower() == "true",
+        **JSON_ENGINE_ARGS
+    )
+    if DB_PATH.startswith("sqlite"):
+        event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
 def init_db() -> None:
     """
     Initialize database with proper schema creation and migration handling.
@@ -58,11 +154,131 @@ def init_db() -> None:
     try:
         logger.info("Initializing database schema")
         Base.metadata.create_all(bind=engine)
+
+        # Migrations run first: some clean up rows that would violate an
+        # index introduced later
+        run_migrations()
+
+        # create_all skips existing tables, so add indexes introduced later
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=engine, checkfirst=True)
         logger.info("Database schema initialized successfully")
     except Exception as e:
         logger.error(f"Database initialization failed: {str(e)}")
         raise RuntimeError(f"Failed to initialize database: {str(e)}")
 
+def run_migrations() -> List[str]:
+    """
+    Apply registered data migrations that have not run yet.
+
+    Each migration runs once; its name is then recorded in the
+    schema_migrations table so later startups skip it. Does nothing
+    until create_all() has created the tables.
+
+    Returns:
+        List[str]: Names of the migrations applied by this call
+    """
+    tables = inspect(engine).get_table_names()
+    if SchemaMigration.__tablename__ not in tables or User.__tablename__ not in tables:
+        logger.warning("Skipping data migrations: schema has not been created")
+        return []
+
+    with get_db_session() as session:
+        done = {name for (name,) in session.query(SchemaMigration.name)}
+
+    applied = []
+    for name, migration in MIGRATIONS:
+        if name in done:
+            continue
+        logger.info(f"Applying data migration {name}")
+        migration()
+        with get_db_session() as session:
+            session.add(SchemaMigration(name=name))
+        applied.append(name)
+    return applied
+
+def migrate_permissions() -> int:
+    """
+    Re-parse user permissions that were stored as JSON-encoded strings.
+
+    Earlier versions wrote json.dumps(list) into the JSON column, so the
+    value round-tripped as a string. Rewrites those rows as real lists.
+
+    Returns:
+        int: Number of users migrated
+    """
+    migrated = 0
+    with get_db_session() as session:
+        for user_id, permissions in session.query(User.id, User.permissions):
+            if isinstance(permissions, str):
+                session.query(User).filter(User.id == user_id).update(
+                    {User.permissions: json.loads(permissions)}, synchronize_session=False
+                )
+                migrated += 1
+    if migrated:
+        logger.info(f"Migrated permissions for {migrated} users")
+    return migrated
+
+def migrate_unique_provider_tokens() -> int:
+    """
+    Enforce one OAuth token per user and provider on existing databases.
+
+    Tables created before uq_user_provider existed may hold several rows
+    for the same (user_id, provider). Keeps the most recently updated row
+    of each pair, then creates the unique index save_oauth_token's upsert
+    depends on.
+
+    Returns:
+        int: Number of duplicate tokens removed
+    """
+    unique_index = next(
+        index for index in OAuthToken.__table__.indexes if index.name == "uq_user_provider"
+    )
+    with get_db_session() as session:
+        seen = set()
+        duplicates = []
+        rows = session.query(OAuthToken.id, OAuthToken.user_id, OAuthToken.provider).order_by(
+            OAuthToken.updated_at.desc(), OAuthToken.created_at.desc()
+        )
+        for token_id, user_id, provider in rows:
+            if (user_id, provider) in seen:
+                duplicates.append(token_id)
+            else:
+                seen.add((user_id, provider))
+        if duplicates:
+            session.query(OAuthToken).filter(OAuthToken.id.in_(duplicates)).delete(synchronize_session=False)
+        unique_index.create(bind=session.connection(), checkfirst=True)
+    if duplicates:
+        logger.info(f"Removed {len(duplicates)} duplicate OAuth tokens")
+    return len(duplicates)
+
+# One-off data migrations in the order they are applied; never rename an entry
+MIGRATIONS = (
+    ("0001_permissions_json_lists", migrate_permissions),
+    ("0002_oauth_tokens_unique_provider", migrate_unique_provider_tokens),
+)
+
+def bulk_insert_tokens(rows: List[Dict[str, Any]]) -> int:
+    """
+    Insert many OAuth tokens with a single multi-row INSERT.
+
+    Bypasses ORM object construction; token columns are still encrypted
+    by their column type and omitted timestamps take the column defaults.
+
+    Args:
+        rows: Column dictionaries with plaintext access/refresh tokens
+
+    Returns:
+        int: Number of rows inserted
+    """
+    if not rows:
+        return 0
+    with get_db_session() as session:
+        session.execute(insert(OAuthToken), rows)
+    logger.info(f"Bulk inserted {len(rows)} OAuth tokens")
+    return len(rows)
+
 @contextmanager
 def get_db_session() -> Generator[Session, None, None]:
     """
@@ -71,12 +287,20 @@ def get_db_session() -> Generator[Session, None, None]:
     Implements comprehensive session lifecycle management with proper
     error handling, rollback on exceptions, and guaranteed cleanup.
     
+    Inside request_db_session() the request's session is yielded instead;
+    committing, rolling back and closing it are then left to the request.
+    
     Yields:
         SQLAlchemy session for database operations
         
     Raises:
         Exception: Re-raises any exceptions that occur during session use
     """
+    shared = request_session.get()
+    if shared is not None:
+        yield shared
+        return
+
     session = SessionLocal()
     try:
         yield session
@@ -86,4 +310,62 @@ def get_db_session() -> Generator[Session, None, None]:
         logger.error(f"Database session error: {str(e)}")
         raise
     finally:
-        session.close()
\ No newline at end of file
+        session.close()
+
+@asynccontextmanager
+async def request_db_session() -> AsyncGenerator[Session, None]:
+    """
+    Share one session across all database work of a request.
+
+    Every get_db_session() call made while this context is active (also
+    from worker threads started with asyncio.to_thread, which copy the
+    context) uses the same session, so the request commits once. The
+    commit, rollback and close run in a worker thread to keep the event
+    loop free.
+
+    Yields:
+        SQLAlchemy session shared by the request
+
+    Raises:
+        Exception: Re-raises any exceptions raised while handling the request
+    """
+    session = SessionLocal()
+    token = request_session.set(session)
+    try:
+        yield session
+        await asyncio.to_thread(session.commit)
+    except Exception as e:
+        await asyncio.to_thread(session.rollback)
+        logger.error(f"Database session error: {str(e)}")
+        raise
+    finally:
+        request_session.reset(token)
+        await asyncio.to_thread(session.close)
+
+@asynccontextmanager
+async def get_async_db_session() -> AsyncGenerator["AsyncSession", None]:
+    """
+    Provide an async database session that does not block the event loop.
+
+    Mirrors get_db_session: commits on success, rolls back on error and
+    always closes the session. Requires DB_ASYNC=true and the async driver
+    for the configured backend (aiosqlite or asyncpg).
+
+    Yields:
+        SQLAlchemy AsyncSession for database operations
+
+    Raises:
+        RuntimeError: If the async engine is not enabled
+        Exception: Re-raises any exceptions that occur during session use
+    """
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async database access is disabled; set DB_ASYNC=true")
+
+    async with AsyncSessionLocal() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Database session error: {str(e)}")
+            raise
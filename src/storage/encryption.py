@@ -6,30 +6,37 @@ with proper key management, initialization vector handling, and
 comprehensive error management.
 
 Design Considerations:
-- Industry-standard AES-256 encryption
-- Proper IV generation and handling
+- Industry-standard AES-256-GCM encryption with one cipher reused per process
+- Proper nonce generation and handling
 - Comprehensive error management
 - Key derivation from environment secrets
+- Values written by the earlier Fernet scheme remain decryptable
 """
 
 import os
 import base64
 import logging
-from typing import Optional, Union
+from typing import List, Optional, Union
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 
 logger = logging.getLogger(__name__)
 
+# Earlier versions wrote the generated key here in plaintext; it is no longer read or written
+LEGACY_KDF_CACHE_FILE = os.path.join('data', 'secure', '.kdf_cache')
+
 # Load encryption key from environment or generate one
 def get_encryption_key() -> bytes:
     """
     Get or generate a secure encryption key for token encryption.
     
-    Loads encryption key from environment variable if available,
-    otherwise generates a secure key using system entropy and
-    PBKDF2 key derivation.
+    Loads encryption key from environment variable if available. A value
+    that decodes to exactly 32 bytes is already a Fernet key and is used
+    as-is; otherwise the decoded value is treated as the key. Without a
+    usable environment key, a random key is generated that lives only in
+    this process's memory.
     
     Returns:
         bytes: Encryption key in bytes format
@@ -37,19 +44,22 @@ def get_encryption_key() -> bytes:
     key_str = os.getenv("TOKEN_ENCRYPTION_KEY")
     if key_str:
         try:
-            return base64.urlsafe_b64decode(key_str)
+            decoded = base64.urlsafe_b64decode(key_str)
+            if len(decoded) == 32:
+                # Raw 32-byte key: no derivation needed
+                return key_str.encode('ascii')
+            return decoded
         except Exception as e:
             logger.warning(f"Invalid encryption key format, generating new key: {str(e)}")
+
+    if os.path.exists(LEGACY_KDF_CACHE_FILE):
+        logger.warning(
+            f"Ignoring plaintext key file {LEGACY_KDF_CACHE_FILE}. Move its key into "
+            "TOKEN_ENCRYPTION_KEY to keep reading data encrypted with it, then delete the file."
+        )
     
-    # Generate a secure key using PBKDF2
-    salt = os.urandom(16)
-    kdf = PBKDF2HMAC(
-        algorithm=hashes.SHA256(),
-        length=32,
-        salt=salt,
-        iterations=100000,
-    )
-    key = base64.urlsafe_b64encode(kdf.derive(os.urandom(32)))
+    # A random 32-byte key needs no key derivation
+    key = base64.urlsafe_b64encode(os.urandom(32))
     
     # Log warning that we're using a generated key
     logger.warning(
@@ -59,21 +69,76 @@ def get_encryption_key() -> bytes:
     
     return key
 
-# Initialize Fernet cipher with the encryption key
+# Version byte prefixed to AES-GCM payloads (Fernet tokens always start with 0x80)
+AESGCM_VERSION = b'\x01'
+NONCE_SIZE = 12
+GCM_TAG_SIZE = 16
+
+def _derive_aes_key(fernet_key: bytes) -> bytes:
+    """
+    Derive the AES-256-GCM key from the Fernet key material.
+
+    HKDF keeps the AES key independent from the Fernet signing and
+    encryption halves while needing no additional secret.
+    """
+    return HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=None,
+        info=b'sentient-inbox token encryption aes-gcm',
+    ).derive(base64.urlsafe_b64decode(fernet_key))
+
+# Initialize ciphers with the encryption key. Fernet is kept to decrypt
+# values written before the switch to AES-GCM.
 try:
     FERNET_KEY = get_encryption_key()
     cipher_suite = Fernet(FERNET_KEY)
+    aes_cipher = AESGCM(_derive_aes_key(FERNET_KEY))
     logger.info("Encryption system initialized successfully")
 except Exception as e:
     logger.error(f"Failed to initialize encryption system: {str(e)}")
     raise RuntimeError(f"Encryption system initialization failed: {str(e)}")
 
+def encrypt_many(values: List[Union[str, bytes, None]]) -> List[Optional[str]]:
+    """
+    Encrypt a batch of sensitive values with a single cipher instance.
+
+    Nonces for the whole batch come from one os.urandom call. Each result
+    is the base64 encoding of version byte, 12-byte nonce and ciphertext.
+
+    Args:
+        values: String or bytes values to encrypt (None entries are preserved)
+
+    Returns:
+        List[Optional[str]]: Base64-encoded encrypted values in input order
+
+    Raises:
+        ValueError: If encryption fails
+    """
+    try:
+        nonces = os.urandom(NONCE_SIZE * len(values))
+        results = []
+        for i, value in enumerate(values):
+            if value is None:
+                results.append(None)
+                continue
+
+            # Convert to bytes if string
+            value_bytes = value.encode('utf-8') if isinstance(value, str) else value
+            nonce = nonces[i * NONCE_SIZE:(i + 1) * NONCE_SIZE]
+            encrypted = aes_cipher.encrypt(nonce, value_bytes, None)
+            results.append(base64.urlsafe_b64encode(AESGCM_VERSION + nonce + encrypted).decode('utf-8'))
+        return results
+    except Exception as e:
+        logger.error(f"Encryption error: {str(e)}")
+        raise ValueError(f"Failed to encrypt value: {str(e)}")
+
 def encrypt_value(value: Union[str, bytes]) -> str:
     """
     Encrypt a sensitive value with proper error handling.
     
-    Implements secure encryption using Fernet symmetric encryption
-    with comprehensive error handling and type conversion.
+    Implements secure encryption using AES-256-GCM authenticated
+    encryption with comprehensive error handling and type conversion.
     
     Args:
         value: String or bytes value to encrypt
@@ -86,27 +151,15 @@ def encrypt_value(value: Union[str, bytes]) -> str:
     """
     if value is None:
         return None
-        
-    try:
-        # Convert to bytes if string
-        if isinstance(value, str):
-            value_bytes = value.encode('utf-8')
-        else:
-            value_bytes = value
-            
-        # Encrypt and return as string
-        encrypted = cipher_suite.encrypt(value_bytes)
-        return base64.urlsafe_b64encode(encrypted).decode('utf-8')
-    except Exception as e:
-        logger.error(f"Encryption error: {str(e)}")
-        raise ValueError(f"Failed to encrypt value: {str(e)}")
+
+    return encrypt_many([value])[0]
 
 def decrypt_value(encrypted_value: str) -> str:
     """
     Decrypt an encrypted value with proper error handling.
     
-    Implements secure decryption using Fernet symmetric encryption
-    with comprehensive error handling and type conversion.
+    Accepts AES-GCM values produced by encrypt_value as well as legacy
+    Fernet tokens, with comprehensive error handling and type conversion.
     
     Args:
         encrypted_value: Base64-encoded encrypted value
@@ -123,7 +176,12 @@ def decrypt_value(encrypted_value: str) -> str:
     try:
         # Decode base64 and decrypt
         encrypted_bytes = base64.urlsafe_b64decode(encrypted_value)
-        decrypted = cipher_suite.decrypt(encrypted_bytes)
+        if (encrypted_bytes[:1] == AESGCM_VERSION
+                and len(encrypted_bytes) >= 1 + NONCE_SIZE + GCM_TAG_SIZE):
+            nonce = encrypted_bytes[1:1 + NONCE_SIZE]
+            decrypted = aes_cipher.decrypt(nonce, encrypted_bytes[1 + NONCE_SIZE:], None)
+        else:
+            decrypted = cipher_suite.decrypt(encrypted_bytes)
         return decrypted.decode('utf-8')
     except Exception as e:
         logger.error(f"Decryption error: {str(e)}")
@@ -13,17 +13,40 @@ Design Considerations:
 - Clear documentation of field purposes
 """
 
-import json
 import uuid
 from datetime import datetime
 from typing import Dict, List, Optional, Any, Set
 
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Text, Integer, JSON
+from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Text, Integer, JSON, Index, func
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, backref
+from sqlalchemy.types import TypeDecorator
+
+from src.storage.encryption import encrypt_value, decrypt_value
 
 Base = declarative_base()
 
+# JSON everywhere, stored as binary JSONB on PostgreSQL
+JSONList = JSON().with_variant(JSONB(), 'postgresql')
+
+class EncryptedText(TypeDecorator):
+    """
+    Text column encrypted transparently at the ORM boundary.
+
+    Values are encrypted when bound to a statement and decrypted once when
+    a row is loaded; attribute access afterwards returns the cached
+    plaintext without further cipher work.
+    """
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return encrypt_value(value) if value is not None else None
+
+    def process_result_value(self, value, dialect):
+        return decrypt_value(value) if value is not None else None
+
 class User(Base):
     """
     User model storing core user information with OAuth provider linkage.
@@ -41,7 +64,7 @@ class User(Base):
     
     # User permissions and status
     is_active = Column(Boolean, default=True, nullable=False)
-    permissions = Column(JSON, nullable=False, default=lambda: json.dumps(["view"]))
+    permissions = Column(JSONList, nullable=False, default=lambda: ["view"])
     
     # Profile information (optional)
     profile_picture = Column(String(500), nullable=True)
@@ -62,7 +85,7 @@ class User(Base):
             "username": self.username,
             "display_name": self.display_name,
             "is_active": self.is_active,
-            "permissions": json.loads(self.permissions) if isinstance(self.permissions, str) else self.permissions,
+            "permissions": self.permissions,
             "profile_picture": self.profile_picture,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "last_login": self.last_login.isoformat() if self.last_login else None,
@@ -87,23 +110,42 @@ class OAuthToken(Base):
     provider_user_id = Column(String(255), nullable=False)
     provider_email = Column(String(255), nullable=False)
     
-    # Token data (encrypted in the database)
-    access_token = Column(Text, nullable=False)
-    refresh_token = Column(Text, nullable=True)
+    # Token data (encrypted in the database, plaintext on the instance)
+    access_token = Column(EncryptedText, nullable=False)
+    refresh_token = Column(EncryptedText, nullable=True)
     token_type = Column(String(50), nullable=False, default="Bearer")
     expires_at = Column(DateTime, nullable=False)
     
     # Scopes granted
     scopes = Column(Text, nullable=False)
     
-    # Metadata
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    # Metadata (server defaults cover rows inserted outside the ORM)
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, server_default=func.now(),
+                        onupdate=datetime.utcnow, nullable=False)
     
     # Relationships
     user = relationship("User", back_populates="oauth_tokens")
     
-    # Unique constraint: one provider per user
+    # One provider per user, declared as a unique index so init_db() can
+    # add it to tables created before it existed (the upsert in
+    # save_oauth_token relies on it). Other indexes cover lookup by
+    # provider identity and the expiry scan used for token refresh.
     __table_args__ = (
+        Index('uq_user_provider', 'user_id', 'provider', unique=True),
+        Index('ix_provider_user', 'provider', 'provider_user_id'),
+        Index('ix_expires_at', 'expires_at'),
         {'sqlite_autoincrement': True},
-    )
\ No newline at end of file
+    )
+
+class SchemaMigration(Base):
+    """
+    Record of a one-off data migration that has been applied.
+
+    init_db() runs each registered migration once and records it here,
+    so later startups skip migrations that already ran.
+    """
+    __tablename__ = "schema_migrations"
+
+    name = Column(String(100), primary_key=True)
+    applied_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -12,16 +12,103 @@ from typing import Any, Dict, List, Optional, Tuple, Set
 
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows: backups always use a full copy
 
 logger = logging.getLogger(__name__)
 
 # Constants for security settings
 KEY_ROTATION_DAYS = 30
 BACKUP_RETENTION_DAYS = 7
-MAX_RETRIES = 1
-RETRY_DELAY = 3  # seconds
 WEEKLY_HISTORY_DAYS = 7
+RECORD_LOG_MAX_BYTES = 1024 * 1024  # Compact the append log beyond this size
+RECORD_FRAME_HEADER = 4  # Big-endian length prefix of each log frame
+BACKUP_MIN_INTERVAL = 300  # seconds between routine backups
+FICLONE = 0x40049409  # Linux ioctl sharing a file's extents (reflink)
+AEAD_MAGIC = b"\x02"  # Leads AES-GCM tokens; Fernet tokens are base64 text
+AEAD_NONCE_SIZE = 12
+AEAD_INFO = b"sentient-inbox secure storage aes-256-gcm"
+
+# Keys every stored data structure must carry
+REQUIRED_KEYS = frozenset({"records", "metadata"})
+METADATA_KEYS = frozenset({"last_cleanup", "last_key_rotation", "last_backup", "data_version"})
+
+
+def _dumps(obj: Any, sort_keys: bool = False) -> bytes:
+    """Serialize to JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else None)
+    return json.dumps(obj, sort_keys=sort_keys).encode()
+
+
+def _fdatasync(fd: int):
+    """Flush a file's data to disk (fdatasync where available, else fsync)."""
+    if hasattr(os, 'fdatasync'):
+        os.fdatasync(fd)
+    else:
+        os.fsync(fd)
+
+
+def _checksum(obj: Any) -> str:
+    """
+    Hash the canonical (sorted, compact) JSON form of obj.
+
+    orjson builds the bytes in one C pass; without it the encoder output
+    is fed to the hash chunk by chunk instead of materializing a string.
+    """
+    digest = hashlib.blake2b(digest_size=32)
+    if orjson is not None:
+        digest.update(orjson.dumps(obj, option=orjson.OPT_SORT_KEYS))
+    else:
+        encoder = json.JSONEncoder(sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        for chunk in encoder.iterencode(obj):
+            digest.update(chunk.encode())
+    return digest.hexdigest()
+
+
+def _loads(data: bytes) -> Any:
+    """Parse JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class RecordCipher:
+    """
+    AES-256-GCM cipher keyed by a stored Fernet key.
+
+    Tokens are AEAD_MAGIC + nonce + ciphertext, encrypted through
+    OpenSSL's AES-NI/CLMUL GCM path rather than Fernet's CBC + HMAC +
+    base64. The AES key is derived from the Fernet key with HKDF, so the
+    key history format is unchanged; Fernet tokens written before the
+    switch still decrypt under the same key.
+    """
+
+    def __init__(self, key: bytes):
+        hkdf = HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=AEAD_INFO)
+        self._aead = AESGCM(hkdf.derive(base64.urlsafe_b64decode(key)))
+        self._fernet = Fernet(key)
+
+    def encrypt(self, data: bytes) -> bytes:
+        nonce = os.urandom(AEAD_NONCE_SIZE)
+        return AEAD_MAGIC + nonce + self._aead.encrypt(nonce, data, AEAD_MAGIC)
+
+    def decrypt(self, token: bytes) -> bytes:
+        if token[:1] != AEAD_MAGIC:
+            return self._fernet.decrypt(token)
+        nonce_end = 1 + AEAD_NONCE_SIZE
+        return self._aead.decrypt(token[1:nonce_end], token[nonce_end:], AEAD_MAGIC)
+
 
 class SecureStorage:
     """
@@ -33,7 +120,8 @@ class SecureStorage:
     in the system documentation.
     
     Key Features:
-    - Fernet symmetric encryption for data at rest
+    - AES-256-GCM authenticated encryption for data at rest
+    - Append-only record log so inserts don't rewrite the whole store
     - Automatic key rotation based on configurable periods
     - Secure backup and restoration mechanisms
     - Comprehensive error handling with retry logic
@@ -54,6 +142,7 @@ class SecureStorage:
         """
         self.storage_path = Path(storage_path)
         self.record_file = self.storage_path / "encrypted_records.bin"
+        self.record_log = self.storage_path / "encrypted_records.log"
         self.backup_dir = self.storage_path / "backups"
         self.keys_file = self.storage_path / "key_history.bin"
         
@@ -64,10 +153,35 @@ class SecureStorage:
         # Initialize or load encryption keys
         self.keys = self._initialize_keys()
         self.current_key = self.keys[0]  # Most recent key
-        self.cipher_suite = Fernet(self.current_key)
+        self._ciphers: Dict[bytes, RecordCipher] = {}
+        self.cipher_suite = self._cipher_for(self.current_key)
+
+        # Append log of records added since the last compaction
+        self._log_fd: Optional[int] = None
+        self._log_size: Optional[int] = None  # Log size after our last append
+        self._log_lock = asyncio.Lock()
+
+        # Monotonic time of the last backup, for debouncing routine backups
+        self._last_backup_ts: Optional[float] = None
+
+        # Last key rotation and cleanup seen in the stored metadata, so
+        # add_record and rotate_key can skip reading when nothing is due
+        self._last_rotation_ts: Optional[datetime] = None
+        self._last_cleanup_ts: Optional[datetime] = None
+
+        # Decrypted data, valid while the files match the cached signature
+        self._cache: Optional[Dict] = None
+        self._cache_signature: Optional[Tuple] = None
+
+        # Message and thread-message ids of the records in self._index_data,
+        # in one set since is_processed matches either, and the same
+        # records bucketed by final category
+        self._index_data: Optional[Dict] = None
+        self._processed_ids: Set[str] = set()
+        self._by_category: Dict[Optional[str], List[Dict]] = {}
 
         # Initialize storage if needed
-        if not self.record_file.exists():
+        if not self.record_file.exists() and not self.record_log.exists():
             self._write_encrypted_data({
                 "records": [], 
                 "metadata": {
@@ -78,16 +192,20 @@ class SecureStorage:
                 }
             })
 
-        # Set up logging
-        logging.basicConfig(level=logging.DEBUG)
+    def _cipher_for(self, key: bytes) -> RecordCipher:
+        """Cipher for a key from the history, built once and reused."""
+        cipher = self._ciphers.get(key)
+        if cipher is None:
+            cipher = self._ciphers[key] = RecordCipher(key)
+        return cipher
 
     def _generate_secure_key(self, extra_entropy: Optional[bytes] = None) -> bytes:
         """
-        Generate a secure encryption key using system-specific information.
+        Generate a new Fernet key from the operating system CSPRNG.
         
-        Creates a cryptographically secure key based on system parameters
-        combined with optional additional entropy. Implements PBKDF2 with
-        SHA-256 for key derivation following security best practices.
+        os.urandom already yields full-entropy key material, so no key
+        stretching is applied. Extra entropy, if given, is mixed in with
+        a single SHA-256.
         
         Args:
             extra_entropy: Optional additional entropy for key generation
@@ -95,29 +213,17 @@ class SecureStorage:
         Returns:
             Secure key in base64 URL-safe encoding
         """
-        # Combine system info with optional extra entropy
-        system_info = f"{os.getpid()}{os.path.getmtime(__file__)}{time.time()}"
+        key_material = os.urandom(32)
         if extra_entropy:
-            system_info = f"{system_info}{extra_entropy.hex()}"
-        salt = hashlib.sha256(system_info.encode()).digest()
-
-        # Use PBKDF2 to derive a secure key
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-        )
-
-        key = base64.urlsafe_b64encode(kdf.derive(os.urandom(32)))
-        return key
+            key_material = hashlib.sha256(key_material + extra_entropy).digest()
+        return base64.urlsafe_b64encode(key_material)
 
     def _generate_record_id(self, email_data: Dict[str, Any]) -> str:
         """
         Generate a unique, non-reversible ID for an email record.
         
         Creates a deterministic but secure identifier based on email
-        metadata. Uses SHA-256 hashing to ensure uniqueness and
+        metadata. Uses a 128-bit BLAKE2b digest to ensure uniqueness and
         non-reversibility for privacy protection.
         
         Args:
@@ -129,45 +235,74 @@ class SecureStorage:
         # Combine relevant data to create a unique identifier
         unique_data = f"{email_data.get('timestamp', '')}{email_data.get('message_id', '')}"
         # Create a one-way hash that can't be reversed to get the original data
-        return hashlib.sha256(unique_data.encode()).hexdigest()[:32]
+        return hashlib.blake2b(unique_data.encode(), digest_size=16).hexdigest()
 
     def _initialize_keys(self) -> List[bytes]:
         """
         Initialize or load encryption keys with history.
         
         Sets up the encryption key system with key history management.
-        Implements secure error handling and recovery mechanisms in
-        case of key loading failures.
+        A new key is only generated on first run, when no key history
+        exists. An unreadable key history is never replaced: doing so
+        would make every stored record permanently undecryptable.
         
         Returns:
             List of encryption keys with most recent first
-        """
-        try:
-            if self.keys_file.exists():
-                with open(self.keys_file, 'rb') as f:
-                    keys_data = json.load(f)
-                    return [k.encode() for k in keys_data['keys']]
             
-            # Generate initial key
-            initial_key = base64.urlsafe_b64encode(os.urandom(32))
-            with open(self.keys_file, 'w') as f:
-                json.dump({'keys': [initial_key.decode()]}, f)
-            return [initial_key]
-            
-        except Exception as e:
-            logger.error(f"Error initializing keys: {e}")
-            # Generate a new key if there's any error
-            initial_key = base64.urlsafe_b64encode(os.urandom(32))
-            with open(self.keys_file, 'w') as f:
-                json.dump({'keys': [initial_key.decode()]}, f)
-            return [initial_key]
+        Raises:
+            ValueError: If the key history exists but cannot be parsed
+            OSError: If the key history cannot be read or the initial
+                key cannot be saved
+        """
+        if self.keys_file.exists():
+            with open(self.keys_file, 'rb') as f:
+                content = f.read()
+            try:
+                keys = self._parse_keys(content)
+            except (ValueError, KeyError, TypeError) as e:
+                raise ValueError(f"Corrupt key history {self.keys_file}: {e}") from e
+            if not keys:
+                raise ValueError(f"Key history {self.keys_file} is empty")
+            return keys
+
+        # First run: generate and persist the initial key
+        initial_key = base64.urlsafe_b64encode(os.urandom(32))
+        if not self._save_keys([initial_key]):
+            raise OSError(f"Could not save the initial key to {self.keys_file}")
+        return [initial_key]
+
+    @staticmethod
+    def _parse_keys(content: bytes) -> List[bytes]:
+        """
+        Parse the key history file.
+
+        Keys are stored as newline-separated Fernet keys. Files from older
+        versions hold a JSON object whose entries are either the key itself
+        or the key base64-encoded once more; both are accepted.
+
+        Raises:
+            ValueError: If an entry is not a valid Fernet key
+        """
+        if content.startswith(b"{"):
+            keys = []
+            for entry in json.loads(content)["keys"]:
+                key = entry.encode()
+                decoded = base64.urlsafe_b64decode(key)
+                keys.append(decoded if len(decoded) == 44 else key)
+        else:
+            keys = [key for key in content.split(b"\n") if key]
+
+        for key in keys:
+            if len(base64.urlsafe_b64decode(key)) != 32:
+                raise ValueError("Invalid key in key history")
+        return keys
 
     def _save_keys(self, keys: List[bytes]) -> bool:
         """
         Save encryption keys.
         
-        Persists the current key set to secure storage with proper
-        encoding and error handling. Maintains the key history
+        Persists the current key set, most recent first, as
+        newline-separated Fernet keys. Maintains the key history
         for backward compatibility.
         
         Args:
@@ -176,86 +311,131 @@ class SecureStorage:
         Returns:
             Success indicator for the operation
         """
+        temp_file = self.keys_file.with_suffix('.tmp')
         try:
-            keys_data = {
-                'keys': [base64.urlsafe_b64encode(k).decode() for k in keys]
-            }
-            with open(self.keys_file, 'w') as f:
-                json.dump(keys_data, f)
+            # Replace atomically so a crash can't leave a torn key history
+            with open(temp_file, 'wb') as f:
+                f.write(b"\n".join(keys))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_file, self.keys_file)
             return True
         except Exception as e:
             logger.error(f"Error saving keys: {e}")
             return False
 
-    async def _read_encrypted_data(self, allow_restore: bool = True) -> Dict:
+    async def _read_encrypted_data(self, allow_restore: bool = True, copy: bool = True,
+                                   locked: bool = False) -> Dict:
         """
-        Read and decrypt the stored data with retry and key rotation support.
+        Read and decrypt the stored data with key rotation support.
         
         Implements comprehensive decryption with key rotation support,
         backup restoration, and proper error handling following system
-        specifications in error-handling.md.
+        specifications in error-handling.md. The decrypted data is cached
+        and reused until the base file or record log changes on disk.
+        
+        Cache misses are decrypted in a worker thread. Re-encrypting data
+        found under an old key and restoring from a backup write the base
+        file, so they only happen while holding self._log_lock; without
+        it, the lock is taken and the data loaded again.
         
         Args:
             allow_restore: Whether to attempt backup restoration on failure
+            copy: Return a copy the caller may modify; read-only callers
+                pass False to get the cached data itself
+            locked: Whether the caller already holds self._log_lock
             
         Returns:
             Decrypted data dictionary or empty structure on failure
         """
-        for attempt in range(MAX_RETRIES):
-            try:
-                if not self.record_file.exists():
-                    return {"records": [], "metadata": self._get_default_metadata()}
+        signature = self._storage_signature()
+        if self._cache is not None and signature == self._cache_signature:
+            return self._copy_data(self._cache) if copy else self._cache
 
-                with open(self.record_file, 'rb') as f:
-                    encrypted_data = f.read()
-                    if not encrypted_data:
-                        return {"records": [], "metadata": self._get_default_metadata()}
+        data = await asyncio.to_thread(self._load_data, allow_restore, locked)
+        if data is None:
+            async with self._log_lock:
+                data = await asyncio.to_thread(self._load_data, allow_restore, True)
+        return self._copy_data(data) if copy else data
 
-                    # Try decryption with all available keys
-                    last_error = None
-                    for key in self.keys:
-                        try:
-                            cipher = Fernet(key)
-                            decrypted_data = cipher.decrypt(encrypted_data)
-                            data = json.loads(decrypted_data)
-                            
-                            # Verify data integrity
-                            if not self._verify_data_structure(data):
-                                raise ValueError("Invalid data structure")
-                            
-                            # Re-encrypt with current key if an old key was used
-                            if key != self.current_key:
-                                self._write_encrypted_data(data)
-                            
-                            return data
-                        except Exception as e:
-                            last_error = e
-                            continue
-                    
-                    # If decryption failed and restore is allowed, try to restore
-                    if allow_restore and self._restore_from_backup():
-                        # Try reading one more time without allowing another restore
-                        return await self._read_encrypted_data(allow_restore=False)
-                    
-                    raise ValueError(f"Unable to decrypt with any available key: {last_error}")
-                    
-            except Exception as e:
-                if attempt < MAX_RETRIES - 1:
-                    logger.warning(f"Retry {attempt + 1} reading data: {e}")
-                    time.sleep(RETRY_DELAY * (attempt + 1))  # Exponential backoff
+    def _load_data(self, allow_restore: bool, may_write: bool) -> Optional[Dict]:
+        """
+        Decrypt the base file, merge the record log and cache the result.
+
+        Runs in a worker thread; see _read_encrypted_data.
+
+        Args:
+            allow_restore: Whether to attempt backup restoration on failure
+            may_write: Whether the caller holds self._log_lock, allowing
+                re-encryption and backup restoration
+
+        Returns:
+            The cached data, or None if loading requires a write that
+            may_write does not allow
+        """
+        signature = self._storage_signature()
+        if self._cache is not None and signature == self._cache_signature:
+            return self._cache
+
+        try:
+            if not self.record_file.exists():
+                data = self._merge_record_log({"records": [], "metadata": self._get_default_metadata()})
+                return self._cache_data(data, signature, copy=False)
+
+            # Unbuffered: read() goes straight to a single fstat-sized
+            # readall. The cipher slices the token into bytes (legacy
+            # Fernet tokens must be bytes), so an mmap would be copied
+            # anyway
+            with open(self.record_file, 'rb', buffering=0) as f:
+                encrypted_data = f.read()
+            if not encrypted_data:
+                data = self._merge_record_log({"records": [], "metadata": self._get_default_metadata()})
+                return self._cache_data(data, signature, copy=False)
+
+            # Try decryption with all available keys
+            last_error = None
+            for key in self.keys:
+                try:
+                    cipher = self._cipher_for(key)
+                    decrypted_data = cipher.decrypt(encrypted_data)
+                    data = _loads(decrypted_data)
+
+                    # Verify data integrity
+                    if not self._verify_data_structure(data):
+                        raise ValueError("Invalid data structure")
+                except Exception as e:
+                    last_error = e
                     continue
-                logger.error(f"Error reading encrypted data: {e}")
-                if allow_restore and self._restore_from_backup():
-                    return await self._read_encrypted_data(allow_restore=False)
-                return {"records": [], "metadata": self._get_default_metadata()}
+
+                # Re-encrypt with current key if an old key was used
+                if key != self.current_key and not may_write:
+                    return None
+                self._merge_record_log(data)
+                if key != self.current_key and self._write_encrypted_data(data):
+                    return data
+                return self._cache_data(data, signature, copy=False)
+
+            raise ValueError(f"Unable to decrypt with any available key: {last_error}")
+
+        except Exception as e:
+            if allow_restore and not may_write:
+                return None
+            logger.error(f"Error reading encrypted data: {e}")
+            if allow_restore and self._restore_from_backup():
+                # Try reading one more time without allowing another restore
+                return self._load_data(allow_restore=False, may_write=may_write)
+            return {"records": [], "metadata": self._get_default_metadata()}
 
     def _write_encrypted_data(self, data: Dict) -> bool:
         """
         Encrypt and write data to storage with backup.
         
         Implements secure data writing with proper backup creation,
-        data verification, and atomic file operations. Follows strict
-        error handling protocols with retry mechanisms.
+        structure validation, and fsync'd atomic file operations. Failures
+        are reported rather than retried; callers retry at the task level.
+
+        The data must be a full read (base file plus record log): on
+        success the record log is truncated, compacting it into the file.
         
         Args:
             data: Data dictionary to encrypt and store
@@ -263,48 +443,241 @@ class SecureStorage:
         Returns:
             Success indicator for the operation
         """
-        for attempt in range(MAX_RETRIES):
+        temp_file = self.record_file.with_suffix('.tmp')
+        try:
+            # Create backup before writing
+            self._create_backup()
+
+            # Verify data structure before encryption
+            if not self._verify_data_structure(data):
+                raise ValueError("Invalid data structure")
+
+            # Encrypt and write data
+            encrypted_data = self.cipher_suite.encrypt(_dumps(data))
+
+            # Write to temp file first and make it durable before the
+            # replace; a size check stands in for reading it back
+            with open(temp_file, 'wb') as f:
+                f.write(encrypted_data)
+                f.flush()
+                os.fsync(f.fileno())
+                if os.fstat(f.fileno()).st_size != len(encrypted_data):
+                    raise IOError("Short write to temporary file")
+
+            # Atomic replace
+            os.replace(temp_file, self.record_file)
+            self._fsync_directory()
+            self._truncate_record_log()
+            self._cache = data
+            self._cache_signature = self._storage_signature()
+
+            # Update backup timestamp
+            data["metadata"]["last_backup"] = datetime.now().isoformat()
+            return True
+
+        except Exception as e:
+            logger.error(f"Error writing encrypted data: {e}")
             try:
-                # Create backup before writing
-                self._create_backup()
+                os.remove(temp_file)
+            except OSError:
+                pass
+            return False
 
-                # Verify data structure before encryption
-                if not self._verify_data_structure(data):
-                    raise ValueError("Invalid data structure")
+    def _storage_signature(self) -> Tuple:
+        """Identify the on-disk state of the base file and the record log."""
+        signature = []
+        for path in (self.record_file, self.record_log):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
 
-                # Encrypt and write data
-                encrypted_data = self.cipher_suite.encrypt(json.dumps(data).encode())
-                temp_file = self.record_file.with_suffix('.tmp')
-                
-                # Write to temp file first
-                with open(temp_file, 'wb') as f:
-                    f.write(encrypted_data)
-                
-                # Verify the temp file
-                with open(temp_file, 'rb') as f:
-                    verify_data = f.read()
-                    if verify_data != encrypted_data:
-                        raise ValueError("Data verification failed")
-                
-                # Atomic replace
-                os.replace(temp_file, self.record_file)
-                
-                # Update backup timestamp
-                data["metadata"]["last_backup"] = datetime.now().isoformat()
-                return True
+    @staticmethod
+    def _copy_data(data: Dict) -> Dict:
+        """Copy the record list and metadata so callers can modify them."""
+        return {"records": list(data["records"]), "metadata": dict(data["metadata"])}
 
-            except Exception as e:
-                if attempt < MAX_RETRIES - 1:
-                    logger.warning(f"Retry {attempt + 1} writing data: {e}")
-                    time.sleep(RETRY_DELAY * (attempt + 1))  # Exponential backoff
-                    if os.path.exists(temp_file):
-                        try:
-                            os.remove(temp_file)
-                        except Exception:
-                            pass
+    def _cache_data(self, data: Dict, signature: Tuple, copy: bool) -> Dict:
+        """Remember freshly decrypted data for the given file signature."""
+        self._cache = data
+        self._cache_signature = signature
+        return self._copy_data(data) if copy else data
+
+    def _index_record(self, record: Dict):
+        """Add a record's message id, thread messages and category to the index."""
+        self._processed_ids.add(record.get("message_id"))
+        self._processed_ids.update(record.get("thread_messages", []))
+        category = (record.get("analysis_results") or {}).get("final_category")
+        self._by_category.setdefault(category, []).append(record)
+
+    def _ensure_index(self, data: Dict):
+        """Rebuild the message id index when data is not the indexed copy."""
+        if data is self._index_data:
+            return
+        self._processed_ids = set()
+        self._by_category = {}
+        for record in data.get("records", []):
+            self._index_record(record)
+        self._index_data = data
+
+    def _write_record_frames(self, records: List[Dict]) -> int:
+        """
+        Encrypt records and append them to the record log.
+
+        Each record is written as one length-prefixed encrypted token; all
+        frames go out in a single write on an O_APPEND descriptor, so the
+        cost of an insert does not depend on the size of the store.
+
+        Args:
+            records: Sanitized records to append
+
+        Returns:
+            Size of the record log after the append
+        """
+        frames = bytearray()
+        for record in records:
+            blob = self.cipher_suite.encrypt(_dumps(record))
+            frames += len(blob).to_bytes(RECORD_FRAME_HEADER, "big")
+            frames += blob
+        if self._log_fd is None:
+            self._log_fd = os.open(self.record_log, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o600)
+        fd = self._log_fd
+
+        # A log that changed since our last append may end in a torn frame
+        # from an interrupted writer; its length header would swallow the
+        # frames appended after it, so cut it off first
+        size = os.fstat(fd).st_size
+        if size != self._log_size:
+            valid = self._valid_log_length(fd, size)
+            if valid != size:
+                logger.warning(f"Truncating {size - valid} bytes of torn frame from the record log")
+                os.ftruncate(fd, valid)
+                size = valid
+
+        try:
+            view = memoryview(frames)
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+            _fdatasync(fd)  # The records count as stored once this returns
+        except OSError:
+            # Don't leave half a frame behind (e.g. after ENOSPC)
+            self._log_size = None
+            try:
+                os.ftruncate(fd, size)
+            except OSError:
+                pass
+            raise
+        self._log_size = size + len(frames)
+        return self._log_size
+
+    @staticmethod
+    def _valid_log_length(fd: int, size: int) -> int:
+        """
+        Length of the record log up to the end of its last complete frame.
+
+        Only the frame headers are read.
+        """
+        offset = 0
+        while offset + RECORD_FRAME_HEADER <= size:
+            os.lseek(fd, offset, os.SEEK_SET)  # O_APPEND writes ignore the position
+            header = os.read(fd, RECORD_FRAME_HEADER)
+            end = offset + RECORD_FRAME_HEADER + int.from_bytes(header, "big")
+            if end > size:
+                break
+            offset = end
+        return offset
+
+    async def _append_record_log(self, records: List[Dict]) -> int:
+        """
+        Append records to the log off the event loop and update the cache.
+
+        Encryption, the write and the data sync run in one worker thread;
+        the cache is updated back on the loop. Callers must hold
+        self._log_lock.
+
+        Returns:
+            Size of the record log after the append
+        """
+        cache = self._cache
+        cache_in_sync = cache is not None and self._storage_signature() == self._cache_signature
+        log_size = await asyncio.to_thread(self._write_record_frames, records)
+
+        # Keep the cache and its index current rather than re-reading the
+        # log, unless a read replaced the cache while the append ran
+        if cache_in_sync and self._cache is cache:
+            cache["records"].extend(records)
+            self._cache_signature = self._storage_signature()
+            if self._index_data is cache:
+                for record in records:
+                    self._index_record(record)
+        else:
+            self._cache = None
+        return log_size
+
+    def _read_record_log(self) -> List[Dict]:
+        """
+        Decrypt the records appended since the last compaction.
+
+        A truncated final frame (from an interrupted append) is ignored
+        here and cut off by the next append.
+
+        Returns:
+            Records in append order
+        """
+        try:
+            with open(self.record_log, 'rb') as f:
+                log_data = f.read()
+        except FileNotFoundError:
+            return []
+
+        records = []
+        offset = 0
+        while offset + RECORD_FRAME_HEADER <= len(log_data):
+            size = int.from_bytes(log_data[offset:offset + RECORD_FRAME_HEADER], "big")
+            start = offset + RECORD_FRAME_HEADER
+            blob = log_data[start:start + size]
+            if len(blob) < size:
+                logger.warning("Ignoring truncated frame at the end of the record log")
+                break
+            offset = start + size
+
+            for key in self.keys:
+                try:
+                    cipher = self.cipher_suite if key == self.current_key else self._cipher_for(key)
+                    records.append(_loads(cipher.decrypt(blob)))
+                    break
+                except Exception:
                     continue
-                logger.error(f"Error writing encrypted data: {e}")
-                return False
+            else:
+                logger.error("Skipping record log frame that no key can decrypt")
+        return records
+
+    def _merge_record_log(self, data: Dict) -> Dict:
+        """Extend the records of a base file read with the record log."""
+        data["records"].extend(self._read_record_log())
+        return data
+
+    def _truncate_record_log(self):
+        """Empty the record log after its records were written to the base file."""
+        try:
+            os.truncate(self.record_log, 0)
+        except FileNotFoundError:
+            pass
+        self._log_size = None
+
+    def _fsync_directory(self):
+        """Persist the directory entry changed by os.replace where supported."""
+        try:
+            dir_fd = os.open(self.storage_path, os.O_RDONLY)
+        except OSError:
+            return  # Directories can't be opened on Windows
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
 
     def _verify_data_structure(self, data: Dict) -> bool:
         """
@@ -321,19 +694,11 @@ class SecureStorage:
             Validation result indicating structure integrity
         """
         try:
-            required_keys = {"records", "metadata"}
-            metadata_keys = {"last_cleanup", "last_key_rotation", "last_backup", "data_version"}
-            
-            if not all(k in data for k in required_keys):
-                return False
-                
-            if not all(k in data["metadata"] for k in metadata_keys):
-                return False
-                
-            if not isinstance(data["records"], list):
-                return False
-                
-            return True
+            return (
+                REQUIRED_KEYS <= data.keys()
+                and METADATA_KEYS <= data["metadata"].keys()
+                and type(data["records"]) is list
+            )
         except Exception:
             return False
 
@@ -354,35 +719,65 @@ class SecureStorage:
             "data_version": 1
         }
 
-    def _create_backup(self) -> bool:
+    def _create_backup(self, force: bool = False) -> bool:
         """
         Create a backup of the current data file.
         
         Implements comprehensive backup creation with verification
         and cleanup of old backups. Follows the backup management
-        protocols defined in system specifications.
+        protocols defined in system specifications. Routine backups
+        are skipped while the previous one is younger than
+        BACKUP_MIN_INTERVAL.
         
+        Args:
+            force: Back up even if a recent backup exists
+            
         Returns:
             Success indicator for the backup operation
         """
         try:
             if self.record_file.exists():
+                now = time.monotonic()
+                if (not force and self._last_backup_ts is not None
+                        and now - self._last_backup_ts < BACKUP_MIN_INTERVAL):
+                    return True
+
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 backup_file = self.backup_dir / f"records_backup_{timestamp}.bin"
-                shutil.copy2(self.record_file, backup_file)
+                source_size = os.stat(self.record_file).st_size
+                self._reflink_copy(self.record_file, backup_file)
                 
-                # Verify backup
-                if not backup_file.exists() or backup_file.stat().st_size != self.record_file.stat().st_size:
+                # Verify backup (a missing backup raises FileNotFoundError)
+                if os.stat(backup_file).st_size != source_size:
                     raise ValueError("Backup verification failed")
                 
                 # Cleanup old backups
                 self._cleanup_old_backups()
+                self._last_backup_ts = now
                 return True
             return False
         except Exception as e:
             logger.error(f"Error creating backup: {e}")
             return False
 
+    @staticmethod
+    def _reflink_copy(src: Path, dst: Path):
+        """
+        Copy a file, sharing its extents when the filesystem supports reflinks.
+
+        On Btrfs/XFS the FICLONE ioctl makes the copy a metadata-only
+        operation; anywhere else this falls back to shutil.copy2.
+        """
+        if fcntl is not None:
+            try:
+                with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                    fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+                shutil.copystat(src, dst)
+                return
+            except OSError:
+                pass  # Reflinks unsupported here
+        shutil.copy2(src, dst)
+
     def _cleanup_old_backups(self):
         """
         Remove backups older than BACKUP_RETENTION_DAYS.
@@ -393,15 +788,49 @@ class SecureStorage:
         """
         try:
             cutoff = datetime.now() - timedelta(days=BACKUP_RETENTION_DAYS)
-            for backup_file in self.backup_dir.glob("records_backup_*.bin"):
+            for entry in self._scan_backups():
                 try:
-                    if datetime.fromtimestamp(backup_file.stat().st_mtime) < cutoff:
-                        backup_file.unlink()
+                    if self._backup_time(entry) < cutoff:
+                        os.unlink(entry.path)
+                except FileNotFoundError:
+                    pass  # Already removed by a concurrent cleanup
                 except Exception as e:
-                    logger.error(f"Error cleaning up backup {backup_file}: {e}")
+                    logger.error(f"Error cleaning up backup {entry.path}: {e}")
         except Exception as e:
             logger.error(f"Error during backup cleanup: {e}")
 
+    def _scan_backups(self) -> List[os.DirEntry]:
+        """
+        List backup files in a single directory pass.
+
+        os.scandir yields names without a stat() per entry, and a
+        DirEntry caches its stat() if the mtime fallback needs it.
+        """
+        try:
+            with os.scandir(self.backup_dir) as it:
+                return [
+                    entry for entry in it
+                    if entry.name.startswith("records_backup_") and entry.name.endswith(".bin")
+                ]
+        except FileNotFoundError:
+            return []
+
+    @staticmethod
+    def _backup_time(backup_file: os.DirEntry) -> datetime:
+        """
+        Creation time of a backup, taken from its name.
+
+        Backups are named records_backup_%Y%m%d_%H%M%S.bin; reflinked
+        backups carry the record file's mtime, so the name is also the
+        more accurate source. Other names fall back to the file mtime.
+        """
+        try:
+            return datetime.strptime(
+                backup_file.name[len("records_backup_"):-len(".bin")], "%Y%m%d_%H%M%S"
+            )
+        except ValueError:
+            return datetime.fromtimestamp(backup_file.stat().st_mtime)
+
     def _restore_from_backup(self) -> bool:
         """
         Attempt to restore from the most recent valid backup.
@@ -414,12 +843,9 @@ class SecureStorage:
             Success indicator for the restoration operation
         """
         try:
-            # Get list of backups sorted by modification time (newest first)
-            backups = sorted(
-                [f for f in self.backup_dir.glob("records_backup_*.bin") if f.is_file()],
-                key=lambda x: x.stat().st_mtime,
-                reverse=True
-            )
+            # Get list of backups, newest first; the timestamp in the
+            # names sorts chronologically, so no stat() per file is needed
+            backups = sorted((entry.path for entry in self._scan_backups()), reverse=True)
             
             if not backups:
                 logger.warning("No backups found for restoration")
@@ -435,17 +861,23 @@ class SecureStorage:
                     # Try to decrypt with all available keys
                     for key in self.keys:
                         try:
-                            cipher = Fernet(key)
+                            cipher = self._cipher_for(key)
                             decrypted_data = cipher.decrypt(encrypted_data)
-                            data = json.loads(decrypted_data)
+                            data = _loads(decrypted_data)
                             
                             if self._verify_data_structure(data):
-                                # Re-encrypt with current key
-                                encrypted_data = self.cipher_suite.encrypt(json.dumps(data).encode())
-                                
-                                # Write directly to record file
-                                with open(self.record_file, 'wb') as f:
-                                    f.write(encrypted_data)
+                                # Stage the restored file and swap it in, so
+                                # a crash mid-restore can't leave it torn
+                                temp_file = self.record_file.with_suffix('.tmp')
+                                if key == self.current_key:
+                                    # Already under the current key: copy as is
+                                    self._reflink_copy(backup_file, temp_file)
+                                else:
+                                    # Re-encrypt with current key
+                                    encrypted_data = self.cipher_suite.encrypt(_dumps(data))
+                                    with open(temp_file, 'wb') as f:
+                                        f.write(encrypted_data)
+                                os.replace(temp_file, self.record_file)
                                 
                                 logger.info(f"Successfully restored from backup: {backup_file}")
                                 return True
@@ -463,6 +895,101 @@ class SecureStorage:
             logger.error(f"Error during backup restoration: {e}")
             return False
 
+    def _plan_rotate(self, data: Dict, now: datetime) -> bool:
+        """
+        Mark data for key rotation if the current key is old enough.
+
+        Only the metadata is updated here; the key itself is switched by
+        _write_maintained so that data is encrypted exactly once.
+
+        Returns:
+            True if rotation is due
+        """
+        last_rotation = datetime.fromisoformat(data["metadata"]["last_key_rotation"])
+        self._last_rotation_ts = last_rotation
+        if now - last_rotation < timedelta(days=KEY_ROTATION_DAYS):
+            return False
+        data["metadata"]["last_key_rotation"] = now.isoformat()
+        return True
+
+    def _plan_cleanup(self, data: Dict, now: datetime, retention_days: int = 30,
+                      force: bool = False) -> bool:
+        """
+        Drop records older than the retention period from data in place.
+
+        Cleanup runs at most once a day unless forced.
+
+        Returns:
+            True if data was changed and needs writing
+        """
+        last_cleanup = data["metadata"].get("last_cleanup")
+        self._last_cleanup_ts = datetime.fromisoformat(last_cleanup) if last_cleanup else None
+        if not force and self._last_cleanup_ts and self._last_cleanup_ts > now - timedelta(days=1):
+            return False
+
+        # Keep only records within retention period. add_record writes
+        # naive datetime.isoformat() timestamps, which sort as strings
+        cutoff_iso = (now - timedelta(days=retention_days)).isoformat()
+        data["records"] = [
+            record for record in data["records"]
+            if record.get("timestamp", "") > cutoff_iso
+        ]
+        data["metadata"]["last_cleanup"] = now.isoformat()
+        return True
+
+    def _write_maintained(self, data: Dict, rotate: bool = False) -> bool:
+        """
+        Write data to the base file, switching to a fresh key first if asked.
+
+        Runs key generation, backup, write and key save as one blocking
+        sequence so callers offload it with a single asyncio.to_thread.
+        The write also folds in the record log, so no frames remain
+        encrypted with the old key. Callers must hold self._log_lock.
+
+        Args:
+            data: Full storage data, already updated by the planners
+            rotate: Whether to rotate the encryption key before writing
+
+        Returns:
+            Success indicator for the write
+        """
+        if rotate:
+            # Generate new key
+            new_key = self._generate_secure_key()
+
+            # Create backup before rotation
+            if not self._create_backup(force=True):
+                logger.error("Failed to create backup before key rotation")
+                return False
+
+            self.keys.insert(0, new_key)
+            self.current_key = new_key
+            self.cipher_suite = self._cipher_for(new_key)
+
+        success = self._write_encrypted_data(data)
+
+        if success:
+            metadata = data["metadata"]
+            self._last_rotation_ts = datetime.fromisoformat(metadata["last_key_rotation"])
+            if metadata.get("last_cleanup"):
+                self._last_cleanup_ts = datetime.fromisoformat(metadata["last_cleanup"])
+
+        if success and rotate:
+            # Keep limited key history
+            self.keys = self.keys[:3]  # Keep last 3 keys
+            self._ciphers = {key: self._ciphers[key] for key in self.keys if key in self._ciphers}
+            self._save_keys(self.keys)
+        return success
+
+    def _maintenance_due(self, now: datetime) -> bool:
+        """Whether cleanup or key rotation may be due, judging by cached timestamps."""
+        return (
+            self._last_rotation_ts is None
+            or now - self._last_rotation_ts >= timedelta(days=KEY_ROTATION_DAYS)
+            or self._last_cleanup_ts is None
+            or self._last_cleanup_ts <= now - timedelta(days=1)
+        )
+
     async def rotate_key(self) -> bool:
         """
         Rotate encryption key and re-encrypt data.
@@ -475,35 +1002,17 @@ class SecureStorage:
             Success indicator for the key rotation operation
         """
         try:
-            # Check if rotation is needed
-            data = await asyncio.to_thread(self._read_encrypted_data)
-            last_rotation = datetime.fromisoformat(data["metadata"]["last_key_rotation"])
-            if datetime.now() - last_rotation < timedelta(days=KEY_ROTATION_DAYS):
+            # Not due per the last seen metadata: skip the read entirely
+            now = datetime.now()
+            if (self._last_rotation_ts is not None
+                    and now - self._last_rotation_ts < timedelta(days=KEY_ROTATION_DAYS)):
                 return True
 
-            # Generate new key
-            new_key = await asyncio.to_thread(self._generate_secure_key, os.urandom(32))
-            
-            # Create backup before rotation
-            if not await asyncio.to_thread(self._create_backup):
-                logger.error("Failed to create backup before key rotation")
-                return False
-            
-            # Re-encrypt data with new key
-            self.keys.insert(0, new_key)
-            self.current_key = new_key
-            self.cipher_suite = Fernet(new_key)
-            
-            # Update metadata and save
-            data["metadata"]["last_key_rotation"] = datetime.now().isoformat()
-            success = await asyncio.to_thread(self._write_encrypted_data, data)
-            
-            if success:
-                # Keep limited key history
-                self.keys = self.keys[:3]  # Keep last 3 keys
-                await asyncio.to_thread(self._save_keys, self.keys)
-                return True
-            return False
+            async with self._log_lock:
+                data = await self._read_encrypted_data(locked=True)
+                if not self._plan_rotate(data, now):
+                    return True
+                return await asyncio.to_thread(self._write_maintained, data, True)
 
         except Exception as e:
             logger.error(f"Error rotating encryption key: {e}")
@@ -526,33 +1035,94 @@ class SecureStorage:
             Success indicator for the cleanup operation
         """
         try:
-            data = await asyncio.to_thread(self._read_encrypted_data)
-            now = datetime.now()
-
-            # Check if cleanup is needed (unless forced)
-            if not force:
-                last_cleanup = data["metadata"].get("last_cleanup")
-                if last_cleanup:
-                    last_cleanup_date = datetime.fromisoformat(last_cleanup)
-                    if last_cleanup_date > now - timedelta(days=1):
-                        return True
-
-            # Keep only records within retention period
-            cutoff_date = now - timedelta(days=retention_days)
-            original_records = data["records"]
-            data["records"] = [
-                record for record in original_records
-                if datetime.fromisoformat(record.get("timestamp", "2000-01-01")) > cutoff_date
-            ]
-
-            # Update cleanup timestamp and write changes
-            data["metadata"]["last_cleanup"] = now.isoformat()
-            return await asyncio.to_thread(self._write_encrypted_data, data)
+            async with self._log_lock:
+                data = await self._read_encrypted_data(locked=True)
+                if not self._plan_cleanup(data, datetime.now(), retention_days, force):
+                    return True
+                return await asyncio.to_thread(self._write_maintained, data)
 
         except Exception as e:
             logger.error(f"Error during cleanup: {e}")
             return False
 
+    def _build_record(self, email_data: Dict[str, Any], timestamp: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Create the sanitized record stored for an email, with thread information.
+
+        A batch passes one ISO timestamp for all of its records; otherwise
+        the current time is used.
+        """
+        return {
+            "id": self._generate_record_id(email_data),
+            "timestamp": timestamp or datetime.now().isoformat(),
+            "processed": True,
+            "message_id": email_data.get("message_id", ""),
+            "thread_id": email_data.get("thread_id", ""),
+            "thread_messages": email_data.get("thread_messages", []),
+            "message_hash": hashlib.blake2b(
+                f"{email_data.get('subject', '')}{email_data.get('sender', '')}"
+                f"{','.join(sorted(email_data.get('recipients', [])))}"
+                f"{email_data.get('thread_id', '')}".encode(),
+                digest_size=32
+            ).hexdigest(),
+            "checksum": _checksum(email_data),
+            "analysis_results": email_data.get("analysis_results", {})
+        }
+
+    def _build_records(self, email_batch: List[Dict[str, Any]]) -> Tuple[List[str], List[Dict]]:
+        """
+        Build records for a batch, skipping invalid entries.
+
+        Returns:
+            Tuple of (record ids in input order, empty for skipped
+            entries; the built records)
+        """
+        record_ids = []
+        records = []
+        timestamp = datetime.now().isoformat()
+        for email_data in email_batch:
+            if not email_data or not isinstance(email_data, dict):
+                logger.error("Invalid email data format")
+                record_ids.append("")
+                continue
+            record = self._build_record(email_data, timestamp)
+            record_ids.append(record["id"])
+            records.append(record)
+        return record_ids, records
+
+    async def _append_and_maintain(self, records: List[Dict], force_cleanup: bool) -> bool:
+        """
+        Append records to the log, then run any due maintenance.
+
+        Maintenance shares one (normally cached) read and at most one
+        write: cleanup, key rotation and log compaction all land in the
+        same re-encryption of the base file.
+
+        Returns:
+            Whether the records were appended
+        """
+        async with self._log_lock:
+            try:
+                log_size = await self._append_record_log(records)
+            except OSError as e:
+                logger.error(f"Error appending records: {e}")
+                return False
+
+            try:
+                now = datetime.now()
+                if not (force_cleanup or log_size > RECORD_LOG_MAX_BYTES
+                        or self._maintenance_due(now)):
+                    return True
+                data = await self._read_encrypted_data(locked=True)
+                cleaned = self._plan_cleanup(data, now, force=force_cleanup)
+                rotate = self._plan_rotate(data, now)
+                if cleaned or rotate or log_size > RECORD_LOG_MAX_BYTES:
+                    await asyncio.to_thread(self._write_maintained, data, rotate)
+            except Exception as e:
+                # The records are already durable in the log
+                logger.error(f"Error during storage maintenance: {e}")
+        return True
+
     async def add_record(self, email_data: Dict[str, Any], force_cleanup: bool = False) -> Tuple[str, bool]:
         """
         Add a new email record to secure storage.
@@ -574,43 +1144,45 @@ class SecureStorage:
                 logger.error("Invalid email data format")
                 return "", False
 
-            # Generate a unique ID for the record
-            record_id = self._generate_record_id(email_data)
-
-            # Create a sanitized record with thread information
-            sanitized_record = {
-                "id": record_id,
-                "timestamp": datetime.now().isoformat(),
-                "processed": True,
-                "message_id": email_data.get("message_id", ""),
-                "thread_id": email_data.get("thread_id", ""),
-                "thread_messages": email_data.get("thread_messages", []),
-                "message_hash": hashlib.sha256(
-                    f"{email_data.get('subject', '')}{email_data.get('sender', '')}"
-                    f"{','.join(sorted(email_data.get('recipients', [])))}"
-                    f"{email_data.get('thread_id', '')}".encode()
-                ).hexdigest(),
-                "checksum": hashlib.sha256(
-                    json.dumps(email_data, sort_keys=True).encode()
-                ).hexdigest(),
-                "analysis_results": email_data.get("analysis_results", {})
-            }
-
-            # Read existing data, add new record, and write back
-            data = await asyncio.to_thread(self._read_encrypted_data)
-            data["records"].append(sanitized_record)
-            
-            if await asyncio.to_thread(self._write_encrypted_data, data):
-                # Trigger maintenance operations
-                await self._cleanup_old_records(force=force_cleanup)
-                await self.rotate_key()  # Check and rotate key if needed
-                return record_id, True
-            return record_id, False
+            record = self._build_record(email_data)
+            return record["id"], await self._append_and_maintain([record], force_cleanup)
 
         except Exception as e:
             logger.error(f"Error adding record: {e}")
             return "", False
 
+    async def add_records(self, email_batch: List[Dict[str, Any]],
+                          force_cleanup: bool = False) -> Tuple[List[str], bool]:
+        """
+        Add several email records with one log write and one maintenance pass.
+
+        Bulk counterpart of add_record for ingesting many emails at once.
+        Invalid entries are skipped and get an empty record id. Entries
+        should be fully resolved, including thread_messages: records are
+        built from plain copies, so nothing is fetched on their behalf.
+
+        Args:
+            email_batch: The email data to store
+            force_cleanup: If True, forces cleanup regardless of last cleanup time
+
+        Returns:
+            Tuple of (record ids in input order, success)
+        """
+        try:
+            # Hashing and checksumming a large batch is CPU-bound; keep it
+            # off the event loop like the other bulk work. The worker gets
+            # plain copies so it never calls into caller-owned mappings
+            snapshot = [dict(e) if isinstance(e, dict) else e for e in email_batch]
+            record_ids, records = await asyncio.to_thread(self._build_records, snapshot)
+
+            if not records:
+                return record_ids, False
+            return record_ids, await self._append_and_maintain(records, force_cleanup)
+
+        except Exception as e:
+            logger.error(f"Error adding records: {e}")
+            return [], False
+
     async def is_processed(self, message_id: str) -> Tuple[bool, bool]:
         """
         Check if an email has been processed using its message ID.
@@ -629,21 +1201,12 @@ class SecureStorage:
             if not message_id:
                 return False, True  # Not processed, but operation succeeded
 
-            # Get all records
-            data = await asyncio.to_thread(self._read_encrypted_data)
-            records = data.get("records", [])
-            
-            # First check direct message ID match
-            for record in records:
-                if record.get("message_id") == message_id:
-                    return True, True
-                    
-                # Also check if this message is in any processed thread
-                thread_messages = record.get("thread_messages", [])
-                if message_id in thread_messages:
-                    return True, True
-                    
-            return False, True
+            # Cached data; the index is only rebuilt after a reload
+            data = await self._read_encrypted_data(copy=False)
+            self._ensure_index(data)
+
+            # Direct message ID match or membership in a processed thread
+            return message_id in self._processed_ids, True
 
         except Exception as e:
             logger.error(f"Error checking processed status: {e}")
@@ -661,7 +1224,7 @@ class SecureStorage:
             Total count of stored records
         """
         try:
-            data = await asyncio.to_thread(self._read_encrypted_data)
+            data = await self._read_encrypted_data(copy=False)
             return len(data.get("records", []))
         except Exception as e:
             logger.error(f"Error getting record count: {e}")
@@ -682,20 +1245,16 @@ class SecureStorage:
             List of records processed since the specified time
         """
         try:
-            data = await asyncio.to_thread(self._read_encrypted_data)
+            data = await self._read_encrypted_data(copy=False)
             records = data.get("records", [])
             
-            # Filter records by timestamp
-            filtered_records = []
-            for record in records:
-                if "timestamp" in record:
-                    try:
-                        record_time = datetime.fromisoformat(record["timestamp"])
-                        if record_time >= start_time:
-                            filtered_records.append(record)
-                    except ValueError:
-                        # Skip records with invalid timestamps
-                        continue
+            # Filter records by timestamp; add_record writes naive
+            # datetime.isoformat() timestamps, which sort as strings
+            start_iso = start_time.isoformat()
+            filtered_records = [
+                record for record in records
+                if record.get("timestamp", "") >= start_iso
+            ]
             
             logger.debug(f"Retrieved {len(filtered_records)} records since {start_time.isoformat()}")
             return filtered_records
@@ -719,15 +1278,9 @@ class SecureStorage:
             List of records matching the specified category
         """
         try:
-            data = await asyncio.to_thread(self._read_encrypted_data)
-            records = data.get("records", [])
-            
-            # Filter records by category
-            filtered_records = []
-            for record in records:
-                record_category = record.get("analysis_results", {}).get("final_category")
-                if record_category == category:
-                    filtered_records.append(record)
+            data = await self._read_encrypted_data(copy=False)
+            self._ensure_index(data)
+            filtered_records = list(self._by_category.get(category, []))
             
             logger.debug(f"Retrieved {len(filtered_records)} records with category '{category}'")
             return filtered_records
@@ -748,7 +1301,7 @@ class SecureStorage:
             List of all processed records
         """
         try:
-            data = await asyncio.to_thread(self._read_encrypted_data)
+            data = await self._read_encrypted_data()
             records = data.get("records", [])
             
             logger.debug(f"Retrieved all {len(records)} records")
@@ -770,8 +1323,8 @@ class SecureStorage:
             Dictionary mapping category names to record counts
         """
         try:
-            data = await asyncio.to_thread(self._read_encrypted_data)
-            records = data.get("records", [])
+            data = await self._read_encrypted_data(copy=False)
+            self._ensure_index(data)
             
             # Initialize category counter
             category_counts = {
@@ -782,13 +1335,12 @@ class SecureStorage:
                 "unknown": 0
             }
             
-            # Count records by category
-            for record in records:
-                category = record.get("analysis_results", {}).get("final_category")
+            # Count records by category from the index buckets
+            for category, records in self._by_category.items():
                 if category in category_counts:
-                    category_counts[category] += 1
+                    category_counts[category] += len(records)
                 else:
-                    category_counts["unknown"] += 1
+                    category_counts["unknown"] += len(records)
             
             logger.debug(f"Retrieved category counts: {category_counts}")
             return category_counts
@@ -12,19 +12,171 @@ Design Considerations:
 - Secure token handling
 """
 
+import asyncio
 import logging
-import json
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any, Tuple
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from typing import Optional, List, Dict, Any, Tuple, Callable, TypeVar
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 
 from src.storage.models import User, OAuthToken
-from src.storage.database import get_db_session
-from src.storage.encryption import encrypt_value, decrypt_value
+from src.storage.database import DB_ASYNC, get_async_db_session, get_db_session, request_session
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Insert constructs with ON CONFLICT DO UPDATE, by dialect name
+UPSERT_INSERTS = {
+    "sqlite": sqlite_insert,
+    "postgresql": postgresql_insert,
+}
+
+# User lookups by email and username run on every authenticated request.
+# Within request_db_session() they are cached in the shared session's info
+# dict for the rest of the request; outside it nothing is cached, so an
+# uncommitted or rolled-back write is never served to another request
+USER_CACHE_INFO_KEY = "user_repository.user_cache"
+
+def _copy_user(user_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy a user dictionary so callers can't mutate a cached entry."""
+    return {
+        **user_dict,
+        "permissions": list(user_dict["permissions"] or []),
+        "oauth_providers": list(user_dict["oauth_providers"])
+    }
+
+def _request_user_cache() -> Optional[Dict[Tuple[str, str], Dict[str, Any]]]:
+    """Return the current request's user cache, or None outside a request session."""
+    session = request_session.get()
+    if session is None:
+        return None
+    return session.info.setdefault(USER_CACHE_INFO_KEY, {})
+
+def _user_cache_get(key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+    """Return a copy of a user cached earlier in this request, if any."""
+    cache = _request_user_cache()
+    user_dict = cache.get(key) if cache is not None else None
+    return _copy_user(user_dict) if user_dict is not None else None
+
+def _user_cache_set(key: Tuple[str, str], user_dict: Dict[str, Any]) -> None:
+    """Cache a user for the rest of the current request."""
+    cache = _request_user_cache()
+    if cache is not None:
+        cache[key] = _copy_user(user_dict)
+
+def clear_user_cache() -> None:
+    """Drop the current request's cached user lookups; called after every user or token write."""
+    cache = _request_user_cache()
+    if cache is not None:
+        cache.clear()
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    """Format an optional timestamp for API responses."""
+    return value.isoformat() if value else None
+
+def _user_to_dict(user: User, providers: List[str]) -> Dict[str, Any]:
+    """
+    Build the user dictionary returned by the repository.
+
+    Must be called before the session closes; each column attribute is
+    read exactly once.
+    """
+    return {
+        "id": user.id,
+        "email": user.email,
+        "username": user.username,
+        "display_name": user.display_name,
+        "permissions": user.permissions,
+        "profile_picture": user.profile_picture,
+        "is_active": user.is_active,
+        "created_at": _iso(user.created_at),
+        "last_login": _iso(user.last_login),
+        "oauth_providers": providers
+    }
+
+def _duplicate_field(error: IntegrityError) -> str:
+    """
+    Name the unique user column an IntegrityError was raised for.
+
+    SQLite reports "UNIQUE constraint failed: users.email"; PostgreSQL
+    names the unique index (ix_users_email) and the key "(email)".
+    """
+    message = str(error.orig)
+    if any(marker in message for marker in ("users.email", "ix_users_email", "(email)")):
+        return "email"
+    return "username"
+
+def _user_with_providers(session: Session, *criteria) -> Optional[Tuple[User, List[str]]]:
+    """
+    Load a user and its OAuth provider names in one statement.
+
+    The user's tokens are outer-joined so each result row carries one
+    provider, replacing the lazy load of user.oauth_tokens.
+
+    Args:
+        session: Active database session
+        *criteria: Filter conditions selecting the user
+
+    Returns:
+        Tuple of (user, provider names), or None if no user matches
+    """
+    rows = (
+        session.query(User, OAuthToken.provider)
+        .outerjoin(User.oauth_tokens)
+        .filter(*criteria)
+        .all()
+    )
+    if not rows:
+        return None
+    user = rows[0][0]
+    return user, [provider for row_user, provider in rows if row_user is user and provider is not None]
+
+def _upsert_insert(session: Session):
+    """
+    Return the dialect's insert construct supporting ON CONFLICT DO UPDATE.
+
+    Raises:
+        RuntimeError: If the bound database has no upsert support here
+    """
+    dialect = session.get_bind().dialect.name
+    try:
+        return UPSERT_INSERTS[dialect]
+    except KeyError:
+        raise RuntimeError(f"OAuth token upsert is not supported on {dialect}")
+
+def _run_sync_session(transaction: Callable[[Session], T]) -> T:
+    """Run a transaction on a sync session, committing on success."""
+    with get_db_session() as session:
+        try:
+            return transaction(session)
+        except StopIteration as e:
+            # An asyncio future cannot carry StopIteration; awaiting it
+            # would never complete, so surface it as an ordinary error
+            raise RuntimeError("Transaction raised StopIteration") from e
+
+async def _run_in_session(transaction: Callable[[Session], T]) -> T:
+    """
+    Run a repository transaction without blocking the event loop.
+
+    With DB_ASYNC enabled the transaction runs on an AsyncSession through
+    run_sync, so its statements go through the async driver. Otherwise,
+    and always inside request_db_session() so the request's shared session
+    is used, it runs on a sync session in a worker thread.
+
+    Args:
+        transaction: Function performing the database work on a session
+
+    Returns:
+        The transaction's return value
+    """
+    if DB_ASYNC and request_session.get() is None:
+        async with get_async_db_session() as session:
+            return await session.run_sync(transaction)
+    return await asyncio.to_thread(_run_sync_session, transaction)
+
 class UserRepository:
     """
     Repository for user management database operations.
@@ -34,6 +186,10 @@ class UserRepository:
     
     All methods return dictionaries rather than ORM objects to prevent
     session-related issues when objects are accessed after the session closes.
+    Database work runs through _run_in_session, so awaiting a method never
+    blocks the event loop on a database round-trip. Methods flush rather
+    than commit: the session scope commits, once per request when the
+    request shares a session (see request_db_session).
     """
     
     @staticmethod
@@ -61,51 +217,42 @@ class UserRepository:
             ValueError: If user with email or username already exists
             RuntimeError: If database operation fails
         """
-        with get_db_session() as session:
-            # Check if user with email or username already exists
-            existing_user = session.query(User).filter(
-                or_(User.email == email, User.username == username)
-            ).first()
-            
-            if existing_user:
-                field = "email" if existing_user.email == email else "username"
-                logger.warning(f"Attempted to create duplicate user with {field}: {email if field == 'email' else username}")
-                raise ValueError(f"User with this {field} already exists")
-            
-            # Create new user
+        def transaction(session: Session):
+            # Create new user; duplicates are rejected by the unique
+            # constraints on email and username rather than a prior SELECT
             user = User(
                 email=email,
                 username=username,
                 display_name=display_name,
-                permissions=json.dumps(permissions or ["view"]),
+                permissions=permissions or ["view"],
                 profile_picture=profile_picture,
                 created_at=datetime.utcnow(),
             )
             
             try:
-                session.add(user)
-                session.commit()
+                # A savepoint confines a failed insert's rollback to this
+                # statement, leaving a shared request session usable
+                with session.begin_nested():
+                    session.add(user)
+                    session.flush()
                 
                 # Important: Convert to dictionary before returning to avoid session issues
-                user_dict = {
-                    "id": user.id,
-                    "email": user.email,
-                    "username": user.username,
-                    "display_name": user.display_name,
-                    "permissions": json.loads(user.permissions) if isinstance(user.permissions, str) else user.permissions,
-                    "profile_picture": user.profile_picture,
-                    "is_active": user.is_active,
-                    "created_at": user.created_at.isoformat() if user.created_at else None,
-                    "last_login": user.last_login.isoformat() if user.last_login else None,
-                    "oauth_providers": []  # No providers yet for a new user
-                }
+                user_dict = _user_to_dict(user, [])  # No providers yet for a new user
                 
                 logger.info(f"Created new user: {username} ({email})")
                 return user_dict
+            except IntegrityError as e:
+                field = _duplicate_field(e)
+                logger.warning(f"Attempted to create duplicate user with {field}: {email if field == 'email' else username}")
+                raise ValueError(f"User with this {field} already exists")
             except Exception as e:
                 logger.error(f"Failed to create user {email}: {str(e)}")
                 raise RuntimeError(f"Failed to create user: {str(e)}")
-    
+
+        result = await _run_in_session(transaction)
+        clear_user_cache()
+        return result
+
     @staticmethod
     async def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
         """
@@ -117,28 +264,25 @@ class UserRepository:
         Returns:
             Dictionary containing user data if found, None otherwise
         """
-        with get_db_session() as session:
-            user = session.query(User).filter(User.email == email).first()
+        cached = _user_cache_get(("email", email))
+        if cached is not None:
+            return cached
+        
+        def transaction(session: Session):
+            found = _user_with_providers(session, User.email == email)
             
-            if not user:
+            if not found:
                 return None
                 
             # Convert to dictionary before the session closes
-            providers = [token.provider for token in user.oauth_tokens]
-            
-            return {
-                "id": user.id,
-                "email": user.email,
-                "username": user.username,
-                "display_name": user.display_name,
-                "permissions": json.loads(user.permissions) if isinstance(user.permissions, str) else user.permissions,
-                "profile_picture": user.profile_picture,
-                "is_active": user.is_active,
-                "created_at": user.created_at.isoformat() if user.created_at else None,
-                "last_login": user.last_login.isoformat() if user.last_login else None,
-                "oauth_providers": providers
-            }
-    
+            user, providers = found
+            return _user_to_dict(user, providers)
+
+        user_dict = await _run_in_session(transaction)
+        if user_dict is not None:
+            _user_cache_set(("email", email), user_dict)
+        return user_dict
+
     @staticmethod
     async def get_user_by_username(username: str) -> Optional[Dict[str, Any]]:
         """
@@ -150,28 +294,25 @@ class UserRepository:
         Returns:
             Dictionary containing user data if found, None otherwise
         """
-        with get_db_session() as session:
-            user = session.query(User).filter(User.username == username).first()
+        cached = _user_cache_get(("username", username))
+        if cached is not None:
+            return cached
+        
+        def transaction(session: Session):
+            found = _user_with_providers(session, User.username == username)
             
-            if not user:
+            if not found:
                 return None
                 
             # Convert to dictionary before the session closes
-            providers = [token.provider for token in user.oauth_tokens]
-            
-            return {
-                "id": user.id,
-                "email": user.email,
-                "username": user.username,
-                "display_name": user.display_name,
-                "permissions": json.loads(user.permissions) if isinstance(user.permissions, str) else user.permissions,
-                "profile_picture": user.profile_picture,
-                "is_active": user.is_active,
-                "created_at": user.created_at.isoformat() if user.created_at else None,
-                "last_login": user.last_login.isoformat() if user.last_login else None,
-                "oauth_providers": providers
-            }
-    
+            user, providers = found
+            return _user_to_dict(user, providers)
+
+        user_dict = await _run_in_session(transaction)
+        if user_dict is not None:
+            _user_cache_set(("username", username), user_dict)
+        return user_dict
+
     @staticmethod
     async def get_user_by_oauth(provider: str, provider_user_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -184,35 +325,26 @@ class UserRepository:
         Returns:
             Dictionary containing user data if found, None otherwise
         """
-        with get_db_session() as session:
-            token = session.query(OAuthToken).filter(
-                and_(
-                    OAuthToken.provider == provider,
-                    OAuthToken.provider_user_id == provider_user_id
-                )
-            ).first()
+        def transaction(session: Session):
+            # Join the matching token to pick the user, and the user's
+            # tokens again for the provider list
+            linked = aliased(OAuthToken)
+            found = _user_with_providers(
+                session,
+                User.id == linked.user_id,
+                linked.provider == provider,
+                linked.provider_user_id == provider_user_id
+            )
             
-            if not token or not token.user:
+            if not found:
                 return None
                 
-            user = token.user
-            
             # Convert to dictionary before the session closes
-            providers = [t.provider for t in user.oauth_tokens]
-            
-            return {
-                "id": user.id,
-                "email": user.email,
-                "username": user.username,
-                "display_name": user.display_name,
-                "permissions": json.loads(user.permissions) if isinstance(user.permissions, str) else user.permissions,
-                "profile_picture": user.profile_picture,
-                "is_active": user.is_active,
-                "created_at": user.created_at.isoformat() if user.created_at else None,
-                "last_login": user.last_login.isoformat() if user.last_login else None,
-                "oauth_providers": providers
-            }
-    
+            user, providers = found
+            return _user_to_dict(user, providers)
+
+        return await _run_in_session(transaction)
+
     @staticmethod
     async def update_user_last_login(user_id: str) -> bool:
         """
@@ -224,16 +356,20 @@ class UserRepository:
         Returns:
             Success flag indicating if update was successful
         """
-        with get_db_session() as session:
+        def transaction(session: Session):
             user = session.query(User).filter(User.id == user_id).first()
             if not user:
                 logger.warning(f"Attempted to update last login for non-existent user: {user_id}")
                 return False
                 
             user.last_login = datetime.utcnow()
-            session.commit()
+            session.flush()
             return True
-    
+
+        result = await _run_in_session(transaction)
+        clear_user_cache()
+        return result
+
     @staticmethod
     async def save_oauth_token(
         user_id: str,
@@ -265,100 +401,83 @@ class UserRepository:
             ValueError: If user does not exist
             RuntimeError: If database operation fails
         """
-        with get_db_session() as session:
-            # Check if user exists
-            user = session.query(User).filter(User.id == user_id).first()
-            if not user:
+        def transaction(session: Session):
+            # Check if user exists, selecting only the key; SQLite does not
+            # enforce the foreign key, so the check stays explicit
+            if session.query(User.id).filter(User.id == user_id).scalar() is None:
                 logger.warning(f"Attempted to save OAuth token for non-existent user: {user_id}")
                 raise ValueError("User does not exist")
             
-            # Calculate expiration timestamp
-            expires_at = datetime.utcnow() + timedelta(seconds=expires_in)
-            
-            # Encrypt sensitive token data
-            encrypted_access_token = encrypt_value(access_token)
-            encrypted_refresh_token = encrypt_value(refresh_token) if refresh_token else None
+            # One timestamp for expiry, creation and update, so they agree
+            now = datetime.utcnow()
+            expires_at = now + timedelta(seconds=expires_in)
             
-            # Check if token for this provider already exists
-            existing_token = session.query(OAuthToken).filter(
-                and_(
-                    OAuthToken.user_id == user_id,
-                    OAuthToken.provider == provider
-                )
-            ).first()
+            # Insert or update in one statement on the (user_id, provider)
+            # unique constraint; the refresh token is only replaced when a
+            # new one was issued
+            updates = {
+                "provider_user_id": provider_user_id,
+                "provider_email": provider_email,
+                "access_token": access_token,
+                "expires_at": expires_at,
+                "scopes": ",".join(scopes),
+                "updated_at": now
+            }
+            if refresh_token:
+                updates["refresh_token"] = refresh_token
             
-            token_dict = {}
+            stmt = _upsert_insert(session)(OAuthToken).values({
+                **updates,
+                "user_id": user_id,
+                "provider": provider,
+                "refresh_token": refresh_token or None,
+                "token_type": "Bearer",
+                "created_at": now
+            })
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[OAuthToken.user_id, OAuthToken.provider],
+                set_=updates
+            ).returning(
+                OAuthToken.id,
+                OAuthToken.user_id,
+                OAuthToken.provider,
+                OAuthToken.provider_user_id,
+                OAuthToken.provider_email,
+                OAuthToken.expires_at,
+                OAuthToken.scopes,
+                OAuthToken.created_at,
+                OAuthToken.updated_at
+            )
             
-            if existing_token:
-                # Update existing token
-                existing_token.provider_user_id = provider_user_id
-                existing_token.provider_email = provider_email
-                existing_token.access_token = encrypted_access_token
-                if encrypted_refresh_token:
-                    existing_token.refresh_token = encrypted_refresh_token
-                existing_token.expires_at = expires_at
-                existing_token.scopes = ",".join(scopes)
-                existing_token.updated_at = datetime.utcnow()
-                
-                token = existing_token
-                logger.info(f"Updated OAuth token for user {user_id} and provider {provider}")
+            try:
+                token = session.execute(stmt).one()
+                logger.info(f"Saved OAuth token for user {user_id} and provider {provider}")
                 
-                # Build token dictionary
-                token_dict = {
+                return {
                     "id": token.id,
                     "user_id": token.user_id,
                     "provider": token.provider,
                     "provider_user_id": token.provider_user_id,
                     "provider_email": token.provider_email,
-                    "expires_at": token.expires_at.isoformat() if token.expires_at else None,
+                    "expires_at": _iso(token.expires_at),
                     "scopes": token.scopes.split(",") if token.scopes else [],
-                    "created_at": token.created_at.isoformat() if token.created_at else None,
-                    "updated_at": token.updated_at.isoformat() if token.updated_at else None
+                    "created_at": _iso(token.created_at),
+                    "updated_at": _iso(token.updated_at)
                 }
-            else:
-                # Create new token
-                token = OAuthToken(
-                    user_id=user_id,
-                    provider=provider,
-                    provider_user_id=provider_user_id,
-                    provider_email=provider_email,
-                    access_token=encrypted_access_token,
-                    refresh_token=encrypted_refresh_token,
-                    token_type="Bearer",
-                    expires_at=expires_at,
-                    scopes=",".join(scopes),
-                    created_at=datetime.utcnow(),
-                    updated_at=datetime.utcnow()
-                )
-                session.add(token)
-                logger.info(f"Created new OAuth token for user {user_id} and provider {provider}")
-            
-            try:
-                session.commit()
-                
-                # If token_dict wasn't set (for new tokens), build it now
-                if not token_dict:
-                    token_dict = {
-                        "id": token.id,
-                        "user_id": token.user_id,
-                        "provider": token.provider,
-                        "provider_user_id": token.provider_user_id,
-                        "provider_email": token.provider_email,
-                        "expires_at": token.expires_at.isoformat() if token.expires_at else None,
-                        "scopes": token.scopes.split(",") if token.scopes else [],
-                        "created_at": token.created_at.isoformat() if token.created_at else None,
-                        "updated_at": token.updated_at.isoformat() if token.updated_at else None
-                    }
-                
-                return token_dict
             except Exception as e:
                 logger.error(f"Failed to save OAuth token for user {user_id}: {str(e)}")
                 raise RuntimeError(f"Failed to save OAuth token: {str(e)}")
-    
+
+        result = await _run_in_session(transaction)
+        clear_user_cache()
+        return result
+
     @staticmethod
     async def get_oauth_tokens(user_id: str, provider: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Get OAuth tokens for a user with decrypted values.
+
+        Token columns are decrypted by the EncryptedText column type on load.
         
         Args:
             user_id: User ID to retrieve tokens for
@@ -367,7 +486,7 @@ class UserRepository:
         Returns:
             List of token dictionaries with decrypted values
         """
-        with get_db_session() as session:
+        def transaction(session: Session):
             query = session.query(OAuthToken).filter(OAuthToken.user_id == user_id)
             
             if provider:
@@ -383,13 +502,15 @@ class UserRepository:
                     "provider": token.provider,
                     "provider_user_id": token.provider_user_id,
                     "provider_email": token.provider_email,
-                    "access_token": decrypt_value(token.access_token),
-                    "refresh_token": decrypt_value(token.refresh_token) if token.refresh_token else None,
+                    "access_token": token.access_token,
+                    "refresh_token": token.refresh_token or None,
                     "token_type": token.token_type,
-                    "expires_at": token.expires_at.isoformat() if token.expires_at else None,
+                    "expires_at": _iso(token.expires_at),
                     "scopes": token.scopes.split(",") if token.scopes else [],
-                    "created_at": token.created_at.isoformat() if token.created_at else None,
-                    "updated_at": token.updated_at.isoformat() if token.updated_at else None
+                    "created_at": _iso(token.created_at),
+                    "updated_at": _iso(token.updated_at)
                 })
                 
-            return result
\ No newline at end of file
+            return result
+
+        return await _run_in_session(transaction)
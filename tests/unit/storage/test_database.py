@@ -7,6 +7,7 @@ connection pooling, and proper error management.
 
 import os
 import pytest
+from datetime import datetime, timedelta
 from unittest.mock import patch, MagicMock, call
 
 from sqlalchemy.exc import SQLAlchemyError
@@ -14,7 +15,15 @@ from sqlalchemy.orm import Session
 
 from src.storage.database import (
     init_db,
+    run_migrations,
     get_db_session,
+    get_async_db_session,
+    get_async_url,
+    bulk_insert_tokens,
+    request_db_session,
+    _set_sqlite_pragmas,
+    SQLITE_PRAGMAS,
+    JSON_ENGINE_ARGS,
     engine,
     SessionLocal,
     DB_PATH
@@ -31,18 +40,24 @@ class TestDatabaseModule:
         assert DB_PATH == "sqlite:///data/secure/sentient_inbox.db"
         assert "QueuePool" in str(engine.pool.__class__)
     
+    @patch('src.storage.database.run_migrations')
     @patch('src.storage.database.Base')
-    def test_init_db_success(self, mock_base):
+    def test_init_db_success(self, mock_base, mock_run_migrations):
         """Test successful database initialization."""
         # Setup mock
-        mock_metadata = MagicMock()
+        order = MagicMock()
+        mock_metadata = order.metadata
         mock_base.metadata = mock_metadata
+        order.attach_mock(mock_run_migrations, "run_migrations")
         
         # Call function
         init_db()
         
-        # Verify metadata.create_all was called with engine
+        # Verify metadata.create_all was called with engine, then migrations
         mock_metadata.create_all.assert_called_once_with(bind=engine)
+        assert [c[0] for c in order.mock_calls if c[0] in ("metadata.create_all", "run_migrations")] == [
+            "metadata.create_all", "run_migrations"
+        ]
     
     @patch('src.storage.database.Base')
     def test_init_db_error_handling(self, mock_base):
@@ -144,6 +159,187 @@ class TestDatabaseModule:
                 assert 'connect_args' in kwargs
                 assert kwargs['connect_args'] == {'check_same_thread': False}
 
+    def test_get_async_url_rewrites_driver(self):
+        """Test sync URLs are rewritten to their async drivers."""
+        assert get_async_url("sqlite:///data/x.db") == "sqlite+aiosqlite:///data/x.db"
+        assert get_async_url("postgresql://u@h/db") == "postgresql+asyncpg://u@h/db"
+        assert get_async_url("sqlite+aiosqlite:///x.db") == "sqlite+aiosqlite:///x.db"
+
+    @pytest.mark.asyncio
+    async def test_get_async_db_session_disabled(self):
+        """Test the async session refuses to open when DB_ASYNC is off."""
+        with patch('src.storage.database.AsyncSessionLocal', None):
+            with pytest.raises(RuntimeError):
+                async with get_async_db_session():
+                    pass
+
+
+    def test_sqlite_pragmas_applied_on_connect(self):
+        """Test every SQLite pragma is executed and the cursor is closed."""
+        mock_connection = MagicMock()
+        mock_cursor = mock_connection.cursor.return_value
+
+        _set_sqlite_pragmas(mock_connection, None)
+
+        mock_cursor.execute.assert_has_calls([call(p) for p in SQLITE_PRAGMAS])
+        assert "PRAGMA journal_mode=WAL" in SQLITE_PRAGMAS
+        mock_cursor.close.assert_called_once()
+
+
+    def test_bulk_insert_tokens(self):
+        """Test tokens are inserted in one statement, encrypted and timestamped."""
+        from datetime import datetime, timedelta
+        from sqlalchemy import create_engine, text
+        from sqlalchemy.orm import sessionmaker
+        from src.storage.models import Base, User, OAuthToken
+
+        memory_engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=memory_engine)
+        memory_sessions = sessionmaker(bind=memory_engine)
+        with memory_sessions() as session:
+            session.add(User(id="u1", email="a@example.com", username="a"))
+            session.commit()
+
+        rows = [
+            {
+                "user_id": "u1",
+                "provider": provider,
+                "provider_user_id": f"{provider}-sub",
+                "provider_email": "a@example.com",
+                "access_token": f"{provider}-access",
+                "refresh_token": None,
+                "expires_at": datetime.utcnow() + timedelta(hours=1),
+                "scopes": "email"
+            }
+            for provider in ("google", "microsoft")
+        ]
+
+        with patch('src.storage.database.SessionLocal', memory_sessions):
+            assert bulk_insert_tokens(rows) == 2
+            assert bulk_insert_tokens([]) == 0
+
+        with memory_sessions() as session:
+            raw = session.execute(text("SELECT access_token FROM oauth_tokens")).scalars().all()
+            tokens = session.query(OAuthToken).order_by(OAuthToken.provider).all()
+
+        assert "google-access" not in raw
+        assert [t.access_token for t in tokens] == ["google-access", "microsoft-access"]
+        assert all(t.created_at and t.id for t in tokens)
+
+    def test_json_engine_args_round_trip_permissions(self):
+        """Test JSON columns round-trip through the configured serializers."""
+        from sqlalchemy import create_engine, text
+        from sqlalchemy.orm import sessionmaker
+        from src.storage.models import Base, User
+
+        memory_engine = create_engine("sqlite://", **JSON_ENGINE_ARGS)
+        Base.metadata.create_all(bind=memory_engine)
+        memory_sessions = sessionmaker(bind=memory_engine)
+        with memory_sessions() as session:
+            session.add(User(email="a@example.com", username="a", permissions=["view", "admin"]))
+            session.commit()
+
+        with memory_sessions() as session:
+            raw = session.execute(text("SELECT permissions FROM users")).scalar_one()
+            user = session.query(User).one()
+
+        assert isinstance(raw, str)
+        assert user.permissions == ["view", "admin"]
+
+    @pytest.mark.asyncio
+    async def test_request_db_session_shares_one_commit(self):
+        """Test sessions within a request scope share one session and commit once."""
+        import asyncio
+
+        mock_session = MagicMock()
+
+        def repository_work():
+            with get_db_session() as session:
+                session.add("row")
+                return session
+
+        with patch('src.storage.database.SessionLocal', return_value=mock_session):
+            async with request_db_session():
+                first = await asyncio.to_thread(repository_work)
+                second = await asyncio.to_thread(repository_work)
+
+        assert first is mock_session and second is mock_session
+        mock_session.commit.assert_called_once()
+        mock_session.close.assert_called_once()
+
+        # Outside the request scope each session commits on its own
+        with patch('src.storage.database.SessionLocal') as mock_factory:
+            with get_db_session():
+                pass
+        mock_factory.return_value.commit.assert_called_once()
+
+    def test_run_migrations_applies_each_once(self):
+        """Test data migrations run once and are recorded in schema_migrations."""
+        from sqlalchemy import create_engine, text
+        from sqlalchemy.orm import sessionmaker
+        from sqlalchemy.pool import StaticPool
+        from src.storage.models import Base, User
+
+        memory_engine = create_engine(
+            "sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}, **JSON_ENGINE_ARGS
+        )
+        memory_sessions = sessionmaker(bind=memory_engine)
+
+        with patch('src.storage.database.engine', memory_engine), \
+                patch('src.storage.database.SessionLocal', memory_sessions):
+            # Tables not created yet: nothing to migrate
+            assert run_migrations() == []
+
+            Base.metadata.create_all(bind=memory_engine)
+            with memory_sessions() as session:
+                session.add(User(email="a@example.com", username="a", permissions=[]))
+                session.commit()
+                session.execute(text("UPDATE users SET permissions = :p"), {"p": '"[\\"view\\"]"'})
+                session.commit()
+
+            assert run_migrations() == ["0001_permissions_json_lists", "0002_oauth_tokens_unique_provider"]
+            assert run_migrations() == []
+
+        with memory_sessions() as session:
+            assert session.query(User.permissions).scalar() == ["view"]
+
+    def test_init_db_adds_unique_provider_index_to_existing_table(self):
+        """Test init_db de-duplicates tokens and adds uq_user_provider to an old table."""
+        from sqlalchemy import create_engine, inspect, text
+        from sqlalchemy.orm import sessionmaker
+        from sqlalchemy.pool import StaticPool
+        from src.storage.models import Base, User, OAuthToken
+
+        memory_engine = create_engine(
+            "sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}, **JSON_ENGINE_ARGS
+        )
+        memory_sessions = sessionmaker(bind=memory_engine)
+        # Schema as created before the unique index existed
+        Base.metadata.create_all(bind=memory_engine)
+        with memory_engine.begin() as connection:
+            connection.execute(text("DROP INDEX uq_user_provider"))
+            connection.execute(text("DROP TABLE schema_migrations"))
+
+        expires = datetime.utcnow() + timedelta(hours=1)
+        with memory_sessions() as session:
+            session.add(User(id="u1", email="a@example.com", username="a", permissions=[]))
+            for token, updated in (("old", datetime(2024, 1, 1)), ("new", datetime(2024, 6, 1))):
+                session.add(OAuthToken(
+                    user_id="u1", provider="google", provider_user_id="g1",
+                    provider_email="a@example.com", access_token=token,
+                    expires_at=expires, scopes="email", updated_at=updated
+                ))
+            session.commit()
+
+        with patch('src.storage.database.engine', memory_engine), \
+                patch('src.storage.database.SessionLocal', memory_sessions):
+            init_db()
+
+        indexes = {index["name"]: index for index in inspect(memory_engine).get_indexes("oauth_tokens")}
+        assert indexes["uq_user_provider"]["unique"]
+        with memory_sessions() as session:
+            assert [t.access_token for t in session.query(OAuthToken)] == ["new"]
+
 
 if __name__ == "__main__":
     pytest.main()
@@ -13,8 +13,11 @@ from cryptography.fernet import Fernet
 
 from src.storage.encryption import (
     get_encryption_key,
+    encrypt_many,
     encrypt_value,
     decrypt_value,
+    AESGCM_VERSION,
+    NONCE_SIZE,
 )
 
 
@@ -35,6 +38,15 @@ class TestEncryption:
             result = get_encryption_key()
             assert result == test_key
     
+    def test_get_encryption_key_raw_32_byte_key(self):
+        """Test a key that decodes to 32 bytes is used directly as the Fernet key."""
+        test_key = Fernet.generate_key()
+        
+        with patch.dict(os.environ, {"TOKEN_ENCRYPTION_KEY": test_key.decode()}):
+            result = get_encryption_key()
+        
+        assert result == test_key
+    
     def test_get_encryption_key_generates_new(self):
         """Test generating a new encryption key when not in environment."""
         with patch.dict(os.environ, {}, clear=True):
@@ -43,6 +55,18 @@ class TestEncryption:
                 assert isinstance(result, bytes)
                 assert len(result) > 0
     
+    def test_get_encryption_key_generated_key_not_persisted(self, tmp_path, monkeypatch):
+        """Test a generated key is kept in memory only and never written to disk."""
+        monkeypatch.chdir(tmp_path)
+        
+        with patch.dict(os.environ, {}, clear=True):
+            first = get_encryption_key()
+            second = get_encryption_key()
+        
+        assert Fernet(first)
+        assert first != second
+        assert list(tmp_path.iterdir()) == []
+    
     def test_get_encryption_key_handles_invalid_env(self):
         """Test handling invalid environment key value."""
         with patch.dict(os.environ, {"TOKEN_ENCRYPTION_KEY": "invalid_base64"}):
@@ -51,7 +75,7 @@ class TestEncryption:
                 assert isinstance(result, bytes)
                 assert len(result) > 0
     
-    @patch('src.storage.encryption.cipher_suite')
+    @patch('src.storage.encryption.aes_cipher')
     def test_encrypt_value_string_input(self, mock_cipher):
         """Test encrypting string values."""
         mock_cipher.encrypt.return_value = b'encrypted_value'
@@ -60,19 +84,23 @@ class TestEncryption:
         
         mock_cipher.encrypt.assert_called_once()
         assert isinstance(result, str)
-        assert base64.urlsafe_b64decode(result) == b'encrypted_value'
+        decoded = base64.urlsafe_b64decode(result)
+        assert decoded[:1] == AESGCM_VERSION
+        assert decoded[1 + NONCE_SIZE:] == b'encrypted_value'
     
-    @patch('src.storage.encryption.cipher_suite')
+    @patch('src.storage.encryption.aes_cipher')
     def test_encrypt_value_bytes_input(self, mock_cipher):
         """Test encrypting bytes values."""
         mock_cipher.encrypt.return_value = b'encrypted_bytes'
         
         result = encrypt_value(b'test_bytes')
         
-        mock_cipher.encrypt.assert_called_once_with(b'test_bytes')
+        nonce = mock_cipher.encrypt.call_args[0][0]
+        mock_cipher.encrypt.assert_called_once_with(nonce, b'test_bytes', None)
+        assert len(nonce) == NONCE_SIZE
         assert isinstance(result, str)
     
-    @patch('src.storage.encryption.cipher_suite')
+    @patch('src.storage.encryption.aes_cipher')
     def test_encrypt_value_none_input(self, mock_cipher):
         """Test encrypting None values."""
         mock_cipher.encrypt.return_value = b'encrypted_value'
@@ -82,7 +110,7 @@ class TestEncryption:
         mock_cipher.encrypt.assert_not_called()
         assert result is None
     
-    @patch('src.storage.encryption.cipher_suite')
+    @patch('src.storage.encryption.aes_cipher')
     def test_encrypt_value_error_handling(self, mock_cipher):
         """Test error handling during encryption."""
         mock_cipher.encrypt.side_effect = Exception("Encryption error")
@@ -144,3 +172,22 @@ class TestEncryption:
             
             # Verify we got back the original value
             assert decrypted == test_value
+    
+    def test_encrypt_many_preserves_order_and_none(self):
+        """Test batch encryption keeps input order, None entries and unique nonces."""
+        values = ["first", None, b"second", "first"]
+        
+        encrypted = encrypt_many(values)
+        
+        assert encrypted[1] is None
+        assert [decrypt_value(v) for v in encrypted if v is not None] == ["first", "second", "first"]
+        nonces = {base64.urlsafe_b64decode(v)[1:1 + NONCE_SIZE] for v in encrypted if v is not None}
+        assert len(nonces) == 3
+    
+    def test_decrypt_value_legacy_fernet_token(self):
+        """Test values written by the previous Fernet scheme still decrypt."""
+        from src.storage.encryption import cipher_suite
+        
+        legacy = base64.urlsafe_b64encode(cipher_suite.encrypt(b"legacy token")).decode()
+        
+        assert decrypt_value(legacy) == "legacy token"
@@ -0,0 +1,66 @@
+"""
+Unit tests for database models.
+
+These tests validate column-level token encryption and default values
+using an in-memory SQLite database.
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from src.storage.models import Base, User, OAuthToken
+from src.storage.encryption import decrypt_value
+
+
+class TestModels:
+    """Test suite for User and OAuthToken models."""
+
+    @pytest.fixture
+    def session(self):
+        """Create a session bound to a fresh in-memory database."""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        session = sessionmaker(bind=engine)()
+        yield session
+        session.close()
+
+    def test_user_permissions_default_is_list(self, session):
+        """Test the default permissions are stored and loaded as a list."""
+        session.add(User(email="a@example.com", username="a"))
+        session.commit()
+
+        user = session.query(User).one()
+
+        assert user.permissions == ["view"]
+        assert user.to_dict()["permissions"] == ["view"]
+
+    def test_oauth_token_columns_encrypted_at_rest(self, session):
+        """Test token columns are encrypted in the table and decrypted on load."""
+        user = User(email="a@example.com", username="a")
+        session.add(user)
+        session.flush()
+        session.add(OAuthToken(
+            user_id=user.id,
+            provider="google",
+            provider_user_id="sub-1",
+            provider_email="a@gmail.com",
+            access_token="access-123",
+            refresh_token=None,
+            expires_at=datetime.utcnow() + timedelta(hours=1),
+            scopes="email"
+        ))
+        session.commit()
+        session.expunge_all()
+
+        raw_access, raw_refresh = session.execute(
+            text("SELECT access_token, refresh_token FROM oauth_tokens")
+        ).one()
+        token = session.query(OAuthToken).one()
+
+        assert raw_access != "access-123"
+        assert decrypt_value(raw_access) == "access-123"
+        assert raw_refresh is None
+        assert token.access_token == "access-123"
+        assert token.refresh_token is None
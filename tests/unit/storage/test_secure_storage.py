@@ -12,12 +12,13 @@ import pytest
 import asyncio
 import tempfile
 import shutil
+import threading
 from datetime import datetime, timedelta
 from unittest.mock import patch, MagicMock, AsyncMock, mock_open
 from pathlib import Path
 from cryptography.fernet import Fernet
 
-from src.storage.secure import SecureStorage
+from src.storage.secure import RecordCipher, SecureStorage
 
 
 class TestSecureStorage:
@@ -116,31 +117,42 @@ class TestSecureStorage:
                 assert keys_path.exists()
                 
                 # Read the key file to verify format
-                with open(keys_path, 'r') as f:
-                    key_data = json.load(f)
-                    assert "keys" in key_data
-                    assert isinstance(key_data["keys"], list)
-                    assert len(key_data["keys"]) > 0
+                assert keys_path.read_bytes().split(b"\n") == storage.keys
+                assert len(storage.keys) > 0
     
     def test_initialize_keys_existing(self, temp_storage_path):
         """Test loading existing keys during initialization."""
         keys_path = Path(temp_storage_path) / "key_history.bin"
         
         # Create a key file before initializing
-        test_key = base64.urlsafe_b64encode(b'test_key_data').decode()
+        test_keys = [Fernet.generate_key(), Fernet.generate_key()]
+        os.makedirs(temp_storage_path, exist_ok=True)
+        with open(keys_path, 'wb') as f:
+            f.write(b"\n".join(test_keys))
+        
+        with patch('src.storage.secure.Fernet'):
+            storage = SecureStorage(storage_path=temp_storage_path)
+            
+            # The test keys should have been loaded in order
+            assert storage.keys == test_keys
+    
+    def test_initialize_keys_legacy_json(self, temp_storage_path):
+        """Test loading a key history written in the old JSON format."""
+        keys_path = Path(temp_storage_path) / "key_history.bin"
+        plain_key = Fernet.generate_key()
+        encoded_key = Fernet.generate_key()
+        
         os.makedirs(temp_storage_path, exist_ok=True)
         with open(keys_path, 'w') as f:
-            json.dump({"keys": [test_key]}, f)
+            json.dump({"keys": [plain_key.decode(), base64.urlsafe_b64encode(encoded_key).decode()]}, f)
         
         with patch('src.storage.secure.Fernet'):
             storage = SecureStorage(storage_path=temp_storage_path)
             
-            # The test key should have been loaded
-            assert len(storage.keys) == 1
-            assert storage.keys[0] == b'test_key_data'
+            assert storage.keys == [plain_key, encoded_key]
     
-    def test_initialize_keys_error_recovery(self, temp_storage_path):
-        """Test recovery from key initialization errors."""
+    def test_initialize_keys_corrupt_file(self, temp_storage_path):
+        """Test a corrupt key history raises instead of being replaced."""
         keys_path = Path(temp_storage_path) / "key_history.bin"
         
         # Create an invalid key file
@@ -149,27 +161,29 @@ class TestSecureStorage:
             f.write("invalid json")
         
         with patch('src.storage.secure.Fernet'):
-            with patch('os.urandom', return_value=b'x' * 32):
-                storage = SecureStorage(storage_path=temp_storage_path)
-                
-                # Should recover by generating a new key
-                assert len(storage.keys) == 1
+            with pytest.raises(ValueError):
+                SecureStorage(storage_path=temp_storage_path)
+        
+        # The key history is left for manual recovery
+        assert keys_path.read_text() == "invalid json"
     
     def test_save_keys(self, secure_storage):
         """Test saving encryption keys."""
         test_keys = [b'key1', b'key2']
         
-        with patch('builtins.open', mock_open()) as mock_file:
+        with patch('builtins.open', mock_open()) as mock_file, \
+                patch('os.fsync'), patch('os.replace') as mock_replace:
             result = secure_storage._save_keys(test_keys)
             
             assert result is True
             mock_file.assert_called_once()
+            mock_replace.assert_called_once_with(
+                secure_storage.keys_file.with_suffix('.tmp'), secure_storage.keys_file
+            )
             
             # Verify the written data
             write_data = mock_file().write.call_args[0][0]
-            data = json.loads(write_data)
-            assert "keys" in data
-            assert len(data["keys"]) == 2
+            assert write_data == b"key1\nkey2"
     
     def test_save_keys_error_handling(self, secure_storage):
         """Test error handling during key saving."""
@@ -469,6 +483,21 @@ class TestSecureStorage:
         assert len(remaining_files) == 1
         assert remaining_files[0].name == "records_backup_recent.bin"
     
+    def test_cleanup_old_backups_uses_name_timestamp(self, secure_storage, temp_storage_path):
+        """Test backup age is read from the timestamp in the file name."""
+        backup_dir = Path(temp_storage_path) / "backups"
+        now = datetime.now()
+        
+        recent_file = backup_dir / f"records_backup_{now:%Y%m%d_%H%M%S}.bin"
+        old_file = backup_dir / f"records_backup_{now - timedelta(days=10):%Y%m%d_%H%M%S}.bin"
+        for backup_file in (recent_file, old_file):
+            backup_file.touch()
+        
+        secure_storage._cleanup_old_backups()
+        
+        assert recent_file.exists()
+        assert not old_file.exists()
+    
     def test_restore_from_backup_no_backups(self, secure_storage, temp_storage_path):
         """Test restore behavior when no backups exist."""
         backup_dir = Path(temp_storage_path) / "backups"
@@ -799,3 +828,311 @@ class TestSecureStorage:
             assert counts["not_actionable"] == 1
             assert counts["not_meeting"] == 0
             assert counts["unknown"] == 1  # The unknown_category gets counted as "unknown"
+
+    @pytest.mark.asyncio
+    async def test_add_record_appends_to_log(self, temp_storage_path):
+        """Test records are appended to the log without rewriting the base file."""
+        storage = SecureStorage(storage_path=temp_storage_path)
+
+        for i in range(3):
+            _, success = await storage.add_record({"message_id": f"msg{i}", "thread_messages": [f"t{i}"]})
+            assert success is True
+
+        assert storage.record_log.stat().st_size > 0
+        assert (await storage.is_processed("t1")) == (True, True)
+
+        # A fresh instance sees the appended records
+        reopened = SecureStorage(storage_path=temp_storage_path)
+        assert await reopened.get_record_count() == 3
+
+    @pytest.mark.asyncio
+    async def test_record_log_compaction(self, temp_storage_path):
+        """Test the log is folded into the base file once it exceeds the size limit."""
+        storage = SecureStorage(storage_path=temp_storage_path)
+
+        with patch('src.storage.secure.RECORD_LOG_MAX_BYTES', 0):
+            await storage.add_record({"message_id": "msg1"})
+
+        assert storage.record_log.stat().st_size == 0
+        assert await storage.get_record_count() == 1
+
+    @pytest.mark.asyncio
+    async def test_read_ignores_truncated_log_frame(self, temp_storage_path):
+        """Test a torn final frame from an interrupted append is skipped."""
+        storage = SecureStorage(storage_path=temp_storage_path)
+        await storage.add_record({"message_id": "msg1"})
+
+        with open(storage.record_log, 'ab') as f:
+            f.write((1000).to_bytes(4, "big") + b"partial")
+
+        assert await storage.get_record_count() == 1
+
+    @pytest.mark.asyncio
+    async def test_read_uses_cache_until_files_change(self, temp_storage_path):
+        """Test repeated reads skip decryption and external writes invalidate the cache."""
+        storage = SecureStorage(storage_path=temp_storage_path)
+        await storage.add_record({"message_id": "msg1"})
+        assert await storage.get_record_count() == 1
+
+        with patch('src.storage.secure.RecordCipher') as mock_cipher_cls:
+            assert await storage.get_record_count() == 1
+            mock_cipher_cls.assert_not_called()
+
+        # Callers that modify the returned data don't touch the cache
+        data = await storage._read_encrypted_data()
+        data["records"].clear()
+        assert await storage.get_record_count() == 1
+
+        # Another instance appending to the log is picked up
+        other = SecureStorage(storage_path=temp_storage_path)
+        await other.add_record({"message_id": "msg2"})
+        assert await storage.get_record_count() == 2
+
+    @pytest.mark.asyncio
+    async def test_is_processed_index_tracks_appends(self, temp_storage_path):
+        """Test the message id index is built once and extended on append."""
+        storage = SecureStorage(storage_path=temp_storage_path)
+        await storage.add_record({"message_id": "msg1", "thread_messages": ["t1"]})
+        assert await storage.is_processed("t1") == (True, True)
+        indexed = storage._index_data
+
+        await storage.add_record({"message_id": "msg2", "thread_messages": ["t2"]})
+
+        assert await storage.is_processed("msg2") == (True, True)
+        assert await storage.is_processed("t2") == (True, True)
+        assert await storage.is_processed("msg3") == (False, True)
+        assert storage._index_data is indexed
+
+    def test_create_backup_debounced(self, temp_storage_path):
+        """Test routine backups are skipped while a recent backup exists."""
+        storage = SecureStorage(storage_path=temp_storage_path)
+        backups = lambda: list(storage.backup_dir.glob("records_backup_*.bin"))
+
+        assert storage._create_backup() is True
+        assert len(backups()) == 1
+        assert backups()[0].read_bytes() == storage.record_file.read_bytes()
+
+        # Move the first backup aside so a new one can't reuse its name
+        earlier = (datetime.now() - timedelta(minutes=1)).strftime("%Y%m%d_%H%M%S")
+        backups()[0].rename(storage.backup_dir / f"records_backup_{earlier}.bin")
+        assert storage._create_backup() is True
+        assert len(backups()) == 1
+
+        assert storage._create_backup(force=True) is True
+        assert len(backups()) == 2
+
+    @pytest.mark.asyncio
+    async def test_add_record_maintenance_single_write(self, temp_storage_path):
+        """Test due cleanup and key rotation share one write of the base file."""
+        storage = SecureStorage(storage_path=temp_storage_path)
+        await storage.add_record({"message_id": "msg1"})
+        old_key = storage.current_key
+
+        data = await storage._read_encrypted_data()
+        data["metadata"]["last_cleanup"] = "2000-01-01T00:00:00"
+        data["metadata"]["last_key_rotation"] = "2000-01-01T00:00:00"
+        storage._write_encrypted_data(data)
+        storage = SecureStorage(storage_path=temp_storage_path)
+
+        with patch.object(storage, '_write_encrypted_data',
+                          wraps=storage._write_encrypted_data) as mock_write:
+            _, success = await storage.add_record({"message_id": "msg2"})
+
+        assert success is True
+        mock_write.assert_called_once()
+        assert storage.current_key != old_key
+        assert await storage.get_record_count() == 2
+
+    def test_restore_from_backup_copies_current_key_backup(self, temp_storage_path):
+        """Test a backup under the current key is copied without re-encryption."""
+        storage = SecureStorage(storage_path=temp_storage_path)
+        storage._create_backup(force=True)
+        backup = next(storage.backup_dir.glob("records_backup_*.bin"))
+        storage.record_file.write_bytes(b"corrupted")
+
+        with patch.object(storage.cipher_suite, 'encrypt') as mock_encrypt:
+            assert storage._restore_from_backup() is True
+
+        mock_encrypt.assert_not_called()
+        assert storage.record_file.read_bytes() == backup.read_bytes()
+
+    @pytest.mark.asyncio
+    async def test_add_record_skips_read_when_maintenance_not_due(self, temp_storage_path):
+        """Test inserts skip the maintenance read once cleanup and rotation are recent."""
+        storage = SecureStorage(storage_path=temp_storage_path)
+        await storage.add_record({"message_id": "msg1"})
+
+        with patch.object(storage, '_read_encrypted_data') as mock_read:
+            _, success = await storage.add_record({"message_id": "msg2"})
+            assert await storage.rotate_key() is True
+
+        assert success is True
+        mock_read.assert_not_called()
+        assert await storage.get_record_count() == 2
+
+    def test_record_cipher_reads_fernet_tokens(self):
+        """Test the AES-GCM cipher round-trips and still decrypts Fernet tokens."""
+        key = Fernet.generate_key()
+        cipher = RecordCipher(key)
+
+        token = cipher.encrypt(b"payload")
+        assert not token.startswith(b"gAAAAA")
+        assert cipher.decrypt(token) == b"payload"
+        assert cipher.decrypt(Fernet(key).encrypt(b"legacy")) == b"legacy"
+
+        with pytest.raises(Exception):
+            RecordCipher(Fernet.generate_key()).decrypt(token)
+
+    @pytest.mark.asyncio
+    async def test_read_legacy_fernet_store(self, temp_storage_path):
+        """Test a store written entirely with Fernet stays readable."""
+        storage = SecureStorage(storage_path=temp_storage_path)
+        data = await storage._read_encrypted_data()
+        data["records"].append({"message_id": "legacy1"})
+        storage.record_file.write_bytes(Fernet(storage.current_key).encrypt(json.dumps(data).encode()))
+
+        reopened = SecureStorage(storage_path=temp_storage_path)
+        assert await reopened.is_processed("legacy1") == (True, True)
+
+    @pytest.mark.asyncio
+    async def test_append_completes_short_writes(self, temp_storage_path):
+        """Test an append retries short writes until every frame byte is written."""
+        storage = SecureStorage(storage_path=temp_storage_path)
+        real_write = os.write
+
+        with patch('src.storage.secure.os.write', side_effect=lambda fd, data: real_write(fd, data[:16])):
+            _, success = await storage.add_record({"message_id": "msg1"})
+
+        assert success is True
+        reopened = SecureStorage(storage_path=temp_storage_path)
+        assert await reopened.is_processed("msg1") == (True, True)
+
+    @pytest.mark.asyncio
+    async def test_append_failure_leaves_no_partial_frame(self, temp_storage_path):
+        """Test a write failing midway (e.g. disk full) is rolled back and reported."""
+        storage = SecureStorage(storage_path=temp_storage_path)
+        await storage.add_record({"message_id": "msg1"})
+        log_size = storage.record_log.stat().st_size
+        real_write = os.write
+        calls = []
+
+        def fail_after_partial(fd, data):
+            calls.append(fd)
+            if len(calls) > 1:
+                raise OSError(28, "No space left on device")
+            return real_write(fd, data[:16])
+
+        with patch('src.storage.secure.os.write', side_effect=fail_after_partial):
+            _, success = await storage.add_record({"message_id": "msg2"})
+
+        assert success is False
+        assert storage.record_log.stat().st_size == log_size
+        await storage.add_record({"message_id": "msg3"})
+
+        reopened = SecureStorage(storage_path=temp_storage_path)
+        assert await reopened.is_processed("msg1") == (True, True)
+        assert await reopened.is_processed("msg2") == (False, True)
+        assert await reopened.is_processed("msg3") == (True, True)
+
+    @pytest.mark.asyncio
+    async def test_append_after_torn_log_keeps_acknowledged_records(self, temp_storage_path):
+        """Test records appended after a torn final frame survive a reload."""
+        storage = SecureStorage(storage_path=temp_storage_path)
+        await storage.add_records([{"message_id": "a"}, {"message_id": "b"}])
+
+        # Simulate an append interrupted mid-frame: a header promising
+        # more bytes than follow it
+        with open(storage.record_log, 'ab') as f:
+            f.write((1000).to_bytes(4, "big") + b"torn")
+
+        _, success = await storage.add_record({"message_id": "c"})
+        assert success is True
+        restarted = SecureStorage(storage_path=temp_storage_path)
+        _, success = await restarted.add_record({"message_id": "d", "thread_messages": ["d2"]})
+        assert success is True
+
+        reopened = SecureStorage(storage_path=temp_storage_path)
+        for message_id in ("a", "b", "c", "d", "d2"):
+            assert await reopened.is_processed(message_id) == (True, True)
+        assert await reopened.get_record_count() == 4
+
+    @pytest.mark.asyncio
+    async def test_add_records_batch(self, temp_storage_path):
+        """Test a batch is appended in one write and invalid entries are skipped."""
+        storage = SecureStorage(storage_path=temp_storage_path)
+        batch = [{"message_id": "msg1"}, None, {"message_id": "msg2", "thread_messages": ["t2"]}]
+
+        with patch('src.storage.secure.os.write', wraps=os.write) as mock_write:
+            record_ids, success = await storage.add_records(batch)
+
+        assert success is True
+        assert mock_write.call_count == 1
+        assert record_ids[1] == ""
+        assert all(len(record_id) == 32 for record_id in (record_ids[0], record_ids[2]))
+        assert await storage.is_processed("t2") == (True, True)
+        records = await storage.get_processed_records_since(datetime.min)
+        assert records[0]["timestamp"] == records[1]["timestamp"]
+
+        reopened = SecureStorage(storage_path=temp_storage_path)
+        assert await reopened.get_record_count() == 2
+
+    @pytest.mark.asyncio
+    async def test_add_records_builds_from_plain_copies(self, temp_storage_path):
+        """Test the batch builder never calls into the caller's mappings off the loop."""
+        class LoopOnlyDict(dict):
+            def get(self, key, default=None):
+                assert threading.current_thread() is threading.main_thread()
+                return super().get(key, default)
+
+        storage = SecureStorage(storage_path=temp_storage_path)
+        batch = [LoopOnlyDict(message_id="msg1", thread_messages=["t1"])]
+
+        record_ids, success = await storage.add_records(batch)
+
+        assert success is True
+        assert record_ids[0]
+        assert await storage.is_processed("t1") == (True, True)
+
+    @pytest.mark.asyncio
+    async def test_category_index_tracks_appends(self, temp_storage_path):
+        """Test category queries see records appended after the index was built."""
+        storage = SecureStorage(storage_path=temp_storage_path)
+        await storage.add_record({"message_id": "msg1", "analysis_results": {"final_category": "meeting"}})
+        assert len(await storage.get_records_by_category("meeting")) == 1
+
+        await storage.add_record({"message_id": "msg2", "analysis_results": {"final_category": "meeting"}})
+        await storage.add_record({"message_id": "msg3"})
+
+        meetings = await storage.get_records_by_category("meeting")
+        assert [record["message_id"] for record in meetings] == ["msg1", "msg2"]
+        counts = await storage.get_category_counts()
+        assert counts["meeting"] == 2
+        assert counts["unknown"] == 1
+
+    @pytest.mark.asyncio
+    async def test_cold_read_reencrypts_old_key_under_log_lock(self, temp_storage_path):
+        """Test a cold read of old-key data re-encrypts it only while holding the log lock."""
+        storage = SecureStorage(storage_path=temp_storage_path)
+        data = await storage._read_encrypted_data()
+        data["records"].append({"message_id": "old1"})
+        old_key = storage.current_key
+        storage.record_file.write_bytes(RecordCipher(old_key).encrypt(json.dumps(data).encode()))
+
+        new_key = storage._generate_secure_key()
+        storage.keys.insert(0, new_key)
+        storage.current_key = new_key
+        storage.cipher_suite = storage._cipher_for(new_key)
+
+        lock_held = []
+        real_write = storage._write_encrypted_data
+
+        def tracking_write(data):
+            lock_held.append(storage._log_lock.locked())
+            return real_write(data)
+
+        with patch.object(storage, '_write_encrypted_data', side_effect=tracking_write):
+            assert await storage.is_processed("old1") == (True, True)
+
+        assert lock_held == [True]
+        decrypted = RecordCipher(new_key).decrypt(storage.record_file.read_bytes())
+        assert json.loads(decrypted)["records"][0]["message_id"] == "old1"
@@ -7,25 +7,67 @@ data access patterns, and error handling.
 
 import json
 import pytest
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from unittest.mock import patch, MagicMock, AsyncMock
 
-from src.storage.models import User, OAuthToken
-from src.storage.user_repository import UserRepository
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.storage.models import Base, User, OAuthToken
+from src.storage.user_repository import UserRepository, clear_user_cache
 
 
 @pytest.mark.asyncio
 class TestUserRepository:
     """Test suite for UserRepository class."""
     
+    @pytest.fixture(autouse=True)
+    def empty_user_cache(self):
+        """Start every test without cached user lookups."""
+        clear_user_cache()
+        yield
+        clear_user_cache()
+    
     @pytest.fixture
     def mock_session(self):
         """Create a mock database session."""
         session = MagicMock()
         session.__enter__ = MagicMock(return_value=session)
         session.__exit__ = MagicMock(return_value=None)
+        # Savepoints must not swallow errors raised inside them
+        session.begin_nested.return_value.__exit__.return_value = False
         return session
     
+    @pytest.fixture
+    def sqlite_db(self):
+        """Route repository sessions to a fresh in-memory SQLite database."""
+        # One shared connection: repository sessions run in worker threads
+        engine = create_engine(
+            "sqlite://",
+            poolclass=StaticPool,
+            connect_args={"check_same_thread": False}
+        )
+        Base.metadata.create_all(bind=engine)
+        factory = sessionmaker(bind=engine)
+        
+        @contextmanager
+        def session_scope():
+            session = factory()
+            try:
+                yield session
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+        
+        with patch('src.storage.user_repository.get_db_session', session_scope):
+            yield factory
+    
     @pytest.fixture
     def mock_user(self):
         """Create a mock User object."""
@@ -63,13 +105,6 @@ class TestUserRepository:
         # Setup session mock
         mock_get_db_session.return_value = mock_session
         
-        # Setup query mocks
-        mock_query = MagicMock()
-        mock_filter = MagicMock()
-        mock_filter.first.return_value = None  # No existing user
-        mock_query.filter.return_value = mock_filter
-        mock_session.query.return_value = mock_query
-        
         # User data
         email = "new@example.com"
         username = "newuser"
@@ -88,18 +123,17 @@ class TestUserRepository:
         # Verify user was created with expected values
         assert user is not None
         
-        # Verify session operations
-        mock_session.query.assert_called_once_with(User)
-        mock_query.filter.assert_called_once()  # Check for existing user
+        # Verify session operations: no duplicate check before the insert
+        mock_session.query.assert_not_called()
         mock_session.add.assert_called_once()
-        mock_session.commit.assert_called_once()
+        mock_session.flush.assert_called_once()
         
         # Verify the added user has the correct attributes
         added_user = mock_session.add.call_args[0][0]
         assert added_user.email == email
         assert added_user.username == username
         assert added_user.display_name == display_name
-        assert added_user.permissions == json.dumps(["view"])  # Default permission
+        assert added_user.permissions == ["view"]  # Default permission
         assert added_user.created_at == datetime(2025, 1, 1, 12, 0, 0)
     
     @patch('src.storage.user_repository.get_db_session')
@@ -108,12 +142,10 @@ class TestUserRepository:
         # Setup session mock
         mock_get_db_session.return_value = mock_session
         
-        # Setup query mocks to return an existing user
-        mock_query = MagicMock()
-        mock_filter = MagicMock()
-        mock_filter.first.return_value = mock_user  # Existing user
-        mock_query.filter.return_value = mock_filter
-        mock_session.query.return_value = mock_query
+        # The insert violates the unique email constraint
+        mock_session.flush.side_effect = IntegrityError(
+            "INSERT", {}, Exception("UNIQUE constraint failed: users.email")
+        )
         
         # Call function with same email
         with pytest.raises(ValueError) as excinfo:
@@ -126,7 +158,9 @@ class TestUserRepository:
         assert "User with this email already exists" in str(excinfo.value)
         
         # Call function with same username but different email
-        mock_user.email = "different@example.com"  # Simulate different email but same username
+        mock_session.flush.side_effect = IntegrityError(
+            "INSERT", {}, Exception("UNIQUE constraint failed: users.username")
+        )
         
         with pytest.raises(ValueError) as excinfo:
             await UserRepository.create_user(
@@ -137,82 +171,123 @@ class TestUserRepository:
         # Verify error message
         assert "User with this username already exists" in str(excinfo.value)
         
-        # Verify no user was added or committed
-        mock_session.add.assert_not_called()
+        # Verify neither failed insert was committed; the session scope rolls back
+        assert mock_session.flush.call_count == 2
         mock_session.commit.assert_not_called()
     
-    @patch('src.storage.user_repository.get_db_session')
-    async def test_get_user_by_email(self, mock_get_db_session, mock_session, mock_user):
+    async def test_create_user_duplicate_sqlite(self, sqlite_db):
+        """Test duplicates are detected from real SQLite constraint errors."""
+        await UserRepository.create_user(email="a@example.com", username="a")
+        
+        with pytest.raises(ValueError, match="email already exists"):
+            await UserRepository.create_user(email="a@example.com", username="b")
+        with pytest.raises(ValueError, match="username already exists"):
+            await UserRepository.create_user(email="b@example.com", username="a")
+    
+    @pytest.fixture
+    def linked_user(self, sqlite_db):
+        """Store a user with Google and Microsoft tokens, plus an unlinked user."""
+        session = sqlite_db()
+        user = User(id="user123", email="test@example.com", username="testuser")
+        session.add_all([user, User(email="other@example.com", username="other")])
+        session.flush()
+        for provider in ("google", "microsoft"):
+            session.add(OAuthToken(
+                user_id=user.id,
+                provider=provider,
+                provider_user_id=f"{provider}_user_123",
+                provider_email="test@gmail.com",
+                access_token="access",
+                refresh_token="refresh",
+                expires_at=datetime.utcnow() + timedelta(hours=1),
+                scopes="email"
+            ))
+        session.commit()
+        session.close()
+        return user
+    
+    async def test_get_user_by_email(self, linked_user):
         """Test retrieving a user by email."""
-        # Setup session mock
-        mock_get_db_session.return_value = mock_session
-        
-        # Setup query mocks
-        mock_query = MagicMock()
-        mock_filter = MagicMock()
-        mock_filter.first.return_value = mock_user  # Return mock user
-        mock_query.filter.return_value = mock_filter
-        mock_session.query.return_value = mock_query
-        
-        # Call function
-        user = await UserRepository.get_user_by_email(email=mock_user.email)
-        
-        # Verify correct user was returned
-        assert user is mock_user
+        user = await UserRepository.get_user_by_email(email="test@example.com")
         
-        # Verify query used the correct filter
-        mock_session.query.assert_called_once_with(User)
-        mock_query.filter.assert_called_once()
+        assert user["id"] == "user123"
+        assert user["username"] == "testuser"
+        assert user["permissions"] == ["view"]
+        assert sorted(user["oauth_providers"]) == ["google", "microsoft"]
+        assert await UserRepository.get_user_by_email(email="missing@example.com") is None
     
-    @patch('src.storage.user_repository.get_db_session')
-    async def test_get_user_by_username(self, mock_get_db_session, mock_session, mock_user):
-        """Test retrieving a user by username."""
-        # Setup session mock
-        mock_get_db_session.return_value = mock_session
-        
-        # Setup query mocks
-        mock_query = MagicMock()
-        mock_filter = MagicMock()
-        mock_filter.first.return_value = mock_user  # Return mock user
-        mock_query.filter.return_value = mock_filter
-        mock_session.query.return_value = mock_query
-        
-        # Call function
-        user = await UserRepository.get_user_by_username(username=mock_user.username)
-        
-        # Verify correct user was returned
-        assert user is mock_user
-        
-        # Verify query used the correct filter
-        mock_session.query.assert_called_once_with(User)
-        mock_query.filter.assert_called_once()
+    async def test_get_user_by_username(self, linked_user):
+        """Test retrieving a user by username, including one without tokens."""
+        user = await UserRepository.get_user_by_username(username="testuser")
+        other = await UserRepository.get_user_by_username(username="other")
+        
+        assert user["email"] == "test@example.com"
+        assert sorted(user["oauth_providers"]) == ["google", "microsoft"]
+        assert other["email"] == "other@example.com"
+        assert other["oauth_providers"] == []
     
-    @patch('src.storage.user_repository.get_db_session')
-    async def test_get_user_by_oauth(self, mock_get_db_session, mock_session, mock_user, mock_oauth_token):
+    async def test_get_user_by_oauth(self, linked_user):
         """Test retrieving a user by OAuth provider and provider-specific ID."""
-        # Setup session mock
-        mock_get_db_session.return_value = mock_session
-        
-        # Setup query mocks
-        mock_query = MagicMock()
-        mock_filter = MagicMock()
-        mock_oauth_token.user = mock_user  # Link token to user
-        mock_filter.first.return_value = mock_oauth_token  # Return mock token
-        mock_query.filter.return_value = mock_filter
-        mock_session.query.return_value = mock_query
-        
-        # Call function
         user = await UserRepository.get_user_by_oauth(
-            provider=mock_oauth_token.provider,
-            provider_user_id=mock_oauth_token.provider_user_id
+            provider="google",
+            provider_user_id="google_user_123"
         )
         
-        # Verify correct user was returned
-        assert user is mock_user
-        
-        # Verify query used the correct filters
-        mock_session.query.assert_called_once_with(OAuthToken)
-        mock_query.filter.assert_called_once()
+        assert user["id"] == "user123"
+        assert sorted(user["oauth_providers"]) == ["google", "microsoft"]
+        assert await UserRepository.get_user_by_oauth("google", "microsoft_user_123") is None
+    
+    async def test_get_user_by_email_single_query(self, linked_user, sqlite_db):
+        """Test a user and its providers are loaded with one SELECT."""
+        statements = []
+        engine = sqlite_db.kw["bind"]
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            await UserRepository.get_user_by_email(email="test@example.com")
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        
+        assert len(statements) == 1
+    
+    async def test_get_user_by_email_cached_until_write(self, linked_user, sqlite_db):
+        """Test lookups are cached within a request, cleared by writes and never shared across requests."""
+        from src.storage import database
+        
+        statements = []
+        engine = sqlite_db.kw["bind"]
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            with patch('src.storage.user_repository.get_db_session', database.get_db_session), \
+                    patch('src.storage.database.SessionLocal', sqlite_db):
+                async with database.request_db_session():
+                    first = await UserRepository.get_user_by_email(email="test@example.com")
+                    first["oauth_providers"].append("mutated")
+                    second = await UserRepository.get_user_by_email(email="test@example.com")
+                    assert len(statements) == 1
+                    assert "mutated" not in second["oauth_providers"]
+                    
+                    await UserRepository.update_user_last_login(user_id="user123")
+                    statements.clear()
+                    third = await UserRepository.get_user_by_email(email="test@example.com")
+                    assert len(statements) == 1
+                    assert third["last_login"] is not None
+                
+                # A new request starts without cached lookups
+                statements.clear()
+                async with database.request_db_session():
+                    await UserRepository.get_user_by_email(email="test@example.com")
+                assert len([s for s in statements if s.lstrip().upper().startswith("SELECT")]) == 1
+            
+            # Outside a request session nothing is cached
+            statements.clear()
+            await UserRepository.get_user_by_email(email="test@example.com")
+            await UserRepository.get_user_by_email(email="test@example.com")
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        
+        assert len(statements) == 2
     
     @patch('src.storage.user_repository.get_db_session')
     async def test_update_user_last_login_success(self, mock_get_db_session, mock_session, mock_user):
@@ -243,7 +318,7 @@ class TestUserRepository:
         # Verify session operations
         mock_session.query.assert_called_once_with(User)
         mock_query.filter.assert_called_once()
-        mock_session.commit.assert_called_once()
+        mock_session.flush.assert_called_once()
     
     @patch('src.storage.user_repository.get_db_session')
     async def test_update_user_last_login_not_found(self, mock_get_db_session, mock_session):
@@ -264,155 +339,135 @@ class TestUserRepository:
         # Verify result
         assert result is False
         
-        # Verify session was queried but not committed
+        # Verify session was queried but not flushed
         mock_session.query.assert_called_once_with(User)
         mock_query.filter.assert_called_once()
-        mock_session.commit.assert_not_called()
+        mock_session.flush.assert_not_called()
     
-    @patch('src.storage.user_repository.get_db_session')
-    @patch('src.storage.user_repository.encrypt_value')
-    async def test_save_oauth_token_new(self, mock_encrypt, mock_get_db_session, mock_session, mock_user):
+    async def test_save_oauth_token_new(self, sqlite_db):
         """Test saving a new OAuth token."""
-        # Setup session mock
-        mock_get_db_session.return_value = mock_session
-        
-        # Setup query mocks
-        mock_user_query = MagicMock()
-        mock_user_filter = MagicMock()
-        mock_user_filter.first.return_value = mock_user  # Return mock user
-        mock_user_query.filter.return_value = mock_user_filter
-        
-        mock_token_query = MagicMock()
-        mock_token_filter = MagicMock()
-        mock_token_filter.first.return_value = None  # No existing token
-        mock_token_query.filter.return_value = mock_token_filter
-        
-        # Configure session to return different query objects
-        mock_session.query.side_effect = [mock_user_query, mock_token_query]
-        
-        # Setup encrypt mock
-        mock_encrypt.side_effect = lambda x: f"encrypted_{x}" if x else None
-        
-        # Token data
-        provider = "google"
-        provider_user_id = "google_user_123"
-        provider_email = "test@gmail.com"
-        access_token = "access_token_123"
-        refresh_token = "refresh_token_456"
-        expires_in = 3600
-        scopes = ["email", "profile"]
-        
-        # Call function
-        with patch('src.storage.user_repository.datetime') as mock_datetime:
-            now = datetime(2025, 1, 1, 12, 0, 0)
-            expires = datetime(2025, 1, 1, 13, 0, 0)  # 1 hour later
-            mock_datetime.utcnow.return_value = now
-            mock_datetime.utcnow.side_effect = [now, now]  # Multiple calls
-            
-            token = await UserRepository.save_oauth_token(
-                user_id=mock_user.id,
-                provider=provider,
-                provider_user_id=provider_user_id,
-                provider_email=provider_email,
-                access_token=access_token,
-                refresh_token=refresh_token,
-                expires_in=expires_in,
-                scopes=scopes
-            )
-        
-        # Verify token was created
-        assert token is not None
-        
-        # Verify queries
-        mock_session.query.assert_called_with(OAuthToken)
-        
-        # Verify encryption was called
-        mock_encrypt.assert_any_call(access_token)
-        mock_encrypt.assert_any_call(refresh_token)
+        session = sqlite_db()
+        session.add(User(id="user123", email="test@example.com", username="testuser"))
+        session.commit()
+        session.close()
+        
+        token = await UserRepository.save_oauth_token(
+            user_id="user123",
+            provider="google",
+            provider_user_id="google_user_123",
+            provider_email="test@gmail.com",
+            access_token="access_token_123",
+            refresh_token="refresh_token_456",
+            expires_in=3600,
+            scopes=["email", "profile"]
+        )
         
-        # Verify session operations
-        mock_session.add.assert_called_once()
-        mock_session.commit.assert_called_once()
-        
-        # Verify the added token has the correct attributes
-        added_token = mock_session.add.call_args[0][0]
-        assert added_token.user_id == mock_user.id
-        assert added_token.provider == provider
-        assert added_token.provider_user_id == provider_user_id
-        assert added_token.provider_email == provider_email
-        assert added_token.access_token == f"encrypted_{access_token}"
-        assert added_token.refresh_token == f"encrypted_{refresh_token}"
-        assert added_token.scopes == "email,profile"
+        assert token["user_id"] == "user123"
+        assert token["provider"] == "google"
+        assert token["scopes"] == ["email", "profile"]
+        assert token["id"] and token["created_at"]
+        assert token["created_at"] == token["updated_at"]
+        
+        # Token columns are encrypted at rest and decrypted on load
+        session = sqlite_db()
+        raw_access = session.execute(text("SELECT access_token FROM oauth_tokens")).scalar_one()
+        stored = session.query(OAuthToken).one()
+        assert raw_access != "access_token_123"
+        assert stored.access_token == "access_token_123"
+        assert stored.refresh_token == "refresh_token_456"
+        session.close()
     
-    @patch('src.storage.user_repository.get_db_session')
-    @patch('src.storage.user_repository.encrypt_value')
-    async def test_save_oauth_token_update(self, mock_encrypt, mock_get_db_session, mock_session, mock_user, mock_oauth_token):
-        """Test updating an existing OAuth token."""
-        # Setup session mock
-        mock_get_db_session.return_value = mock_session
+    async def test_save_oauth_token_update(self, linked_user, sqlite_db):
+        """Test updating an existing OAuth token in place."""
+        session = sqlite_db()
+        before = session.query(OAuthToken).filter(OAuthToken.provider == "google").one()
+        token_id, created_at = before.id, before.created_at
+        session.close()
+        
+        token = await UserRepository.save_oauth_token(
+            user_id="user123",
+            provider="google",
+            provider_user_id="updated_user_id",
+            provider_email="updated@gmail.com",
+            access_token="new_access_token",
+            refresh_token=None,
+            expires_in=3600,
+            scopes=["email", "profile", "calendar"]
+        )
         
-        # Setup query mocks
-        mock_user_query = MagicMock()
-        mock_user_filter = MagicMock()
-        mock_user_filter.first.return_value = mock_user  # Return mock user
-        mock_user_query.filter.return_value = mock_user_filter
-        
-        mock_token_query = MagicMock()
-        mock_token_filter = MagicMock()
-        mock_token_filter.first.return_value = mock_oauth_token  # Existing token
-        mock_token_query.filter.return_value = mock_token_filter
-        
-        # Configure session to return different query objects
-        mock_session.query.side_effect = [mock_user_query, mock_token_query]
-        
-        # Setup encrypt mock
-        mock_encrypt.side_effect = lambda x: f"encrypted_{x}" if x else None
-        
-        # Token data (updated values)
-        provider = mock_oauth_token.provider
-        provider_user_id = "updated_user_id"
-        provider_email = "updated@gmail.com"
-        access_token = "new_access_token"
-        refresh_token = "new_refresh_token"
-        expires_in = 3600
-        scopes = ["email", "profile", "calendar"]
+        assert token["id"] == token_id
+        assert token["created_at"] == created_at.isoformat()
+        assert token["provider_user_id"] == "updated_user_id"
+        assert token["scopes"] == ["email", "profile", "calendar"]
         
-        # Call function
-        with patch('src.storage.user_repository.datetime') as mock_datetime:
-            now = datetime(2025, 1, 1, 12, 0, 0)
-            mock_datetime.utcnow.return_value = now
-            
-            token = await UserRepository.save_oauth_token(
-                user_id=mock_user.id,
-                provider=provider,
-                provider_user_id=provider_user_id,
-                provider_email=provider_email,
-                access_token=access_token,
-                refresh_token=refresh_token,
-                expires_in=expires_in,
-                scopes=scopes
+        session = sqlite_db()
+        tokens = session.query(OAuthToken).filter(OAuthToken.provider == "google").all()
+        assert len(tokens) == 1
+        assert tokens[0].access_token == "new_access_token"
+        # No new refresh token was issued, so the stored one is kept
+        assert tokens[0].refresh_token == "refresh"
+        assert tokens[0].provider_email == "updated@gmail.com"
+        session.close()
+    
+    async def test_duplicate_create_user_keeps_request_session_usable(self):
+        """Test a rejected duplicate leaves the request's shared session usable and committable."""
+        from src.storage.database import request_db_session
+        
+        engine = create_engine(
+            "sqlite://",
+            poolclass=StaticPool,
+            connect_args={"check_same_thread": False}
+        )
+        Base.metadata.create_all(bind=engine)
+        factory = sessionmaker(bind=engine)
+        
+        with patch('src.storage.database.SessionLocal', factory):
+            async with request_db_session():
+                await UserRepository.create_user(email="a@example.com", username="a")
+                with pytest.raises(ValueError, match="email already exists"):
+                    await UserRepository.create_user(email="a@example.com", username="b")
+                user = await UserRepository.get_user_by_username("a")
+        
+        assert user["email"] == "a@example.com"
+        session = factory()
+        assert [u.username for u in session.query(User)] == ["a"]
+        session.close()
+    
+    async def test_save_oauth_token_upsert_on_pre_index_table(self, sqlite_db):
+        """Test the upsert works on a table created before uq_user_provider, once init_db ran."""
+        from src.storage.database import init_db
+        
+        engine = sqlite_db.kw["bind"]
+        with engine.begin() as connection:
+            connection.execute(text("DROP INDEX uq_user_provider"))
+            connection.execute(text("DROP TABLE schema_migrations"))
+        session = sqlite_db()
+        session.add(User(id="user123", email="test@example.com", username="testuser"))
+        session.commit()
+        session.close()
+        
+        with patch('src.storage.database.engine', engine), \
+                patch('src.storage.database.SessionLocal', sqlite_db):
+            init_db()
+        
+        for access_token in ("first", "second"):
+            await UserRepository.save_oauth_token(
+                "user123", "google", "sub", "a@gmail.com", access_token, None, 3600, ["email"]
             )
         
-        # Verify the same token object was returned
-        assert token is mock_oauth_token
-        
-        # Verify token fields were updated
-        assert mock_oauth_token.provider_user_id == provider_user_id
-        assert mock_oauth_token.provider_email == provider_email
-        assert mock_oauth_token.access_token == f"encrypted_{access_token}"
-        assert mock_oauth_token.refresh_token == f"encrypted_{refresh_token}"
-        assert mock_oauth_token.scopes == "email,profile,calendar"
-        assert mock_oauth_token.updated_at == now
-        
-        # Verify no new token was added
-        mock_session.add.assert_not_called()
-        
-        # Verify session was committed
-        mock_session.commit.assert_called_once()
+        session = sqlite_db()
+        assert [t.access_token for t in session.query(OAuthToken)] == ["second"]
+        session.close()
+    
+    async def test_save_oauth_token_unknown_user(self, sqlite_db):
+        """Test saving a token for a missing user is rejected."""
+        with pytest.raises(ValueError):
+            await UserRepository.save_oauth_token(
+                "missing", "google", "sub", "a@gmail.com", "access", None, 3600, ["email"]
+            )
     
     @patch('src.storage.user_repository.get_db_session')
-    @patch('src.storage.user_repository.decrypt_value')
-    async def test_get_oauth_tokens(self, mock_decrypt, mock_get_db_session, mock_session, mock_oauth_token):
+    async def test_get_oauth_tokens(self, mock_get_db_session, mock_session, mock_oauth_token):
         """Test retrieving OAuth tokens with decrypted values."""
         # Setup session mock
         mock_get_db_session.return_value = mock_session
@@ -424,12 +479,9 @@ class TestUserRepository:
         mock_query.filter.return_value = mock_filter
         mock_session.query.return_value = mock_query
         
-        # Setup decrypt mock
-        mock_decrypt.side_effect = lambda x: x.replace("encrypted_", "") if x else None
-        
-        # Set token attributes for testing
-        mock_oauth_token.access_token = "encrypted_access_token_123"
-        mock_oauth_token.refresh_token = "encrypted_refresh_token_456"
+        # Set token attributes for testing (already decrypted by EncryptedText on load)
+        mock_oauth_token.access_token = "access_token_123"
+        mock_oauth_token.refresh_token = "refresh_token_456"
         mock_oauth_token.expires_at = datetime(2025, 1, 1, 12, 0, 0)
         mock_oauth_token.created_at = datetime(2025, 1, 1, 11, 0, 0)
         mock_oauth_token.updated_at = datetime(2025, 1, 1, 11, 30, 0)
@@ -456,10 +508,6 @@ class TestUserRepository:
         # Verify query and filter
         mock_session.query.assert_called_once_with(OAuthToken)
         mock_query.filter.assert_called_once()
-        
-        # Verify decrypt was called for tokens
-        mock_decrypt.assert_any_call("encrypted_access_token_123")
-        mock_decrypt.assert_any_call("encrypted_refresh_token_456")
     
     @patch('src.storage.user_repository.get_db_session')
     async def test_get_oauth_tokens_with_provider_filter(self, mock_get_db_session, mock_session, mock_oauth_token):
@@ -476,13 +524,11 @@ class TestUserRepository:
         mock_query.filter.return_value = mock_filter1
         mock_session.query.return_value = mock_query
         
-        # Mock decrypt to avoid actual decryption
-        with patch('src.storage.user_repository.decrypt_value', lambda x: x):
-            # Call function with provider filter
-            tokens = await UserRepository.get_oauth_tokens(
-                user_id=mock_oauth_token.user_id,
-                provider=mock_oauth_token.provider
-            )
+        # Call function with provider filter
+        tokens = await UserRepository.get_oauth_tokens(
+            user_id=mock_oauth_token.user_id,
+            provider=mock_oauth_token.provider
+        )
         
         # Verify query was filtered by both user_id and provider
         mock_session.query.assert_called_once_with(OAuthToken)